@@ -0,0 +1,2 @@
+#!/bin/bash
+python main.py avalia_astar_exata $1
\ No newline at end of file
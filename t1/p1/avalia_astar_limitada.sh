@@ -0,0 +1,2 @@
+#!/bin/bash
+python main.py avalia_astar_limitada $1 $2
\ No newline at end of file
@@ -0,0 +1,2 @@
+#!/bin/bash
+python main.py avalia_astar_pdb $1
\ No newline at end of file
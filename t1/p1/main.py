@@ -2,7 +2,11 @@ from enum import Enum
 from typing import List
 from collections import deque
 import heapq
+import math
+import os
 import sys
+import time
+import tracemalloc
 
 DEBUG = False
 
@@ -21,103 +25,297 @@ class Direction(Enum):
         if self == Direction.TOP: return "acima"
         if self == Direction.BOTTOM: return "abaixo"
     
+# Characters of the tiles, the blank first, for boards up to 6x6
+TILE_CHARACTERS = "_123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+MIN_SIZE = 2
+MAX_SIZE = math.isqrt(len(TILE_CHARACTERS))
+
+# Geometry of a board of size x size cells, shared by all the states of that
+# size. States are packed in an int: the tile of cell i is kept in bits
+# bits * i to bits * (i + 1) - 1, with the blank as 0. Up to 4x4 a cell has
+# 4 bits, so the 3x3 "12345678_" is 0x087654321
+class Board:
+    boards = {}
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.tiles = TILE_CHARACTERS[:self.cells]
+        self.goal = self.tiles[1:] + "_"
+        self.bits = max(4, (self.cells - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.packedGoal = self.pack(self.goal)
+
+        # Lowest bit of every cell, to count the cells that differ from the goal
+        self.cellMask = sum(1 << (self.bits * index) for index in range(self.cells))
+
+        # Moves available with the blank at each index, as (direction, new blank index)
+        self.neighbors = [self.moves(index) for index in range(self.cells)]
+
+        # Values of the heuristics for each tile (blank included) at each index:
+        # whether it is out of place, and its Manhattan distance to its goal index.
+        # manhattanTiles leaves out the blank, which isn't a tile: an estimate
+        # that never exceeds the number of moves left, as IDA* and SMA* need to
+        # find the shortest path
+        goalIndex = [self.goal.index(tile) for tile in self.tiles]
+        self.hamming = [[int(goalIndex[tile] != index) for index in range(self.cells)] for tile in range(self.cells)]
+        self.manhattan = [[abs(index // size - goalIndex[tile] // size) + abs(index % size - goalIndex[tile] % size)
+                           for index in range(self.cells)] for tile in range(self.cells)]
+        self.manhattanTiles = [[0] * self.cells] + self.manhattan[1:]
+
+    @staticmethod
+    def ofSize(size):
+        if size not in Board.boards:
+            Board.boards[size] = Board(size)
+        return Board.boards[size]
+
+    def isValidState(self, state):
+        return len(state) == self.cells and all(char in state for char in self.goal)
+
+    def pack(self, state):
+        result = 0
+        for index, char in enumerate(state):
+            result |= self.tiles.index(char) << (self.bits * index)
+        return result
+
+    def unpack(self, packed):
+        return "".join(self.tiles[(packed >> (self.bits * index)) & self.mask] for index in range(self.cells))
+
+    def moves(self, index):
+        result = []
+        if index >= self.size:
+            result.append((Direction.TOP, index - self.size))
+        if index < self.cells - self.size:
+            result.append((Direction.BOTTOM, index + self.size))
+        if index % self.size != 0:
+            result.append((Direction.LEFT, index - 1))
+        if index % self.size != self.size - 1:
+            result.append((Direction.RIGHT, index + 1))
+        return result
+
+    # Inversions are the pairs of tiles out of order, read row by row. A
+    # horizontal move keeps them, and a vertical one takes a tile over
+    # size - 1 others. With an odd size that keeps their parity, so it must
+    # be even as in the goal. With an even size the parity changes with each
+    # change of the row of the blank, so the inversions plus the rows from
+    # the blank to the last one must be even
+    def isSolvable(self, packed, blank):
+        tiles = [tile for tile in ((packed >> (self.bits * index)) & self.mask for index in range(self.cells)) if tile]
+        inversions = sum(1 for i in range(len(tiles)) for j in range(i + 1, len(tiles)) if tiles[i] > tiles[j])
+        if self.size % 2 == 0:
+            inversions += self.size - 1 - blank // self.size
+        return inversions % 2 == 0
+
+# The 3x3 board of the assignments, the only one with the distance tables below
+BOARD = Board.ofSize(3)
+
+# Nodes the bounded A* keeps in memory by default
+MEMORY_LIMIT = 5000
+
+### Pattern databases
+
+# Distance tables, one byte per index, generated once with a BFS from the goal
+# (moves can be undone, so the distance from the goal is the distance to it)
+# and saved next to this file. prepara.sh generates them, otherwise the first
+# search that needs a table does
+TABLES_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+UNREACHABLE = 255
+
+# Disjoint patterns: a move changes the distance of one of them at most, so their distances add up
+PATTERNS = [(1, 2, 3, 4), (5, 6, 7, 8)]
+
+# Set bits of every 9 bit mask
+BIT_COUNT = [bin(mask).count("1") for mask in range(512)]
+
+def cells(packed):
+    return [(packed >> (BOARD.bits * index)) & BOARD.mask for index in range(BOARD.cells)]
+
+# Position of a sequence of distinct numbers from 0 to 8 among all the sequences
+# of its length (Lehmer code): from 0 to 9! - 1 for the 9 tiles of a state
+def rank(values):
+    result = 0
+    used = 0
+    for position, value in enumerate(values):
+        result = result * (9 - position) + value - BIT_COUNT[used & ((1 << value) - 1)]
+        used |= 1 << value
+    return result
+
+# Exact distance to the goal of every state, by the rank of its tiles.
+# Half of the permutations can't reach the goal and stay UNREACHABLE
+def buildPerfectTable():
+    table = bytearray([UNREACHABLE]) * math.factorial(9)
+    table[rank(cells(BOARD.packedGoal))] = 0
+    frontier = deque([(BOARD.packedGoal, BOARD.goal.index("_"), 0)])
+    while frontier:
+        state, blank, distance = frontier.popleft()
+        for _, newIndex in BOARD.neighbors[blank]:
+            tile = (state >> (BOARD.bits * newIndex)) & BOARD.mask
+            child = state + (tile << (BOARD.bits * blank)) - (tile << (BOARD.bits * newIndex))
+            index = rank(cells(child))
+            if table[index] == UNREACHABLE:
+                table[index] = distance + 1
+                frontier.append((child, newIndex, distance + 1))
+    return table
+
+# Least number of moves of the pattern tiles to take them to their goal
+# cells, by the rank of their cells. The search runs on the cells of the
+# pattern tiles and of the blank: moving a pattern tile costs 1 and moving
+# any other tile costs nothing (a 0-1 BFS)
+def buildPatternDatabase(pattern):
+    goal = tuple(BOARD.goal.index(BOARD.tiles[tile]) for tile in pattern) + (BOARD.goal.index("_"),)
+    distances = {goal: 0}
+    frontier = deque([(goal, 0)])
+    while frontier:
+        positions, distance = frontier.popleft()
+        if distances[positions] < distance:
+            continue
+        blank = positions[-1]
+        for _, newIndex in BOARD.neighbors[blank]:
+            if newIndex in positions:
+                moved = positions.index(newIndex)
+                child = positions[:moved] + (blank,) + positions[moved + 1:-1] + (newIndex,)
+                childDistance = distance + 1
+            else:
+                child = positions[:-1] + (newIndex,)
+                childDistance = distance
+            if childDistance < distances.get(child, UNREACHABLE):
+                distances[child] = childDistance
+                if childDistance == distance:
+                    frontier.appendleft((child, childDistance))
+                else:
+                    frontier.append((child, childDistance))
+
+    table = bytearray([UNREACHABLE]) * math.perm(9, len(pattern))
+    for positions, distance in distances.items():
+        index = rank(positions[:-1])
+        table[index] = min(table[index], distance)
+    return table
+
+TABLES = {}
+
+def loadTable(fileName, build):
+    if fileName not in TABLES:
+        path = os.path.join(TABLES_DIRECTORY, fileName)
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                TABLES[fileName] = file.read()
+        else:
+            debugPrint(f"Generating { fileName }")
+            TABLES[fileName] = bytes(build())
+            with open(path, "wb") as file:
+                file.write(TABLES[fileName])
+    return TABLES[fileName]
+
+def perfectTable():
+    return loadTable("perfect.db", buildPerfectTable)
+
+def patternDatabases():
+    return [(pattern, loadTable("pattern_" + "".join(map(str, pattern)) + ".db", lambda: buildPatternDatabase(pattern)))
+            for pattern in PATTERNS]
+
 class Puzzle:
-    def __init__(self, initialState, action = None, parent = None, cost = 0):
-        debugPrint(f"New Puzzle initialized \"{ initialState }\" \"{ action }\" \"{ parent.currentState if parent else None }\" \"{ cost }\"")
-        self.currentState = initialState
+    # Nodes are many, so they have no __dict__
+    __slots__ = ('board', 'state', 'blank', 'action', 'parent', 'cost', 'total_cost')
+
+    # Number of nodes expanded by the last search
+    expandedNodes = 0
+
+    # The board has size x size cells, or as many as the characters of the state if size is None
+    def __init__(self, initialState, action = None, parent = None, cost = 0, size = None):
+        if DEBUG: debugPrint(f"New Puzzle initialized \"{ initialState }\" \"{ action }\" \"{ parent.currentState if parent else None }\" \"{ cost }\"")
+        self.setState(initialState, size)
         self.action = action
         self.parent = parent
         self.cost = cost
         self.total_cost = cost
 
+    # The state as a string, for the public API. Invalid strings are kept
+    # as they are, without a board, so isValid can reject them
+    @property
+    def currentState(self):
+        return self.board.unpack(self.state) if self.board is not None else self.state
+
+    @currentState.setter
+    def currentState(self, value):
+        self.setState(value)
+
+    def setState(self, value, size = None):
+        if size is None:
+            size = math.isqrt(len(value))
+        board = Board.ofSize(size) if MIN_SIZE <= size <= MAX_SIZE else None
+        if board is not None and board.isValidState(value):
+            self.board = board
+            self.state = board.pack(value)
+            self.blank = value.index("_")
+        else:
+            self.board = None
+            self.state = value
+            self.blank = None
+
     # Comparison conformance
     def __lt__(self, other):
         return self.total_cost < other.total_cost
 
     def isValid(self):
-        result = True
-        if len(self.currentState) != 9:
-            result = False
-        else:
-            for char in "12345678_":
-                if char not in self.currentState:
-                    result = False
-        
+        result = self.board is not None
         debugPrint(f"Called isValid with result = { result }")
         return result
 
     def isFinished(self):
-        result = self.currentState == "12345678_"
+        result = self.state == self.board.packedGoal
         debugPrint(f"Called isFinished with result = { result }")
         return result
+
+    def isSolvable(self):
+        result = self.board.isSolvable(self.state, self.blank)
+        debugPrint(f"Called isSolvable with result = { result }")
+        return result
     
     def emptyIndex(self):
-        result = self.currentState.index("_")
+        result = self.blank
         debugPrint(f"Called emptyIndex with result = { result }")
         return result
 
     def availableDirections(self):
-        result = []
-        index = self.emptyIndex()
-        
-        if index > 2:
-            result.append(Direction.TOP)
-        
-        if index < 6:
-            result.append(Direction.BOTTOM)
-        
-        if index not in [0, 3, 6]:
-            result.append(Direction.LEFT)
-
-        if index not in [2, 5, 8]:
-            result.append(Direction.RIGHT)
-        
+        result = [direction for direction, _ in self.board.neighbors[self.blank]]
         debugPrint(f"Called availableDirections with result = { result }")
         return result
 
     def applyDirection(self, direction):
-        if direction not in self.availableDirections():
+        for available, newIndex in self.board.neighbors[self.blank]:
+            if available == direction:
+                break
+        else:
             raise Exception("ERROR: Direction can't be applied to current state.")
 
-        if direction == Direction.TOP:
-            index = self.emptyIndex()
-            newIndex = index - 3
-        elif direction == Direction.BOTTOM:
-            index = self.emptyIndex()
-            newIndex = index + 3
-        elif direction == Direction.LEFT:
-            index = self.emptyIndex()
-            newIndex = index - 1
-        elif direction == Direction.RIGHT:
-            index = self.emptyIndex()
-            newIndex = index + 1
-        
-        newState = list(self.currentState)
-        newState[index], newState[newIndex] = newState[newIndex] + newState[index]
-        result = "".join(newState)
-        debugPrint(f"Called applyDirection with new state = { result }")
+        bits = self.board.bits
+        tile = (self.state >> (bits * newIndex)) & self.board.mask
+        self.state += (tile << (bits * self.blank)) - (tile << (bits * newIndex))
+        self.blank = newIndex
         self.action = direction
-        self.currentState = result
+        debugPrint(f"Called applyDirection with new state = { self.currentState }")
+
+    # Node reached by sliding the tile at newIndex into the blank, built
+    # without going through __init__ and the validation of applyDirection
+    def slide(self, direction, newIndex, parent, cost):
+        bits = self.board.bits
+        tile = (self.state >> (bits * newIndex)) & self.board.mask
+        puzzle = Puzzle.__new__(Puzzle)
+        puzzle.board = self.board
+        puzzle.state = self.state + (tile << (bits * self.blank)) - (tile << (bits * newIndex))
+        puzzle.blank = newIndex
+        puzzle.action = direction
+        puzzle.parent = parent
+        puzzle.cost = cost
+        puzzle.total_cost = cost
+        return puzzle
 
     def successors(self):
-        directions = self.availableDirections()
-        
-        def fnc(direction):
-            puzzle = Puzzle(self.currentState, self.action, self.parent, self.cost)
-            puzzle.applyDirection(direction)
-            return puzzle
-        
-        return list(map(fnc, directions))
+        return [self.slide(direction, newIndex, self.parent, self.cost) for direction, newIndex in self.board.neighbors[self.blank]]
             
     def expand(self):
-        successors = self.successors()
-        
-        def fnc(successor):
-            successor.cost += 1
-            successor.parent = self
-            return successor
-        
-        return list(map(fnc, successors))
+        cost = self.cost + 1
+        return [self.slide(direction, newIndex, self, cost) for direction, newIndex in self.board.neighbors[self.blank]]
 
     def path(self):
         path = deque()
@@ -127,15 +325,35 @@ class Puzzle:
             puzzle = puzzle.parent
         return list(path)
 
+    # BFS has its own engine: a deque as the frontier, and states marked as
+    # seen when generated, so that each one enters the frontier only once.
+    # The goal is tested on generation, which still finds the shortest path
     def breadthFirstSearch(self):
         debugPrint('Starting BFS for ' + self.currentState)
-        def fnc(frontier):
-            return frontier.pop(0)
-        return self.__graphSearch__(
-            addToFrontier = List.append,
-            extendFrontier = List.extend,
-            removeFromFrontier = fnc
-        )
+        if self.isFinished() or not self.isSolvable():
+            Puzzle.expandedNodes = 0
+            return self.path() if self.isFinished() else []
+
+        goal = self.board.packedGoal
+        expandedNodes = 0
+        seen = {self.state}
+        frontier = deque([self])
+        while frontier:
+            v = frontier.popleft()
+            expandedNodes += 1
+            for successor in v.expand():
+                if successor.state in seen:
+                    continue
+                if successor.state == goal:
+                    debugPrint('BFS finished with ' + str(expandedNodes) + ' expanded nodes and cost ' + str(successor.cost))
+                    Puzzle.expandedNodes = expandedNodes
+                    return successor.path()
+                seen.add(successor.state)
+                frontier.append(successor)
+
+        debugPrint('Could not find path')
+        Puzzle.expandedNodes = expandedNodes
+        return []
     
     def depthFirstSearch(self):
         debugPrint('Starting DFS for ' + self.currentState)
@@ -150,56 +368,63 @@ class Puzzle:
     # A*
 
     def hammingHeuristic(self):
-        return sum(1 for lhs, rhs in zip(self.currentState, "12345678_") if lhs != rhs)
+        # a cell differs from the goal when any of its bits in the xor is set
+        board = self.board
+        different = self.state ^ board.packedGoal
+        folded = different
+        for shift in range(1, board.bits):
+            folded |= different >> shift
+        return bin(folded & board.cellMask).count("1")
 
     def manhattanHeuristic(self):
-        result = 0
-        for char in self.currentState:
-            if char == '1':
-                targetIndex = 0
-
-            elif char == '2':
-                targetIndex = 1
-
-            elif char == '3':
-                targetIndex = 2
-
-            elif char == '4':
-                targetIndex = 3
+        return self.cellHeuristic(self.board.manhattan)
 
-            elif char == '5':
-                targetIndex = 4
+    def tilesManhattanHeuristic(self):
+        return self.cellHeuristic(self.board.manhattanTiles)
 
-            elif char == '6':
-                targetIndex = 5
-
-            elif char == '7':
-                targetIndex = 6
-
-            elif char == '8':
-                targetIndex = 7
-
-            elif char == '_':
-                targetIndex = 8
+    # Sum of the values of a table of Board for the tile at each cell
+    def cellHeuristic(self, table):
+        board = self.board
+        state = self.state
+        result = 0
+        for index in range(board.cells):
+            result += table[(state >> (board.bits * index)) & board.mask][index]
+        return result
 
-            else:
-                continue
+    # The same from the value of the parent: a move only changes the cells of the tile and of the blank
+    def updatedCellHeuristic(self, table, parentHeuristic):
+        board = self.board
+        previous = self.parent.blank
+        tile = (self.state >> (board.bits * previous)) & board.mask
+        return parentHeuristic + table[tile][previous] - table[tile][self.blank] + table[0][self.blank] - table[0][previous]
 
-            currentIndex = self.currentState.index(char)
+    def hammingUpdate(self, parentHeuristic):
+        return self.updatedCellHeuristic(self.board.hamming, parentHeuristic)
 
-            currentVerticalPosition = currentIndex // 3
-            currentHorizontalPosition = currentIndex % 3
+    def manhattanUpdate(self, parentHeuristic):
+        return self.updatedCellHeuristic(self.board.manhattan, parentHeuristic)
 
-            targetVerticalPosition = targetIndex // 3
-            targetHorizontalPosition = targetIndex % 3
+    def tilesManhattanUpdate(self, parentHeuristic):
+        return self.updatedCellHeuristic(self.board.manhattanTiles, parentHeuristic)
 
-            result += abs(currentVerticalPosition - targetVerticalPosition) + abs(currentHorizontalPosition - targetHorizontalPosition)
+    def patternDatabaseHeuristic(self):
+        state = self.state
+        positions = [0] * 9
+        for index in range(9):
+            positions[(state >> (BOARD.bits * index)) & BOARD.mask] = index
+        return sum(table[rank([positions[tile] for tile in pattern])] for pattern, table in patternDatabases())
 
-        return result
+    def perfectHeuristic(self):
+        return perfectTable()[rank(cells(self.state))]
 
-    def aStarBase(self, heuristicFunction):
+    # With heuristicUpdate, the heuristic of the nodes after the first one is
+    # updated from the one of their parent instead of computed again
+    def aStarBase(self, heuristicFunction, heuristicUpdate = None):
         def add(frontier, puzzle):
-            heuristic = heuristicFunction(puzzle)
+            if heuristicUpdate is not None and puzzle is not self:
+                heuristic = heuristicUpdate(puzzle, puzzle.parent.total_cost - puzzle.parent.cost)
+            else:
+                heuristic = heuristicFunction(puzzle)
             puzzle.total_cost = puzzle.cost + heuristic
             heapq.heappush(frontier, puzzle)
 
@@ -219,15 +444,202 @@ class Puzzle:
     def aStarHamming(self):
         debugPrint('Starting A* H1 - Hamming for ' + self.currentState)
 
-        return self.aStarBase(Puzzle.hammingHeuristic)
+        return self.aStarBase(Puzzle.hammingHeuristic, Puzzle.hammingUpdate)
         
 
     def aStarManhattan(self):
         debugPrint('Starting A* H2 - Manhattan for ' + self.currentState)
 
-        return self.aStarBase(Puzzle.manhattanHeuristic)
+        return self.aStarBase(Puzzle.manhattanHeuristic, Puzzle.manhattanUpdate)
+
+    def aStarPatternDatabase(self):
+        debugPrint('Starting A* - Pattern databases for ' + self.currentState)
+        self.checkDistanceTables()
+
+        return self.aStarBase(Puzzle.patternDatabaseHeuristic)
+
+    def aStarPerfect(self):
+        debugPrint('Starting A* - Exact distances for ' + self.currentState)
+        self.checkDistanceTables()
+
+        return self.aStarBase(Puzzle.perfectHeuristic)
+
+    def checkDistanceTables(self):
+        if self.board is not BOARD:
+            raise Exception("ERROR: The distance tables are only for the 3x3 board.")
+
+    def idaStarManhattan(self):
+        return self.idaStar(Puzzle.tilesManhattanHeuristic, Puzzle.tilesManhattanUpdate)
+
+    def boundedAStarManhattan(self, limit = MEMORY_LIMIT):
+        return self.boundedAStar(Puzzle.tilesManhattanHeuristic, Puzzle.tilesManhattanUpdate, limit)
+
+    # IDA*: depth first searches limited by cost + heuristic, the limit raised
+    # to the least value over it after each one. Only the current path is kept
+    # in memory, and moves that undo the previous one are skipped. With
+    # heuristicUpdate, the heuristic of a node is updated from its parent's
+    def idaStar(self, heuristicFunction, heuristicUpdate = None):
+        debugPrint('Starting IDA* for ' + self.currentState)
+        expandedNodes = 0
+        solution = None
+        if not self.isSolvable():
+            debugPrint('Could not find path: unsolvable state')
+            Puzzle.expandedNodes = 0
+            return []
+
+        goal = self.board.packedGoal
+        neighbors = self.board.neighbors
+
+        def search(puzzle, heuristic, bound):
+            nonlocal expandedNodes, solution
+            total = puzzle.cost + heuristic
+            if total > bound:
+                return total
+            if puzzle.state == goal:
+                solution = puzzle
+                return total
+
+            expandedNodes += 1
+            least = math.inf
+            previous = puzzle.parent.blank if puzzle is not self else None
+            for direction, newIndex in neighbors[puzzle.blank]:
+                if newIndex == previous:
+                    continue
+                child = puzzle.slide(direction, newIndex, puzzle, puzzle.cost + 1)
+                childHeuristic = heuristicUpdate(child, heuristic) if heuristicUpdate is not None else heuristicFunction(child)
+                least = min(least, search(child, childHeuristic, bound))
+                if solution is not None:
+                    break
+            return least
+
+        heuristic = heuristicFunction(self)
+        bound = self.cost + heuristic
+        while solution is None and bound != math.inf:
+            debugPrint('IDA* searching with bound ' + str(bound))
+            bound = search(self, heuristic, bound)
+
+        Puzzle.expandedNodes = expandedNodes
+        if solution is None:
+            debugPrint('Could not find path')
+            return []
+        debugPrint('IDA* finished with ' + str(expandedNodes) + ' expanded nodes and cost ' + str(solution.cost))
+        return solution.path()
+
+    # SMA*: A* keeping at most limit nodes in memory. When the tree grows over
+    # the limit, the leaf with the highest cost + heuristic (the shallowest of
+    # them on ties) is forgotten, and its parent keeps the least value of its
+    # forgotten children, to generate them again when that is the best value
+    # left. Paths are checked for repeated states instead of keeping the
+    # explored states, and nodes as deep as the limit are dead ends, so there
+    # is no path if the solution doesn't fit in memory
+    def boundedAStar(self, heuristicFunction, heuristicUpdate = None, limit = MEMORY_LIMIT):
+        debugPrint('Starting SMA* for ' + self.currentState)
+        if not self.isSolvable():
+            debugPrint('Could not find path: unsolvable state')
+            Puzzle.expandedNodes = 0
+            return []
+
+        goal = self.board.packedGoal
+        expandedNodes = 0
+        stored = 1
+        counter = 0
+        best = []
+        worst = []
+
+        root = BoundedNode.leaf(self, None, self.parent, self.cost, self.action)
+        root.heuristic = heuristicFunction(root)
+        root.total_cost = self.cost + root.heuristic
+
+        # Heap entries of nodes that changed are skipped when popped, and
+        # dropped from time to time so the forgotten nodes are freed
+        def push(node):
+            nonlocal counter
+            counter += 1
+            if node.value() != math.inf:
+                heapq.heappush(best, (node.value(), -node.cost, counter, node))
+            if not node.children and node is not root:
+                heapq.heappush(worst, (-node.value(), node.cost, counter, node))
+
+        def compact():
+            best[:] = [entry for entry in best if not entry[3].removed and entry[3].value() == entry[0]]
+            worst[:] = [entry for entry in worst if not entry[3].removed and not entry[3].children and entry[3].value() == -entry[0]]
+            heapq.heapify(best)
+            heapq.heapify(worst)
+
+        def forget(node, value):
+            nonlocal stored
+            node.removed = True
+            stored -= 1
+            parent = node.parent
+            if node is root:
+                return
+            parent.children &= ~(1 << node.blank)
+            parent.forgotten = min(parent.forgotten, value)
+            if not parent.children and parent.forgotten == math.inf:
+                forget(parent, math.inf)  # nothing below it leads to the goal
+            else:
+                push(parent)
+
+        push(root)
+        while best and not root.removed:
+            value, _, _, node = heapq.heappop(best)
+            if node.removed or node.value() != value:
+                continue
+            if node.state == goal:
+                debugPrint('SMA* finished with ' + str(expandedNodes) + ' expanded nodes and cost ' + str(node.cost))
+                Puzzle.expandedNodes = expandedNodes
+                return node.path()
+            if node.cost - root.cost + 1 >= limit:
+                forget(node, math.inf)
+                continue
+
+            expandedNodes += 1
+            ancestors = set()
+            ancestor = node.parent
+            while ancestor is not None:
+                ancestors.add(ancestor.state)
+                ancestor = ancestor.parent
+
+            # children in memory are kept, the others are generated (again)
+            children = []
+            for direction, newIndex in node.board.neighbors[node.blank]:
+                if node.children & (1 << newIndex):
+                    continue
+                child = BoundedNode.leaf(node, newIndex, node, node.cost + 1, direction)
+                if child.state in ancestors:
+                    continue
+                child.heuristic = heuristicUpdate(child, node.heuristic) if heuristicUpdate is not None else heuristicFunction(child)
+                # never below the value of the node, which may come from forgotten children
+                child.total_cost = max(value, child.cost + child.heuristic)
+                node.children |= 1 << newIndex
+                children.append(child)
+            node.expanded = True
+            node.forgotten = math.inf
+            stored += len(children)
+
+            if not node.children:
+                forget(node, math.inf)
+            for child in children:
+                push(child)
+
+            while stored > limit:
+                value, _, _, leaf = heapq.heappop(worst)
+                if not leaf.removed and not leaf.children and leaf.value() == -value:
+                    forget(leaf, -value)
+
+            if len(best) + len(worst) > 2 * limit:
+                compact()
+
+        debugPrint('Could not find path')
+        Puzzle.expandedNodes = expandedNodes
+        return []
 
     def __graphSearch__(self, addToFrontier, extendFrontier, removeFromFrontier):
+        if not self.isSolvable():
+            debugPrint('Could not find path: unsolvable state')
+            Puzzle.expandedNodes = 0
+            return []
+
         expandedNodes = 0
         explored = set()
         frontier = []
@@ -235,13 +647,15 @@ class Puzzle:
         while True:
             if len(frontier) == 0: 
                 debugPrint('Could not find path')
+                Puzzle.expandedNodes = expandedNodes
                 return []
             v = removeFromFrontier(frontier)
             if v.isFinished():
                 debugPrint('Graph search finished with ' + str(expandedNodes) + ' expanded nodes and cost ' + str(v.cost))
+                Puzzle.expandedNodes = expandedNodes
                 return v.path()
-            if v.currentState not in explored:
-                explored.add(v.currentState)
+            if v.state not in explored:
+                explored.add(v.state)
                 sucessors = v.expand()
                 extendFrontier(frontier, sucessors)
                 expandedNodes += 1
@@ -249,7 +663,39 @@ class Puzzle:
     def __eq__(self, other): 
         if not isinstance(other, Puzzle):
             return NotImplemented
-        return self.currentState == other.currentState and self.action == other.action and self.parent == other.parent and self.cost == other.cost
+        return self.state == other.state and self.action == other.action and self.parent == other.parent and self.cost == other.cost
+
+# Node of SMA*: its heuristic, the children it has in memory (a bit for the
+# blank index of each) and the least value of the children it forgot
+class BoundedNode(Puzzle):
+    __slots__ = ('heuristic', 'children', 'forgotten', 'expanded', 'removed')
+
+    # The node after sliding the tile at newIndex of puzzle into the blank, or the node of puzzle if newIndex is None
+    @staticmethod
+    def leaf(puzzle, newIndex, parent, cost, action):
+        node = BoundedNode.__new__(BoundedNode)
+        node.board = puzzle.board
+        node.state = puzzle.state
+        node.blank = puzzle.blank
+        if newIndex is not None:
+            bits = puzzle.board.bits
+            tile = (puzzle.state >> (bits * newIndex)) & puzzle.board.mask
+            node.state += (tile << (bits * puzzle.blank)) - (tile << (bits * newIndex))
+            node.blank = newIndex
+        node.action = action
+        node.parent = parent
+        node.cost = cost
+        node.total_cost = cost
+        node.children = 0
+        node.forgotten = math.inf
+        node.expanded = False
+        node.removed = False
+        return node
+
+    # Value by which it is chosen to be expanded: its cost + heuristic until
+    # it is, then the least value of its forgotten children, if any
+    def value(self):
+        return self.forgotten if self.expanded else self.total_cost
 
 ### Puzzle Unit Tests
 def puzzle_tests():
@@ -461,12 +907,100 @@ def puzzle_tests():
     # This test takes a few seconds, best to comment out most of the time
     assertAStartManhattan()
 
+    def assertIsSolvable():
+        assert Puzzle("2_3541687").isSolvable() == True
+
+        # Two tiles swapped can't be solved, the search doesn't even start
+        obj = Puzzle("21345678_")
+        assert obj.isSolvable() == False
+        assert obj.breadthFirstSearch() == []
+        assert Puzzle.expandedNodes == 0
+
+        assert Puzzle("123456789ABCDEF_").isSolvable() == True
+        assert Puzzle("123456789ABC_DEF").isSolvable() == True
+        assert Puzzle("123456789ABCDFE_").isSolvable() == False
+
+    assertIsSolvable()
+
+    def assertBoardSizes():
+        obj = Puzzle("123456789ABCDE_F")
+        assert obj.isValid() == True
+        assert obj.emptyIndex() == 14
+        assert obj.availableDirections() == [Direction.TOP, Direction.LEFT, Direction.RIGHT]
+        assert obj.idaStarManhattan() == [Direction.RIGHT]
+
+        # The size can also be given, and must match the state
+        assert Puzzle("12345678_", size = 3).isValid() == True
+        assert Puzzle("12345678_", size = 4).isValid() == False
+
+        obj = Puzzle("123456789ABCDEFGHIJKLMN_O")
+        assert obj.manhattanHeuristic() == 2
+        assert obj.tilesManhattanHeuristic() == 1
+        assert obj.boundedAStarManhattan() == [Direction.RIGHT]
+
+    assertBoardSizes()
+
     debugPrint("ALL TESTS PASSED!!")
 
 ## Uncomment to automatically run the test suit
 # puzzle_tests()
 
 
+### Benchmark
+
+## Memory per node and expanded nodes per second of each search
+def benchmark(estado = "2_3541687", nos = 50000):
+    nos = int(nos)
+
+    tracemalloc.start()
+    puzzles = [Puzzle(estado)]
+    index = 0
+    while len(puzzles) < nos:
+        puzzles.extend(puzzles[index].expand())
+        index += 1
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Memória: { memory / len(puzzles):.1f} bytes por nó ({ len(puzzles) } nós)")
+    del puzzles
+
+    for name, search in [("BFS", Puzzle.breadthFirstSearch), ("DFS", Puzzle.depthFirstSearch),
+                         ("A* + Hamming", Puzzle.aStarHamming), ("A* + Manhattan", Puzzle.aStarManhattan)]:
+        start = time.perf_counter()
+        path = search(Puzzle(estado))
+        elapsed = time.perf_counter() - start
+        print(f"{ name }: { Puzzle.expandedNodes } nós expandidos, custo { len(path) }, "
+              f"{ elapsed:.2f}s, { Puzzle.expandedNodes / elapsed:.0f} nós/s")
+
+# benchmark()
+
+## BFS over the whole space reachable from a state (9! / 2 = 181440 states):
+## the two hardest instances (31 moves) and an unsolvable input, rejected by
+## the parity of its inversions before the search starts
+def benchmark_bfs():
+    for estado in ["8672543_1", "64785_321", "21345678_"]:
+        start = time.perf_counter()
+        path = Puzzle(estado).breadthFirstSearch()
+        elapsed = time.perf_counter() - start
+        result = f"custo { len(path) }" if path else "sem solução"
+        print(f"{ estado }: { result }, { Puzzle.expandedNodes } nós expandidos, "
+              f"{ elapsed:.2f}s, { Puzzle.expandedNodes / elapsed:.0f} nós/s")
+
+# benchmark_bfs()
+
+## Peak of memory and expanded nodes of each search, including the ones with bounded memory
+def benchmark_memoria(estado = "8672543_1"):
+    for name, search in [("BFS", Puzzle.breadthFirstSearch), ("A* + Manhattan", Puzzle.aStarManhattan),
+                         ("IDA* + Manhattan", Puzzle.idaStarManhattan), ("SMA* + Manhattan", Puzzle.boundedAStarManhattan)]:
+        puzzle = Puzzle(estado)
+        start = time.perf_counter()
+        path, peak = measureSearch(lambda: search(puzzle))
+        elapsed = time.perf_counter() - start
+        print(f"{ name }: custo { len(path) }, { Puzzle.expandedNodes } nós expandidos, "
+              f"pico de memória de { peak / 1024:.0f} KiB, { elapsed:.2f}s")
+
+# benchmark_memoria()
+
+
 ### Public API
 
 
@@ -541,6 +1075,74 @@ def avalia_astar_h2(estado):
     result = " ".join(map(fnc, puzzle.aStarManhattan()))
     if(result): print(result)
 
+## Pattern databases: sum of the distances of tiles 1-4 and 5-8
+def avalia_astar_pdb(estado):
+    puzzle = Puzzle(estado)
+    assert puzzle.isValid() == True
+    def fnc(element):
+        return f"{ element.description() }"
+
+    result = " ".join(map(fnc, puzzle.aStarPatternDatabase()))
+    if(result): print(result)
+
+# avalia_astar_pdb("123456_78")
+
+## Exact distances of all the 9! states
+def avalia_astar_exata(estado):
+    puzzle = Puzzle(estado)
+    assert puzzle.isValid() == True
+    def fnc(element):
+        return f"{ element.description() }"
+
+    result = " ".join(map(fnc, puzzle.aStarPerfect()))
+    if(result): print(result)
+
+# avalia_astar_exata("123456_78")
+
+## Searches with bounded memory: the path goes to the output as in the others,
+## the expanded nodes and the peak of memory to stderr
+def measureSearch(search):
+    tracemalloc.start()
+    path = search()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return path, peak
+
+def reportSearch(search):
+    path, peak = measureSearch(search)
+    print(f"{ Puzzle.expandedNodes } nós expandidos, pico de memória de { peak / 1024:.1f} KiB", file = sys.stderr)
+    return path
+
+## IDA*, keeping only the current path
+def avalia_idastar(estado):
+    puzzle = Puzzle(estado)
+    assert puzzle.isValid() == True
+    def fnc(element):
+        return f"{ element.description() }"
+
+    result = " ".join(map(fnc, reportSearch(puzzle.idaStarManhattan)))
+    if(result): print(result)
+
+# avalia_idastar("123456_78")
+
+## SMA*, keeping at most limite nodes
+def avalia_astar_limitada(estado, limite = MEMORY_LIMIT):
+    limite = int(limite)
+    puzzle = Puzzle(estado)
+    assert puzzle.isValid() == True
+    def fnc(element):
+        return f"{ element.description() }"
+
+    result = " ".join(map(fnc, reportSearch(lambda: puzzle.boundedAStarManhattan(limite))))
+    if(result): print(result)
+
+# avalia_astar_limitada("123456_78", 1000)
+
+## Generates the distance tables (prepara.sh), so no search has to
+def gera_tabelas():
+    perfectTable()
+    patternDatabases()
+
 # avalia_bfs('2_3541687')
 # avalia_dfs('2_3541687')
 # avalia_astar_h1('2_3541687')
@@ -1,2 +1,3 @@
 #!/bin/bash
-## Não utilizado ja que o codigo não utiliza dependencias externas
\ No newline at end of file
+## O codigo não utiliza dependencias externas, só gera as tabelas de distâncias do A*
+python main.py gera_tabelas
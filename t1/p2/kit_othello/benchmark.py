@@ -0,0 +1,629 @@
+#!/usr/bin/python
+"""
+Benchmarks for the Othello players and boards. Run from the kit directory:
+
+python benchmark.py <benchmark> [options]
+
+Use python benchmark.py -h to list the available benchmarks.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import importlib.util
+
+from common import bitboard
+from common import board
+from common import book
+from common import endgame
+from common import evaluation
+from common import mcts
+from common import ordering
+from common import patterns
+from common import positions
+from common import selfplay
+from common import symmetry
+from common import search as search_driver
+from common import transposition
+from common import zobrist
+
+PLAYERS = ['custom1player', 'custom2player', 'custom3player', 'custom4player']
+
+
+def load_player(directory):
+    """
+    Imports the customplayer.py module of a player directory
+    :param directory: path to the player directory
+    :return: module
+    """
+    name = os.path.basename(os.path.normpath(directory))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, 'customplayer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    # benchmarks search to a fixed depth, never to a time limit
+    module.MAX_RUN_TIME = float('inf')
+    return module
+
+
+class CountingBitBoard(bitboard.BitBoard):
+    """
+    BitBoard that counts the nodes generated by a search (calls to make_move)
+    """
+
+    def __init__(self):
+        super(CountingBitBoard, self).__init__()
+        self.nodes = 0
+
+    def make_move(self, position, color):
+        self.nodes += 1
+        return super(CountingBitBoard, self).make_move(position, color)
+
+
+class CountingBoard(board.Board):
+    """
+    Board that counts the rays it scans looking for brackets
+    (find_bracket and its dual find_where_to_play_from_owned)
+    """
+    scans = 0
+
+    def find_bracket(self, move, color, direction):
+        CountingBoard.scans += 1
+        return super(CountingBoard, self).find_bracket(move, color, direction)
+
+    def find_where_to_play_from_owned(self, owned, color, direction):
+        CountingBoard.scans += 1
+        return super(CountingBoard, self).find_where_to_play_from_owned(owned, color, direction)
+
+
+def counting_board(string):
+    """
+    Builds a CountingBitBoard from the string representation
+    :param string:
+    :return: CountingBitBoard object
+    """
+    b = CountingBitBoard()
+    source = bitboard.from_string(string)
+    b.black, b.white, b.hash = source.black, source.white, source.hash
+    b.piece_count, b.weight_sums = source.piece_count, source.weight_sums
+    return b
+
+
+def search(player, string, color, depth):
+    """
+    Runs the root max_value of a player on a position
+    :return: (value, move, nodes, seconds)
+    """
+    b = counting_board(string)
+    start = time.time()
+    value, move = player.max_value(b, color, -player.INFINITY, player.INFINITY, start, player.MAX_RUN_TIME, depth)
+    return value, move, b.nodes, time.time() - start
+
+
+def deepen(player, string, color, depth):
+    """
+    Searches a position like decide() does, with iterative deepening
+    up to the given depth (and no time limit)
+    :return: (value, move, nodes, seconds)
+    """
+    b = counting_board(string)
+    player.TABLE.new_search()
+    player.ORDERING.new_search(b)
+    start = time.time()
+    for d in range(1, depth + 1):
+        value, move = player.max_value(b, color, -player.INFINITY, player.INFINITY, start, player.MAX_RUN_TIME, d)
+    return value, move, b.nodes, time.time() - start
+
+
+def benchmark_tt(args):
+    """
+    Compares nodes searched with and without the transposition table
+    on the fixed midgame positions
+    """
+    print('%-14s %5s %12s %12s %9s %9s' % ('player', 'depth', 'nodes no TT', 'nodes TT', 'reduction', 'hit rate'))
+    for directory in args.players:
+        player = load_player(directory)
+        nodes = {}
+        for size in [0, args.size]:
+            player.TABLE = transposition.TranspositionTable(size)
+            nodes[size] = 0
+            for string, color in positions.MIDGAME:
+                player.TABLE.new_search()
+                nodes[size] += search(player, string, color, args.depth)[2]
+
+        reduction = 1 - nodes[args.size] / nodes[0]
+        print('%-14s %5d %12d %12d %8.1f%% %8.1f%%' % (
+            directory, args.depth, nodes[0], nodes[args.size], 100 * reduction, 100 * player.TABLE.hit_rate()
+        ))
+
+
+def benchmark_ordering(args):
+    """
+    Compares nodes searched and the ratio of cutoffs caused by the first move
+    with each move ordering component turned on, on the fixed midgame positions
+    """
+    configurations = [
+        ('generation order', dict(static=False, killers=False, history=False, pv=False)),
+        ('static', dict(static=True, killers=False, history=False, pv=False)),
+        ('+killers', dict(static=True, killers=True, history=False, pv=False)),
+        ('+history', dict(static=True, killers=True, history=True, pv=False)),
+        ('+pv', dict(static=True, killers=True, history=True, pv=True)),
+    ]
+
+    print('%-14s %-18s %10s %8s %12s' % ('player', 'ordering', 'nodes', 'seconds', 'first cutoff'))
+    for directory in args.players:
+        player = load_player(directory)
+        for name, components in configurations:
+            player.TABLE = transposition.TranspositionTable()
+            player.ORDERING = ordering.MoveOrdering(**components)
+
+            nodes, seconds = 0, 0
+            for string, color in positions.MIDGAME:
+                result = deepen(player, string, color, args.depth)
+                nodes += result[2]
+                seconds += result[3]
+
+            print('%-14s %-18s %10d %8.2f %11.1f%%' % (
+                directory, name, nodes, seconds, 100 * player.ORDERING.first_cutoff_ratio()
+            ))
+
+
+def random_positions(count, seed=0):
+    """
+    Generates positions of random games (one per ply, every game to its end)
+    :param count: number of positions
+    :param seed:
+    :return: list of (BitBoard, color to move)
+    """
+    rng = random.Random(seed)
+    result = []
+    while len(result) < count:
+        b = bitboard.BitBoard()
+        color = b.BLACK
+        while len(result) < count:
+            moves = b.legal_moves(color)
+            if len(moves) == 0:
+                color = b.opponent(color)
+                moves = b.legal_moves(color)
+                if len(moves) == 0:
+                    break
+            result.append((b.copy(), color))
+            b.process_move(rng.choice(moves), color)
+            color = b.opponent(color)
+    return result
+
+
+def scan_heuristic1(the_board, color):
+    """
+    heuristic1 of custom3player as it was before the incremental weight sums,
+    scanning the string representation of the board at every call
+    """
+    opponent_color = the_board.opponent(color)
+
+    current_score = sum([1 for char in str(the_board) if char == color])
+    opponent_score = sum([1 for char in str(the_board) if char == opponent_color])
+    score_ratio = current_score / opponent_score if opponent_score else current_score
+
+    board_as_string = str(the_board).replace('\n', '')
+
+    current_upper_border_tiles = sum([1 for char in board_as_string[:8] if char == color])
+    current_lower_border_tiles = sum([1 for char in board_as_string[-8:] if char == color])
+    current_left_border_tiles = sum([1 for char in board_as_string[::8] if char == color])
+    current_right_border_tiles = sum([1 for char in board_as_string[7::8] if char == color])
+    current_total_border_tiles = current_upper_border_tiles + current_lower_border_tiles + \
+        current_left_border_tiles + current_right_border_tiles
+
+    opponent_upper_border_tiles = sum([1 for char in board_as_string[:8] if char == opponent_color])
+    opponent_lower_border_tiles = sum([1 for char in board_as_string[-8:] if char == opponent_color])
+    opponent_left_border_tiles = sum([1 for char in board_as_string[::8] if char == opponent_color])
+    opponent_right_border_tiles = sum([1 for char in board_as_string[7::8] if char == opponent_color])
+    opponent_total_border_tiles = opponent_upper_border_tiles + opponent_lower_border_tiles + \
+        opponent_left_border_tiles + opponent_right_border_tiles
+
+    border_ratio = current_total_border_tiles / opponent_total_border_tiles \
+        if opponent_total_border_tiles else current_total_border_tiles
+
+    return score_ratio + border_ratio
+
+
+def scan_heuristic2(the_board, color):
+    """
+    heuristic2 as it was before the incremental weight sums,
+    scanning the string representation of the board at every call
+    """
+    opponent_color = the_board.opponent(color)
+
+    board_as_string = str(the_board).replace('\n', '')
+    current_score = sum([1 for char in board_as_string if char == color])
+    opponent_score = sum([1 for char in board_as_string if char == opponent_color])
+    board_score = current_score - opponent_score
+
+    positions_weight = 0
+    for index, weight in enumerate(evaluation.POSITION_WEIGHTS):
+        board_position = board_as_string[index]
+        if board_position == color:
+            positions_weight += weight
+        elif board_position == opponent_color:
+            positions_weight -= weight
+
+    return 2 * positions_weight + 3 * board_score
+
+
+def benchmark_eval(args):
+    """
+    Compares leaf evaluation throughput of the string-scanning heuristics
+    with the incremental ones of the players, checking they agree
+    """
+    boards = random_positions(args.positions)
+    pairs = [
+        ('heuristic1', scan_heuristic1, load_player('custom3player').heuristic1),
+        ('heuristic2', scan_heuristic2, load_player('custom4player').heuristic2),
+    ]
+
+    print('%-12s %16s %16s %8s' % ('function', 'scan leaves/s', 'incr. leaves/s', 'speedup'))
+    for name, scan, incremental in pairs:
+        for b, color in boards:
+            assert scan(b, color) == incremental(b, color), (name, str(b))
+
+        throughput = []
+        for function in [scan, incremental]:
+            start = time.time()
+            for i in range(args.repeat):
+                for b, color in boards:
+                    function(b, color)
+            throughput.append(args.repeat * len(boards) / (time.time() - start))
+
+        print('%-12s %16.0f %16.0f %7.1fx' % (name, throughput[0], throughput[1], throughput[1] / throughput[0]))
+
+
+def endgame_positions(count, empties, seed=0):
+    """
+    Generates positions of random games with the given number of empty
+    squares where the color to move has a legal move
+    :return: list of (BitBoard, color to move)
+    """
+    rng = random.Random(seed)
+    result = []
+    while len(result) < count:
+        b = bitboard.BitBoard()
+        color = b.BLACK
+        while b.piece_count[b.EMPTY] > empties:
+            moves = b.legal_moves(color)
+            if len(moves) == 0:
+                color = b.opponent(color)
+                moves = b.legal_moves(color)
+                if len(moves) == 0:
+                    break
+            b.process_move(rng.choice(moves), color)
+            color = b.opponent(color)
+        if b.piece_count[b.EMPTY] == empties and b.has_legal_move(color):
+            result.append((b, color))
+    return result
+
+
+def minimax_endgame(the_board, color, passed=False):
+    """
+    Plain minimax to the end of the game, the reference of the endgame solver
+    :return: int, final disc differential for color
+    """
+    moves = the_board.legal_moves(color)
+    opponent = the_board.opponent(color)
+    if len(moves) == 0:
+        if passed:
+            return the_board.piece_count[color] - the_board.piece_count[opponent]
+        return -minimax_endgame(the_board, opponent, True)
+
+    best = -65
+    for move in moves:
+        the_board.make_move(move, color)
+        best = max(best, -minimax_endgame(the_board, opponent))
+        the_board.unmake_move()
+    return best
+
+
+def benchmark_endgame(args):
+    """
+    Measures the endgame solver speed (nodes/s) and the effect of its move
+    ordering on positions of random games, checking it against plain minimax
+    """
+    boards = endgame_positions(args.positions, args.empties)
+
+    if args.empties <= 8:
+        solver = endgame.EndgameSolver()
+        for b, color in boards:
+            assert solver.solve(b, color)[0] == minimax_endgame(b.copy(), color), str(b)
+
+    configurations = [
+        ('no ordering', dict(parity=False, fastest_first=False)),
+        ('parity', dict(parity=True, fastest_first=False)),
+        ('+fastest first', dict(parity=True, fastest_first=True)),
+    ]
+
+    print('%-16s %7s %12s %10s %12s' % ('ordering', 'empties', 'nodes', 'seconds', 'nodes/s'))
+    for name, components in configurations:
+        solver = endgame.EndgameSolver(**components)
+        start = time.time()
+        for b, color in boards:
+            solver.solve(b, color)
+        seconds = time.time() - start
+        print('%-16s %7d %12d %10.2f %12.0f' % (name, args.empties, solver.nodes, seconds, solver.nodes / seconds))
+
+
+def benchmark_parallel(args):
+    """
+    Compares nodes per second and depth reached within a time limit by the
+    serial search and the parallel root splitting with several workers,
+    on the fixed midgame positions
+    """
+    print('%-14s %7s %12s %10s %9s %9s' % ('player', 'workers', 'nodes', 'nodes/s', 'speedup', 'depth'))
+    for directory in args.players:
+        serial_speed = None
+        for workers in args.workers:
+            player = load_player(directory)
+            player.MAX_RUN_TIME = args.time
+            player.PARALLEL.workers = workers
+
+            nodes, seconds, depths = 0, 0, 0
+            for string, color in positions.MIDGAME:
+                b = bitboard.from_string(string)
+                player.TABLE.new_search()
+                player.ORDERING.new_search(b)
+                player.PARALLEL.new_search()
+                before = player.ORDERING.nodes + player.PARALLEL.nodes
+
+                start = time.time()
+                if workers > 1:
+                    root_search = lambda depth: player.PARALLEL.search(b, color, player.min_value, start, args.time, depth)
+                else:
+                    root_search = lambda depth: player.max_value(b, color, -player.INFINITY, player.INFINITY, start, args.time, depth)
+                depths += search_driver.iterative_deepening(root_search, player.MAX_DEPTH, args.time, start)[2]
+                seconds += time.time() - start
+                nodes += player.ORDERING.nodes + player.PARALLEL.nodes - before
+            player.PARALLEL.close()
+
+            speed = nodes / seconds
+            if serial_speed is None:
+                serial_speed = speed
+            print('%-14s %7d %12d %10.0f %8.2fx %9.2f' % (
+                directory, workers, nodes, speed, speed / serial_speed, depths / len(positions.MIDGAME)
+            ))
+
+
+def benchmark_patterns(args):
+    """
+    Plays the learned pattern evaluation against heuristic2, both in the same
+    player searching to a fixed depth, each opening (random plies) with both
+    colors, and compares their leaf evaluation throughput
+    """
+    players = {}
+    for name, weights in [('heuristic2', None), ('patterns', args.weights)]:
+        player = selfplay.load_player(args.player, args.depth)
+        player.PATTERNS = patterns.PatternEvaluator(weights)
+        player.BOOK = book.OpeningBook()
+        players[name] = player
+    if not players['patterns'].PATTERNS.loaded:
+        sys.exit('no weight file at %s' % args.weights)
+
+    rng = random.Random(args.seed)
+    results = {'win': 0, 'loss': 0, 'draw': 0}
+    margin = 0
+    for i in range(args.games):
+        seed = rng.random()
+        for black, white, sign in [('patterns', 'heuristic2', 1), ('heuristic2', 'patterns', -1)]:
+            moves, result = selfplay.play_game(players[black].decide, players[white].decide,
+                                               args.random_plies, random.Random(seed))
+            result *= sign
+            results['win' if result > 0 else 'loss' if result < 0 else 'draw'] += 1
+            margin += result
+
+    games = 2 * args.games
+    print('patterns vs heuristic2 (%s, depth %d): %d wins, %d losses, %d draws, %.1f%% score, %+.2f discs per game' % (
+        args.player, args.depth, results['win'], results['loss'], results['draw'],
+        100.0 * (results['win'] + 0.5 * results['draw']) / games, margin / games
+    ))
+
+    boards = random_positions(2000)
+    for name, player in sorted(players.items()):
+        start = time.time()
+        for b, color in boards:
+            player.utility(b, color)
+        print('%-12s %12.0f leaves/s' % (name, len(boards) / (time.time() - start)))
+
+
+def random_playout(board_class, rng):
+    """
+    Plays a random game on a board of the given class, asking for the legal
+    moves of the color to move (and of its opponent on passes)
+    :return: list of (legal moves, move) of every ply, to compare runs
+    """
+    b = board_class()
+    color = b.BLACK
+    plies = []
+    while True:
+        moves = b.legal_moves(color)
+        if len(moves) == 0:
+            color = b.opponent(color)
+            moves = b.legal_moves(color)
+            if len(moves) == 0:
+                return plies
+        move = rng.choice(moves)
+        plies.append((moves, move))
+        b.process_move(move, color)
+        color = b.opponent(color)
+
+
+def benchmark_legal(args):
+    """
+    Compares the legal move generation of Board rescanning the board after
+    every move with its incremental update, over the same random playouts
+    """
+    class RescanningBoard(CountingBoard):
+        INCREMENTAL = False
+
+    print('%-12s %14s %14s %12s' % ('board', 'scans/game', 'scans/ply', 'games/s'))
+    results = {}
+    for name, board_class in [('rescanning', RescanningBoard), ('incremental', CountingBoard)]:
+        CountingBoard.scans = 0
+        rng = random.Random(args.seed)
+        start = time.time()
+        results[name] = [random_playout(board_class, rng) for i in range(args.games)]
+        elapsed = time.time() - start
+
+        plies = sum(len(game) for game in results[name])
+        print('%-12s %14.0f %14.1f %12.1f' % (
+            name, CountingBoard.scans / args.games, CountingBoard.scans / plies, args.games / elapsed
+        ))
+    assert results['rescanning'] == results['incremental']
+
+
+def benchmark_mcts(args):
+    """
+    Measures the playouts per second of the MCTS engine for each playout
+    policy, with and without RAVE, by game phase, and how many visits the
+    tree reuse keeps over a game between two engines
+    """
+    boards = random_positions(2000, args.seed)
+    phases = [(50, 60), (35, 49), (20, 34), (0, 19)]
+    sample = {}
+    for low, high in phases:
+        candidates = [(b, color) for b, color in boards if low <= b.piece_count[b.EMPTY] <= high]
+        sample[low, high] = random.Random(args.seed).sample(candidates, min(args.positions, len(candidates)))
+
+    print('%-8s %-5s %s %10s %12s' % ('policy', 'rave', ' '.join('%4d-%-4d' % p for p in phases),
+                                      'overall', 'per %gs' % args.delay))
+    for policy in mcts.POLICIES:
+        for rave in [False, True]:
+            rates, playouts, elapsed = [], 0, 0.0
+            for phase in phases:
+                engine = mcts.MCTS(rave=rave, policy=policy, seed=args.seed)
+                start = time.time()
+                for b, color in sample[phase]:
+                    engine.root = None
+                    engine.search(b, color, time_limit=args.time)
+                seconds = time.time() - start
+                rates.append(engine.playouts / seconds)
+                playouts += engine.playouts
+                elapsed += seconds
+            print('%-8s %-5s %s %10.0f %12.0f' % (policy, 'yes' if rave else 'no', ' '.join('%9.0f' % r for r in rates),
+                                                  playouts / elapsed, args.delay * playouts / elapsed))
+
+    engines = [mcts.MCTS(rave=True, seed=args.seed), mcts.MCTS(rave=True, seed=args.seed + 1)]
+    players = [lambda b, color, e=e: e.search(b, color, time_limit=args.time) for e in engines]
+    moves, result = selfplay.play_game(players[0], players[1])
+    print('tree reuse over a game (%d plies, %.1fs per move): %.1f%% of the visits kept from the previous move' % (
+        len(moves), args.time, 100.0 * sum(e.reused_visits for e in engines) / sum(e.playouts for e in engines)
+    ))
+
+
+def permuted_bits(bits, s):
+    """
+    Applies a symmetry to a bitboard square by square with symmetry.PERMUTATIONS
+    """
+    permutation = symmetry.PERMUTATIONS[s]
+    result = 0
+    while bits:
+        low = bits & -bits
+        result |= 1 << permutation[low.bit_length() - 1]
+        bits ^= low
+    return result
+
+
+def permuted_canonical(black, white):
+    """
+    symmetry.canonical with square by square transforms
+    """
+    return min((permuted_bits(black, s), permuted_bits(white, s), s) for s in symmetry.SYMMETRIES)
+
+
+def benchmark_symmetry(args):
+    """
+    Compares canonicalization with square by square permutations and with
+    the bit tricks of common.symmetry, checking they agree, and measures the
+    board and move helpers
+    """
+    boards = random_positions(args.positions)
+    for b, color in boards:
+        assert symmetry.canonical(b.black, b.white) == permuted_canonical(b.black, b.white), str(b)
+        for s in symmetry.SYMMETRIES:
+            image = symmetry.transform_board(b, s)
+            assert image.hash == bitboard.from_string(str(image)).hash, str(b)
+            assert sorted(image.legal_moves(color)) == \
+                sorted(symmetry.transform_move(m, s) for m in b.legal_moves(color)), str(b)
+
+    timings = [
+        ('canonical, permutations', lambda b: permuted_canonical(b.black, b.white)),
+        ('canonical, bit tricks', lambda b: symmetry.canonical(b.black, b.white)),
+        ('transform_board', lambda b: symmetry.transform_board(b, symmetry.ROTATE_90)),
+        ('zobrist hash of the canonical form', lambda b: zobrist.hash_bits(*symmetry.canonical(b.black, b.white)[:2])),
+    ]
+    for name, function in timings:
+        start = time.time()
+        for i in range(args.repeat):
+            for b, color in boards:
+                function(b)
+        elapsed = time.time() - start
+        print('%-36s %8.2f us/position' % (name, 1e6 * elapsed / (args.repeat * len(boards))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Othello benchmarks.')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    tt_parser = subparsers.add_parser('tt', help='Transposition table hit rate and node reduction.')
+    tt_parser.add_argument('-d', '--depth', type=int, default=4, help='Search depth.')
+    tt_parser.add_argument('-s', '--size', type=int, default=transposition.DEFAULT_SIZE,
+                           help='Number of slots of the table (power of two).')
+    tt_parser.add_argument('players', nargs='*', default=PLAYERS, help='Player directories.')
+    tt_parser.set_defaults(function=benchmark_tt)
+
+    ordering_parser = subparsers.add_parser('ordering', help='Move ordering: nodes and cutoffs at the first move.')
+    ordering_parser.add_argument('-d', '--depth', type=int, default=4, help='Search depth (iterative deepening).')
+    ordering_parser.add_argument('players', nargs='*', default=PLAYERS, help='Player directories.')
+    ordering_parser.set_defaults(function=benchmark_ordering)
+
+    eval_parser = subparsers.add_parser('eval', help='Leaf evaluation throughput, scanning vs incremental.')
+    eval_parser.add_argument('-n', '--positions', type=int, default=2000, help='Number of random positions.')
+    eval_parser.add_argument('-r', '--repeat', type=int, default=5, help='Evaluations of each position.')
+    eval_parser.set_defaults(function=benchmark_eval)
+
+    endgame_parser = subparsers.add_parser('endgame', help='Endgame solver speed and move ordering.')
+    endgame_parser.add_argument('-e', '--empties', type=int, default=10, help='Empty squares of the positions.')
+    endgame_parser.add_argument('-n', '--positions', type=int, default=10, help='Number of random positions.')
+    endgame_parser.set_defaults(function=benchmark_endgame)
+
+    parallel_parser = subparsers.add_parser('parallel', help='Parallel root splitting: nodes/s and depth per worker count.')
+    parallel_parser.add_argument('-t', '--time', type=float, default=3.0, help='Seconds per position.')
+    parallel_parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts.')
+    parallel_parser.add_argument('players', nargs='*', default=PLAYERS, help='Player directories.')
+    parallel_parser.set_defaults(function=benchmark_parallel)
+
+    patterns_parser = subparsers.add_parser('patterns', help='Learned pattern weights against heuristic2, head to head.')
+    patterns_parser.add_argument('weights', help='Weight file (see common.training).')
+    patterns_parser.add_argument('-p', '--player', default='custom4player', help='Player directory.')
+    patterns_parser.add_argument('-n', '--games', type=int, default=20, help='Openings, each played with both colors.')
+    patterns_parser.add_argument('-d', '--depth', type=int, default=3, help='Search depth.')
+    patterns_parser.add_argument('-r', '--random-plies', type=int, default=6, help='Random plies of each opening.')
+    patterns_parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed.')
+    patterns_parser.set_defaults(function=benchmark_patterns)
+
+    mcts_parser = subparsers.add_parser('mcts', help='MCTS playouts per second by policy, RAVE and game phase.')
+    mcts_parser.add_argument('-t', '--time', type=float, default=1.0, help='Seconds per position.')
+    mcts_parser.add_argument('-n', '--positions', type=int, default=5, help='Positions per game phase.')
+    mcts_parser.add_argument('-d', '--delay', type=float, default=3.0, help='Move time of the players (server delay).')
+    mcts_parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed.')
+    mcts_parser.set_defaults(function=benchmark_mcts)
+
+    legal_parser = subparsers.add_parser('legal', help='Board legal moves, rescanning vs incremental: rays scanned.')
+    legal_parser.add_argument('-n', '--games', type=int, default=200, help='Number of random playouts.')
+    legal_parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed.')
+    legal_parser.set_defaults(function=benchmark_legal)
+
+    symmetry_parser = subparsers.add_parser('symmetry', help='Canonicalization over the 8 board symmetries.')
+    symmetry_parser.add_argument('-n', '--positions', type=int, default=2000, help='Number of random positions.')
+    symmetry_parser.add_argument('-r', '--repeat', type=int, default=5, help='Repetitions per position.')
+    symmetry_parser.set_defaults(function=benchmark_symmetry)
+
+    args = parser.parse_args()
+    args.function(args)
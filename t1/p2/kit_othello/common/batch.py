@@ -0,0 +1,249 @@
+"""
+Many boards at once, for self-play data generation and tournament analysis:
+an (N, 8, 8) numpy array indexed [board, row, col] like Board.tiles, with
+BLACK = 1, WHITE = -1 and EMPTY = 0. Legal moves, move application and disc
+counts follow common.board.Board, computed for all boards with array
+operations instead of a python loop per board.
+
+Requires numpy, which the players themselves do not need. Checking the batch
+against Board on random games:
+
+python -m common.batch [-n boards] [-s seed]
+"""
+import random
+import argparse
+
+import numpy as np
+
+from common import board
+
+BLACK = 1
+WHITE = -1
+EMPTY = 0
+
+# tile character of Board -> value in the arrays, and back
+CODES = {board.Board.BLACK: BLACK, board.Board.WHITE: WHITE, board.Board.EMPTY: EMPTY}
+CHARS = {value: char for char, value in CODES.items()}
+
+# (dx, dy) as in Board.DIRECTIONS
+DIRECTIONS = board.Board.DIRECTIONS
+
+
+def shift(masks, direction):
+    """
+    Moves every set square of the masks one square in the given direction,
+    dropping the ones that would leave the board
+    :param masks: bool array (N, 8, 8)
+    :param direction: (dx, dy)
+    :return: bool array (N, 8, 8)
+    """
+    dx, dy = direction
+    result = np.zeros_like(masks)
+    result[:, max(dy, 0):8 + min(dy, 0), max(dx, 0):8 + min(dx, 0)] = \
+        masks[:, max(-dy, 0):8 + min(-dy, 0), max(-dx, 0):8 + min(-dx, 0)]
+    return result
+
+
+class BoardBatch(object):
+    """
+    N Othello boards stored in a single (N, 8, 8) int8 array
+    """
+
+    def __init__(self, tiles):
+        """
+        :param tiles: array (N, 8, 8) with BLACK, WHITE and EMPTY values
+        """
+        self.tiles = np.asarray(tiles, dtype=np.int8)
+        if self.tiles.ndim != 3 or self.tiles.shape[1:] != (8, 8):
+            raise ValueError('tiles must have shape (N, 8, 8), not %s' % (self.tiles.shape,))
+
+    @classmethod
+    def initial(cls, n):
+        """
+        Returns n boards in the initial position
+        :param n: int
+        :return: BoardBatch object
+        """
+        return cls.from_boards([board.Board()] * n)
+
+    @classmethod
+    def from_boards(cls, boards):
+        """
+        Builds a batch from boards (Board, BitBoard or anything whose str()
+        is the state.txt representation)
+        :param boards: list of board objects
+        :return: BoardBatch object
+        """
+        tiles = np.zeros((len(boards), 8, 8), dtype=np.int8)
+        for i, b in enumerate(boards):
+            for lineno, line in enumerate(str(b).split('\n')[:8]):
+                tiles[i, lineno] = [CODES[char] for char in line]
+        return cls(tiles)
+
+    def to_boards(self):
+        """
+        Returns the boards as Board objects
+        :return: list of Board objects
+        """
+        return [board.from_string(self.board_string(i)) for i in range(len(self))]
+
+    def board_string(self, index):
+        """
+        Returns the string representation of one board (same format of Board.__str__)
+        :param index: int
+        :return: str
+        """
+        return ''.join('%s\n' % ''.join(CHARS[value] for value in row) for row in self.tiles[index])
+
+    def __len__(self):
+        return self.tiles.shape[0]
+
+    def _colors(self, colors):
+        """
+        Returns the values of the colors to move, shaped to broadcast over the tiles
+        :param colors: Board.BLACK or Board.WHITE, or a sequence with one of them per board
+        :return: int8 array (N, 1, 1)
+        """
+        if isinstance(colors, str):
+            colors = [colors] * len(self)
+        if len(colors) != len(self):
+            raise ValueError('expected %d colors, got %d' % (len(self), len(colors)))
+        if any(color not in (board.Board.BLACK, board.Board.WHITE) for color in colors):
+            raise ValueError('Move must be made by BLACK or WHITE player')
+        return np.array([CODES[color] for color in colors], dtype=np.int8).reshape(-1, 1, 1)
+
+    def legal_moves_mask(self, colors):
+        """
+        Returns the legal moves of each board for its color to move
+        :param colors: Board.BLACK or Board.WHITE, or a sequence with one of them per board
+        :return: bool array (N, 8, 8), True at [i, y, x] if (x, y) is legal in board i
+        """
+        codes = self._colors(colors)
+        own = self.tiles == codes
+        opp = self.tiles == -codes
+        empty = self.tiles == EMPTY
+
+        moves = np.zeros_like(empty)
+        for direction in DIRECTIONS:
+            # runs of opponent discs starting next to an own disc
+            candidates = shift(own, direction) & opp
+            # a line has at most 6 opponent discs between the move and the bracket
+            for i in range(5):
+                candidates |= shift(candidates, direction) & opp
+            moves |= shift(candidates, direction) & empty
+        return moves
+
+    def has_legal_move(self, colors):
+        """
+        Returns whether each board has a legal move for its color to move
+        :param colors: Board.BLACK or Board.WHITE, or a sequence with one of them per board
+        :return: bool array (N,)
+        """
+        return self.legal_moves_mask(colors).any(axis=(1, 2))
+
+    def process_moves(self, moves, colors):
+        """
+        Plays one move in each board. Illegal moves (and passes, given as
+        (-1, -1)) leave their board unchanged, like Board.process_move
+        :param moves: int array (N, 2) of (x, y)
+        :param colors: Board.BLACK or Board.WHITE, or a sequence with one of them per board
+        :return: bool array (N,), whether the move of each board was played
+        """
+        moves = np.asarray(moves, dtype=np.int64).reshape(len(self), 2)
+        codes = self._colors(colors)
+        rows = np.arange(len(self))
+
+        inside = (moves >= 0).all(axis=1) & (moves < 8).all(axis=1)
+        placed = np.zeros(self.tiles.shape, dtype=bool)
+        placed[rows[inside], moves[inside, 1], moves[inside, 0]] = True
+        placed &= self.legal_moves_mask(colors)
+        played = placed.any(axis=(1, 2))
+
+        own = self.tiles == codes
+        opp = self.tiles == -codes
+        flips = np.zeros_like(placed)
+        for direction in DIRECTIONS:
+            cursor = shift(placed, direction) & opp
+            line = cursor.copy()
+            for i in range(6):
+                cursor = shift(cursor, direction)
+                # the run of opponent discs ends on an own disc: it is bracketed
+                closed = (cursor & own).any(axis=(1, 2))
+                flips[closed] |= line[closed]
+                cursor &= opp
+                if not cursor.any():
+                    break
+                line |= cursor
+
+        self.tiles = np.where(placed | flips, codes, self.tiles).astype(np.int8)
+        return played
+
+    def piece_count(self):
+        """
+        Returns the number of tiles of each kind in each board
+        :return: dict Board.BLACK/WHITE/EMPTY -> int array (N,)
+        """
+        return {char: (self.tiles == value).sum(axis=(1, 2)) for char, value in CODES.items()}
+
+
+def batch_tests(boards=64, seed=0):
+    """
+    Plays random games on Board objects and on a batch at the same time,
+    checking that both agree on every legal move, tile and count
+    :param boards: number of games played at once
+    :param seed:
+    :return:
+    """
+    rng = random.Random(seed)
+    games = [board.Board() for i in range(boards)]
+    batch = BoardBatch.from_boards(games)
+    colors = [board.Board.BLACK] * boards
+
+    def assert_same(games, batch, colors):
+        masks = batch.legal_moves_mask(colors)
+        counts = batch.piece_count()
+        for i, (b, color) in enumerate(zip(games, colors)):
+            assert batch.board_string(i) == str(b), i
+            assert set(zip(*np.nonzero(masks[i])[::-1])) == set(b.legal_moves(color)), i
+            for char in CODES:
+                assert counts[char][i] == b.piece_count[char], (i, char)
+
+    def assert_lossless(batch):
+        again = BoardBatch.from_boards(batch.to_boards())
+        assert (again.tiles == batch.tiles).all()
+
+    moves_played = 0
+    while True:
+        assert_same(games, batch, colors)
+        assert_lossless(batch)
+
+        moves = []
+        for i, b in enumerate(games):
+            if not b.has_legal_move(colors[i]):
+                colors[i] = b.opponent(colors[i])
+            legal = b.legal_moves(colors[i])
+            moves.append(rng.choice(legal) if legal else (-1, -1))
+        if all(move == (-1, -1) for move in moves):
+            break
+
+        played = batch.process_moves(moves, colors)
+        for i, b in enumerate(games):
+            assert played[i] == b.process_move(moves[i], colors[i]) if moves[i] != (-1, -1) else not played[i]
+            colors[i] = b.opponent(colors[i])
+        moves_played += int(played.sum())
+
+        # illegal moves are rejected without changing the boards
+        before = batch.tiles.copy()
+        assert not batch.process_moves([(0, 0) if b.tiles[0][0] != b.EMPTY else (-1, -1) for b in games], colors).any()
+        assert (batch.tiles == before).all()
+
+    print('%d games (%d moves) played in a batch, all agree with Board.' % (boards, moves_played))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Checks BoardBatch against Board on random games.')
+    parser.add_argument('-n', '--boards', type=int, default=64, help='Number of games played at once.')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed.')
+    args = parser.parse_args()
+
+    batch_tests(args.boards, args.seed)
@@ -0,0 +1,455 @@
+from common import evaluation
+from common import zobrist
+
+
+def from_file(path_to_file):
+    """
+    Generates a bitboard from the string representation
+    contained in the file
+    :param path_to_file:
+    :return: BitBoard object
+    """
+    return from_string(open(path_to_file).read())
+
+
+def from_string(string):
+    """
+    Generates a bitboard from the string representation
+    (same format produced by Board.__str__)
+    :param string:
+    :return: BitBoard object
+    """
+    b = BitBoard()
+    b.black, b.white = 0, 0
+    b.piece_count = {b.BLACK: 0, b.WHITE: 0, b.EMPTY: 0}
+
+    for lineno, line in enumerate(string.split('\n')):
+        for colno, col in enumerate(line):
+            bit = 1 << (lineno * 8 + colno)
+            if col == b.BLACK:
+                b.black |= bit
+            elif col == b.WHITE:
+                b.white |= bit
+            b.piece_count[col] += 1
+
+    b.hash = zobrist.hash_rows(b.rows())
+    b.weight_sums = evaluation.weight_sums(b.rows())
+    return b
+
+
+def popcount(bits):
+    """
+    Returns the number of set bits in a 64-bit integer
+    (int.bit_count is only available from python 3.10 on)
+    :param bits: int
+    :return: int
+    """
+    return bin(bits).count('1')
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+
+
+# all 64 squares set (python ints are unbounded, every mask keeps shifts within 64 bits)
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# masks that clear the column a horizontal/diagonal shift would wrap into
+NOT_COL_0 = 0xFEFEFEFEFEFEFEFE
+NOT_COL_7 = 0x7F7F7F7F7F7F7F7F
+INNER_COLS = NOT_COL_0 & NOT_COL_7
+
+
+def shift(bits, direction):
+    """
+    Shifts every disc of the bitboard one square in the given direction,
+    dropping the ones that would leave the board
+    :param bits: int, bitboard (bit index = row * 8 + col)
+    :param direction: one of BitBoard.DIRECTIONS
+    :return: int
+    """
+    amount, mask = direction
+    if amount > 0:
+        return (bits << amount) & mask
+    return (bits >> -amount) & mask
+
+
+def moves_mask(own, opp):
+    """
+    Returns a bitboard with the legal moves of the player whose discs are own,
+    computed with parallel prefix (Kogge-Stone) flood fills in the eight directions
+    :param own: int, bitboard of the player to move
+    :param opp: int, bitboard of the opponent
+    :return: int
+    """
+    # opponent discs on the edge columns never bracket horizontally or diagonally,
+    # leaving them out also stops the fills from wrapping around the board
+    inner = opp & INNER_COLS
+    moves = 0
+
+    for amount, o in ((1, inner), (8, opp), (7, inner), (9, inner)):
+        double = amount + amount
+
+        # a line has at most 6 opponent discs between the move and the bracket
+        fill = o & (own << amount)
+        fill |= o & (fill << amount)
+        pairs = o & (o << amount)
+        fill |= pairs & (fill << double)
+        fill |= pairs & (fill << double)
+        moves |= fill << amount
+
+        fill = o & (own >> amount)
+        fill |= o & (fill >> amount)
+        pairs = o & (o >> amount)
+        fill |= pairs & (fill >> double)
+        fill |= pairs & (fill >> double)
+        moves |= fill >> amount
+
+    return moves & ~(own | opp) & FULL
+
+
+def flips(own, opp, index):
+    """
+    Returns a bitboard with the discs flipped if the player whose discs
+    are own plays at square index. Does not check whether it is empty.
+
+    Unlike moves_mask this walks the precomputed RAYS instead of filling
+    each direction with shifts: a single square only needs the few discs
+    next to it, and per-direction shift/mask fills (even skipping the
+    directions with no adjacent opponent disc) measured 1.7x slower on
+    CPython than stopping each ray at the first non-opponent square.
+    :param own: int, bitboard of the player to move
+    :param opp: int, bitboard of the opponent
+    :param index: int, y * 8 + x
+    :return: int
+    """
+    result = 0
+    for ray in RAYS[index]:
+        line = 0
+        for bit in ray:
+            if bit & opp:
+                line |= bit
+            else:
+                if bit & own:
+                    result |= line
+                break
+    return result
+
+
+class BitBoard(object):
+    """
+    Drop-in replacement for common.board.Board backed by two 64-bit integers,
+    one per color. Square (x, y) is stored in bit y * 8 + x, so moves keep the
+    same (x, y) convention of Board (x grows to the right, y grows downwards).
+    """
+
+    BLACK = 'B'
+    WHITE = 'W'
+    EMPTY = '.'
+
+    # direction of neighbor tiles as (shift amount, mask applied after the shift)
+    UP = (-8, FULL)
+    DOWN = (8, FULL)
+    LEFT = (-1, NOT_COL_7)
+    RIGHT = (1, NOT_COL_0)
+    UP_LEFT = (-9, NOT_COL_7)
+    UP_RIGHT = (-7, NOT_COL_0)
+    DOWN_LEFT = (7, NOT_COL_7)
+    DOWN_RIGHT = (9, NOT_COL_0)
+
+    # list with all directions
+    DIRECTIONS = [UP, DOWN, LEFT, RIGHT, UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT]
+
+    def __init__(self):
+        """
+        Initializes the 8x8 board with all tiles empty, except the center
+        that are initialized according to othello's initial board
+        :return:
+        """
+        # (3,3) and (4,4) are white, (4,3) and (3,4) are black
+        self.white = (1 << 27) | (1 << 36)
+        self.black = (1 << 28) | (1 << 35)
+
+        # cache legal moves in attempt to reduce function calls
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+
+        self.piece_count = {self.BLACK: 2, self.WHITE: 2, self.EMPTY: 60}
+
+        # zobrist hash of the position, updated incrementally by every move
+        self.hash = zobrist.hash_rows(self.rows())
+
+        # sums of the weight tables of common.evaluation per color, also incremental
+        self.weight_sums = evaluation.weight_sums(self.rows())
+
+        # moves performed with make_move, with what is needed to undo them
+        self._undo_stack = []
+
+    def copy(self):
+        """
+        Returns an independent copy of this board, much cheaper than
+        from_string(str(board)). The undo history is not copied.
+        :return: BitBoard object
+        """
+        other = BitBoard.__new__(BitBoard)
+        other.black, other.white = self.black, self.white
+        other._legal_moves = dict(self._legal_moves)
+        other.piece_count = dict(self.piece_count)
+        other.hash = self.hash
+        other.weight_sums = {self.BLACK: self.weight_sums[self.BLACK][:], self.WHITE: self.weight_sums[self.WHITE][:]}
+        other._undo_stack = []
+        return other
+
+    def own_and_opponent(self, color):
+        """
+        Returns the bitboards of the given color and of its opponent
+        :param color:
+        :return: (int, int)
+        """
+        if color == self.BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
+    def is_within_bounds(self, move):
+        """
+        Returns whether the move refers to a valid board position
+        :param move: (int, int)
+        :return: bool
+        """
+        return 0 <= move[0] < 8 and 0 <= move[1] < 8
+
+    def is_legal(self, move, color):
+        """
+        Returns whether the move is legal for the given color
+        :param move: (int,int) tile position to place the disk
+        :param color: color of the player making the move
+        :return: bool
+        """
+        # as in Board.is_legal, move is queried row,col but stored col,row in legal_moves
+        return (move[1], move[0]) in self.legal_moves(color)
+
+    def legal_moves_mask(self, color):
+        """
+        Returns a bitboard with all legal moves for the given color
+        :param color:
+        :return: int
+        """
+        own, opp = self.own_and_opponent(color)
+        return moves_mask(own, opp)
+
+    def flips_mask(self, position, color):
+        """
+        Returns a bitboard with the discs flipped if color plays at position.
+        Does not check whether the position is empty.
+        :param position: (int, int) x, y of the move
+        :param color:
+        :return: int
+        """
+        own, opp = self.own_and_opponent(color)
+        return flips(own, opp, position[1] * 8 + position[0])
+
+    def process_move(self, position, color):
+        """
+        Executes the placement of a tile of a given color
+        in a given position
+        :param position:
+        :param color:
+        :return: bool
+        """
+        return self._place(position, color) is not None
+
+    def make_move(self, position, color):
+        """
+        Same as process_move, but records the flipped discs
+        so that the move can be reverted with unmake_move
+        :param position:
+        :param color:
+        :return: bool
+        """
+        legal_moves = self._legal_moves[self.BLACK], self._legal_moves[self.WHITE]
+        previous_hash = self.hash
+        previous_sums = self.weight_sums[self.BLACK][:], self.weight_sums[self.WHITE][:]
+
+        flips = self._place(position, color)
+        if flips is None:
+            return False
+
+        self._undo_stack.append((position, color, flips, legal_moves, previous_hash, previous_sums))
+        return True
+
+    def unmake_move(self):
+        """
+        Reverts the last move performed with make_move
+        :return:
+        """
+        position, color, flips, legal_moves, self.hash, previous_sums = self._undo_stack.pop()
+        self.weight_sums[self.BLACK], self.weight_sums[self.WHITE] = previous_sums
+        move = 1 << (position[1] * 8 + position[0])
+        flipped = popcount(flips)
+
+        if color == self.BLACK:
+            self.black &= ~(move | flips)
+            self.white |= flips
+        else:
+            self.white &= ~(move | flips)
+            self.black |= flips
+
+        self.piece_count[color] -= 1 + flipped
+        self.piece_count[self.opponent(color)] += flipped
+        self.piece_count[self.EMPTY] += 1
+
+        # the legal moves cached before the move are valid again
+        self._legal_moves[self.BLACK], self._legal_moves[self.WHITE] = legal_moves
+
+    def _place(self, position, color):
+        """
+        Places the disc and flips the bracketed ones
+        :param position: (int, int) x, y of the move
+        :param color:
+        :return: int, bitboard of flipped discs, or None if the move is illegal
+        """
+        if color not in [self.WHITE, self.BLACK]:
+            raise ValueError("Move must be made by BLACK or WHITE player")
+
+        if not self.is_legal((position[1], position[0]), color):
+            return None  # guards against illegal moves
+
+        move = 1 << (position[1] * 8 + position[0])
+        flips = self.flips_mask(position, color)
+        flipped = popcount(flips)
+
+        if color == self.BLACK:
+            self.black |= move | flips
+            self.white &= ~flips
+        else:
+            self.white |= move | flips
+            self.black &= ~flips
+
+        self.piece_count[color] += 1 + flipped
+        self.piece_count[self.opponent(color)] -= flipped
+        self.piece_count[self.EMPTY] -= 1
+
+        # updates the hash and weight sums only for the placed and flipped squares
+        index = position[1] * 8 + position[0]
+        own_sums, opp_sums = self.weight_sums[color], self.weight_sums[self.opponent(color)]
+        self.hash ^= zobrist.KEYS[color][index]
+        for t, table in enumerate(evaluation.TABLES):
+            own_sums[t] += table[index]
+
+        remaining = flips
+        while remaining:
+            lowest = remaining & -remaining
+            index = lowest.bit_length() - 1
+            self.hash ^= zobrist.FLIP_KEYS[index]
+            for t, table in enumerate(evaluation.TABLES):
+                own_sums[t] += table[index]
+                opp_sums[t] -= table[index]
+            remaining ^= lowest
+
+        # resets legal moves
+        self._legal_moves[self.BLACK], self._legal_moves[self.WHITE] = None, None
+        return flips
+
+    def legal_moves(self, color):
+        """
+        Returns a list of legal moves for the given color
+        :param color:
+        :return: list of (int, int)
+        """
+        if self._legal_moves[color] is None:
+            # construct the list of legal moves only once
+            moves = []
+            mask = self.legal_moves_mask(color)
+            while mask:
+                lowest = mask & -mask
+                index = lowest.bit_length() - 1
+                moves.append((index & 7, index >> 3))
+                mask ^= lowest
+            self._legal_moves[color] = moves
+
+        return self._legal_moves[color]
+
+    def has_legal_move(self, color):
+        """
+        Returns whether the given color has any legal move
+        :param color:
+        :return:bool
+        """
+        return self.legal_moves_mask(color) != 0
+
+    def opponent(self, color):
+        """
+        Returns the opponent of the received color
+        :param color:
+        :return:
+        """
+        if color == self.EMPTY:
+            raise ValueError('Empty has no opponent.')
+
+        if color == self.WHITE:
+            return self.BLACK
+        else:
+            return self.WHITE
+
+    def rows(self):
+        """
+        Returns the board as a list of eight strings, one per row
+        :return: list of str
+        """
+        rows = []
+        for y in range(8):
+            row = ''
+            for x in range(8):
+                bit = 1 << (y * 8 + x)
+                row += self.BLACK if self.black & bit else self.WHITE if self.white & bit else self.EMPTY
+            rows.append(row)
+        return rows
+
+    def print_board(self):
+        """
+        Prints the string representation of the board
+        :return:
+        """
+
+        print(self.decorated_str())
+
+    def decorated_str(self):
+        """
+        Returns the string representation of the board
+        decorated with coordinates for board positions
+        :return: str
+        """
+        string = 'x 01234567\n'
+        for i, row in enumerate(self.rows()):
+            string += '%d %s\n' % (i, row)
+
+        return string
+
+    def __str__(self):
+        """
+        Returns the string representation of the board
+        :return: str
+        """
+        return ''.join('%s\n' % row for row in self.rows())
+
+
+def _ray(index, direction):
+    """
+    Returns the bits of the squares from index (exclusive) to the edge of the board
+    :param index: int
+    :param direction: one of BitBoard.DIRECTIONS
+    :return: list of int
+    """
+    ray = []
+    cursor = shift(1 << index, direction)
+    while cursor:
+        ray.append(cursor)
+        cursor = shift(cursor, direction)
+    return ray
+
+
+# RAYS[i] lists, for each direction with at least two squares
+# (a bracket needs an opponent disc and an own one), the squares seen from i
+RAYS = [
+    [ray for ray in (_ray(i, direction) for direction in BitBoard.DIRECTIONS) if len(ray) >= 2]
+    for i in range(64)
+]
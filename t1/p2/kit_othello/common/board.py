@@ -1,3 +1,7 @@
+from common import evaluation
+from common import zobrist
+
+
 def from_file(path_to_file):
     """
     Generates a board from the string representation
@@ -24,11 +28,28 @@ def from_string(string):
             b.tiles[lineno][colno] = col
             b.piece_count[col] += 1
 
+    b.hash = zobrist.hash_rows(b.tiles)
+    b.weight_sums = evaluation.weight_sums(b.tiles)
+    b.reset_legal_moves()
     return b
 
 
+def _neighbors(square):
+    """
+    Returns the squares adjacent to a square
+    :param square: (row, col)
+    :return: list of (row, col)
+    """
+    row, col = square
+    return [(row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+            if (dr or dc) and 0 <= row + dr <= 7 and 0 <= col + dc <= 7]
+
+
+SQUARES = [(row, col) for row in range(8) for col in range(8)]
+NEIGHBORS = {square: _neighbors(square) for square in SQUARES}
+
+
 # TODO:create and test is_endgame
-# TODO:create list of legal moves on __init__ and update it on process_move
 class Board(object):
     """
     Board implementation strongly inspired by: http://dhconnelly.com/paip-python/docs/paip/othello.html
@@ -51,6 +72,12 @@ class Board(object):
     # list with all directions
     DIRECTIONS = [UP, DOWN, LEFT, RIGHT, UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT]
 
+    # OPPOSITES[i] is the index of the direction opposite to DIRECTIONS[i]
+    OPPOSITES = [1, 0, 3, 2, 7, 6, 5, 4]
+
+    # whether legal moves are updated after a move (False rescans the board, see benchmark.py)
+    INCREMENTAL = True
+
     def __init__(self):
         """
         Initializes the 8x8 board with all tiles empty, except the center
@@ -63,10 +90,38 @@ class Board(object):
         self.tiles[4][3], self.tiles[4][4] = self.BLACK, self.WHITE
 
         # cache legal moves in attempt to reduce function calls
-        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+        self.reset_legal_moves()
 
         self.piece_count = {self.BLACK: 2, self.WHITE: 2, self.EMPTY: 60}
 
+        # zobrist hash of the position, updated incrementally by every move
+        self.hash = zobrist.hash_rows(self.tiles)
+
+        # sums of the weight tables of common.evaluation per color, also incremental
+        self.weight_sums = evaluation.weight_sums(self.tiles)
+
+        # moves performed with make_move, with what is needed to undo them
+        self._undo_stack = []
+
+    def copy(self):
+        """
+        Returns an independent copy of this board, much cheaper than
+        from_string(str(board)). The undo history is not copied.
+        :return: Board object
+        """
+        other = Board.__new__(Board)
+        other.tiles = [row[:] for row in self.tiles]
+        other._legal_moves = dict(self._legal_moves)
+        # the frontier and bracket sets are replaced, never changed in place, so they can be shared
+        other._frontier = self._frontier
+        other._brackets = dict(self._brackets)
+        other._dirty = dict(self._dirty)
+        other.piece_count = dict(self.piece_count)
+        other.hash = self.hash
+        other.weight_sums = {self.BLACK: self.weight_sums[self.BLACK][:], self.WHITE: self.weight_sums[self.WHITE][:]}
+        other._undo_stack = []
+        return other
+
     def is_within_bounds(self, move):
         """
         Returns whether the move refers to a valid board position
@@ -157,27 +212,111 @@ class Board(object):
         :return: bool
         """
 
+        return self._place(position, color) is not None
+
+    def make_move(self, position, color):
+        """
+        Same as process_move, but records the flipped tiles
+        so that the move can be reverted with unmake_move
+        :param position:
+        :param color:
+        :return: bool
+        """
+        legal_caches = dict(self._legal_moves), dict(self._brackets), dict(self._dirty), self._frontier
+        previous_hash = self.hash
+        previous_sums = self.weight_sums[self.BLACK][:], self.weight_sums[self.WHITE][:]
+
+        flipped = self._place(position, color)
+        if flipped is None:
+            return False
+
+        self._undo_stack.append((position, color, flipped, legal_caches, previous_hash, previous_sums))
+        return True
+
+    def unmake_move(self):
+        """
+        Reverts the last move performed with make_move
+        :return:
+        """
+        position, color, flipped, legal_caches, self.hash, previous_sums = self._undo_stack.pop()
+        self.weight_sums[self.BLACK], self.weight_sums[self.WHITE] = previous_sums
+        opp = self.opponent(color)
+
+        self.tiles[position[1]][position[0]] = self.EMPTY
+        for fx, fy in flipped:
+            self.tiles[fx][fy] = opp
+
+        self.piece_count[color] -= 1 + len(flipped)
+        self.piece_count[opp] += len(flipped)
+        self.piece_count[self.EMPTY] += 1
+
+        # the legal moves cached before the move are valid again
+        self._legal_moves, self._brackets, self._dirty, self._frontier = legal_caches
+
+    def _place(self, position, color):
+        """
+        Places the tile and flips the bracketed ones
+        :param position: (int, int) x, y of the move
+        :param color:
+        :return: list of flipped tiles (row, col) or None if the move is illegal
+        """
         # as the board is represented row-column, swaps coords to col-row
         position = position[1], position[0]
 
         if color not in [self.WHITE, self.BLACK]:
             raise ValueError("Move must be made by BLACK or WHITE player")
 
-        if self.is_legal(position, color):
-            # places the piece and update piece counts
-            px, py = position
-            self.tiles[px][py] = color
-            self.piece_count[color] += 1
-            self.piece_count[self.EMPTY] -= 1
-
-            for direc in self.DIRECTIONS:
-                self.flip_tiles(position, color, direc)
-
-            # resets legal moves
-            self._legal_moves[self.BLACK], self._legal_moves[self.WHITE] = None, None
-            return True
-
-        return False  # guards against illegal moves
+        if not self.is_legal(position, color):
+            return None  # guards against illegal moves
+
+        # places the piece and update piece counts
+        px, py = position
+        self.tiles[px][py] = color
+        self.piece_count[color] += 1
+        self.piece_count[self.EMPTY] -= 1
+        self.hash ^= zobrist.KEYS[color][px * 8 + py]
+        sums = self.weight_sums[color]
+        for t, table in enumerate(evaluation.TABLES):
+            sums[t] += table[px * 8 + py]
+
+        flipped = []
+        for direc in self.DIRECTIONS:
+            flipped.extend(self.flip_tiles(position, color, direc))
+
+        changed = self.affected_rays(position, flipped)
+        for c in (self.BLACK, self.WHITE):
+            self._legal_moves[c] = None
+            if self._brackets[c] is not None:
+                self._dirty[c] = self._dirty[c] | changed
+
+        # the move leaves the frontier, its empty neighbors join it
+        if self._frontier is not None:
+            self._frontier = self._frontier.difference([position]).union(
+                [n for n in NEIGHBORS[position] if self.tiles[n[0]][n[1]] == self.EMPTY]
+            )
+        return flipped
+
+    def affected_rays(self, position, flipped):
+        """
+        Returns the rays whose brackets a move may have changed: going from
+        each changed tile over the discs in each direction, the first empty
+        tile found is the only one whose ray in the opposite direction reaches
+        the changed tile (rays of other tiles stop at an empty tile before it)
+        :param position: (row, col) of the placed tile
+        :param flipped: list of flipped tiles (row, col)
+        :return: set of ((row, col), direction index); the placed tile is
+                 included with direction 0, to be dropped as a candidate
+        """
+        affected = {(position, 0)}
+        for ox, oy in [position] + flipped:
+            for i, (dx, dy) in enumerate(self.DIRECTIONS):
+                tx, ty = ox + dx, oy + dy
+                while 0 <= tx <= 7 and 0 <= ty <= 7 and self.tiles[tx][ty] != self.EMPTY:
+                    tx += dx
+                    ty += dy
+                if 0 <= tx <= 7 and 0 <= ty <= 7:
+                    affected.add(((tx, ty), self.OPPOSITES[i]))
+        return affected
 
     def flip_tiles(self, origin, color, direction):
         """
@@ -186,11 +325,11 @@ class Board(object):
         :param origin: where the traversal will begin
         :param color:
         :param direction:
-        :return:
+        :return: list of flipped tiles (row, col)
         """
         destination = self.find_bracket(origin, color, direction)  # move, player, board, direction)
         if not destination:
-            return
+            return []
 
         ox, oy = origin
         dx, dy = direction
@@ -198,14 +337,52 @@ class Board(object):
         nx, ny = ox + dx, oy + dy  # n stands for 'next'
 
         opp = self.opponent(color)
+        own_sums, opp_sums = self.weight_sums[color], self.weight_sums[opp]
+        flipped = []
 
         while (nx, ny) != destination:
             # flips the tile and updates piece counts
             self.tiles[nx][ny] = color
             self.piece_count[color] += 1
             self.piece_count[opp] -= 1
+            self.hash ^= zobrist.FLIP_KEYS[nx * 8 + ny]
+            for t, table in enumerate(evaluation.TABLES):
+                own_sums[t] += table[nx * 8 + ny]
+                opp_sums[t] -= table[nx * 8 + ny]
+            flipped.append((nx, ny))
             nx, ny = nx + dx, ny + dy
 
+        return flipped
+
+    def reset_legal_moves(self):
+        """
+        Discards the legal moves and the frontier, the next call of legal_moves
+        scans the whole board. Must be called after changing tiles directly.
+        :return:
+        """
+        self._legal_moves = {self.BLACK: None, self.WHITE: None}
+
+        # empty squares adjacent to a disc, the only candidates for a move (None until needed)
+        self._frontier = None
+
+        # for each color, the squares (row, col) with brackets when they were last
+        # found, as a mask of the indices of the directions bracketed, and the
+        # rays (square, direction index) changed since then, to be checked again
+        self._brackets = {self.BLACK: None, self.WHITE: None}
+        self._dirty = {self.BLACK: frozenset(), self.WHITE: frozenset()}
+
+    def frontier(self):
+        """
+        Returns the empty squares adjacent to at least one disc
+        :return: set of (row, col); must not be changed
+        """
+        if self._frontier is None:
+            self._frontier = frozenset(
+                (x, y) for x, y in SQUARES if self.tiles[x][y] == self.EMPTY and
+                any(self.tiles[n[0]][n[1]] != self.EMPTY for n in NEIGHBORS[(x, y)])
+            )
+        return self._frontier
+
     def legal_moves(self, color):
         """
         Returns a list of legal moves for the given color
@@ -216,13 +393,68 @@ class Board(object):
             # construct the list of legal moves only once
             self._legal_moves[color] = []
 
-            if self.piece_count[color] > self.piece_count[self.EMPTY]:
-                self.find_legal_moves_dense(color)
+            if not self.INCREMENTAL:
+                if self.piece_count[color] > self.piece_count[self.EMPTY]:
+                    self.find_legal_moves_dense(color)
+                else:
+                    self.find_legal_moves_sparse(color)
+                # the sparse strategy may find a move more than once
+                squares = set((y, x) for x, y in self._legal_moves[color])
             else:
-                self.find_legal_moves_sparse(color)
+                if self._brackets[color] is None:
+                    self.find_brackets(color)
+                else:
+                    self.update_brackets(color)
+                squares = self._brackets[color]
+
+            self._legal_moves[color] = [(y, x) for x, y in sorted(squares)]
 
         return self._legal_moves[color]
 
+    def find_brackets(self, color):
+        """
+        Finds the brackets of every direction of the frontier squares for a color
+        :param color:
+        :return:
+        """
+        brackets = {}
+        for square in self.frontier():
+            mask = 0
+            for i, direc in enumerate(self.DIRECTIONS):
+                if self.find_bracket(square, color, direc):
+                    mask |= 1 << i
+            if mask:
+                brackets[square] = mask
+
+        self._brackets[color] = brackets
+        self._dirty[color] = frozenset()
+
+    def update_brackets(self, color):
+        """
+        Updates the brackets of a color, checking again only the rays affected
+        by the moves made since they were found (see affected_rays)
+        :param color:
+        :return:
+        """
+        # a new dict: the old one may be shared with copies and the undo stack
+        brackets = dict(self._brackets[color])
+        for square, i in self._dirty[color]:
+            if self.tiles[square[0]][square[1]] != self.EMPTY:
+                brackets.pop(square, None)
+                continue
+
+            if self.find_bracket(square, color, self.DIRECTIONS[i]):
+                brackets[square] = brackets.get(square, 0) | 1 << i
+            else:
+                mask = brackets.get(square, 0) & ~(1 << i)
+                if mask:
+                    brackets[square] = mask
+                else:
+                    brackets.pop(square, None)
+
+        self._brackets[color] = brackets
+        self._dirty[color] = frozenset()
+
     def find_legal_moves_dense(self, color):
         """
         Finds the legal moves for a given color in a dense board.
@@ -265,17 +497,7 @@ class Board(object):
         :param color:
         :return:bool
         """
-        # test if every empty tile on the board is a legal move
-        tiles = [(x, y) for x in range(8) for y in range(8) if self.tiles[x][y] == self.EMPTY]
-
-        for x, y in tiles:
-            # self._legal_moves[color] = [(y, x) for x, y in tiles if self.is_legal((x, y), color)]
-
-            hasbracket = lambda direction: self.find_bracket((x, y), color, direction)
-
-            if self.tiles[x][y] == self.EMPTY and any(map(hasbracket, self.DIRECTIONS)):
-                return True
-        return False
+        return len(self.legal_moves(color)) > 0
 
     def opponent(self, color):
         """
@@ -0,0 +1,206 @@
+"""
+Opening book: best moves of the first plies, found offline by deep searches.
+Positions are keyed by the zobrist hash (with the turn) of their canonical
+form (see common.symmetry), so a single entry serves all 8 symmetric positions.
+
+File format (little endian): a header with the magic bytes, the number of
+entries and the smallest number of empty squares in the book, followed by
+the entries sorted by key, each one a 64-bit key and the square (y * 8 + x,
+in the canonical orientation) of the best move. The file is memory-mapped
+and searched in place with a binary search, nothing is parsed at startup.
+
+Generating a book for a player (from the kit directory):
+
+python -m common.book <player directory> [-n plies] [-d depth] [-o file]
+"""
+import os
+import sys
+import mmap
+import time
+import struct
+import argparse
+import importlib.util
+
+from common import bitboard
+from common import symmetry
+from common import zobrist
+
+MAGIC = b'OTHB'
+HEADER = struct.Struct('<4sIB')
+ENTRY = struct.Struct('<QB')
+
+# name of the book file inside the player directories
+BOOK_FILE = 'book.bin'
+
+
+def position_key(black, white, color):
+    """
+    Returns the book key of a position (already in canonical form)
+    :param black: int, bitboard
+    :param white: int, bitboard
+    :param color: color to move
+    :return: int
+    """
+    return zobrist.hash_bits(black, white) ^ zobrist.TURN[color]
+
+
+class OpeningBook(object):
+    """
+    Read-only view of a book file. A missing file gives an empty book.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: path to the book file, None for an empty book
+        """
+        self.count = 0
+        self.min_empty = 64
+        self._data = None
+
+        if path is None or not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                return
+            # the mapping stays valid after the file is closed
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self.min_empty = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not an opening book' % path)
+
+    def __len__(self):
+        return self.count
+
+    def probe(self, key):
+        """
+        Searches a key
+        :param key: int
+        :return: int, square of the stored move, or None
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, square = ENTRY.unpack_from(self._data, HEADER.size + middle * ENTRY.size)
+            if entry_key == key:
+                return square
+            if entry_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def lookup(self, the_board, color):
+        """
+        Returns the book move of a position
+        :param the_board: BitBoard object
+        :param color: color to move
+        :return: (x, y), or None if the position is not in the book
+        """
+        if the_board.piece_count[the_board.EMPTY] < self.min_empty:
+            return None
+
+        black, white, s = symmetry.canonical(the_board.black, the_board.white)
+        square = self.probe(position_key(black, white, color))
+        if square is None:
+            return None
+
+        move = symmetry.inverse_transform_move((square % 8, square // 8), s)
+        # guards against hash collisions
+        if move not in the_board.legal_moves(color):
+            return None
+        return move
+
+
+def write(path, entries, min_empty):
+    """
+    Writes a book file
+    :param path: path to the file
+    :param entries: dict key -> square
+    :param min_empty: smallest number of empty squares among the positions
+    :return:
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries), min_empty))
+        for key in sorted(entries):
+            f.write(ENTRY.pack(key, entries[key]))
+
+
+def opening_positions(plies):
+    """
+    Generates every position of the first plies of the game, one per
+    canonical form
+    :param plies: number of plies
+    :return: list of (BitBoard, color to move)
+    """
+    result = []
+    seen = set()
+    frontier = [(bitboard.BitBoard(), bitboard.BitBoard.BLACK)]
+    for ply in range(plies):
+        next_frontier = []
+        for b, color in frontier:
+            black, white, s = symmetry.canonical(b.black, b.white)
+            if (black, white, color) in seen:
+                continue
+            seen.add((black, white, color))
+            result.append((b, color))
+
+            moves = b.legal_moves(color)
+            if len(moves) == 0:
+                # passes: the opponent moves in the same position
+                if b.has_legal_move(b.opponent(color)):
+                    next_frontier.append((b, b.opponent(color)))
+                continue
+            for move in moves:
+                child = b.copy()
+                child.process_move(move, color)
+                next_frontier.append((child, b.opponent(color)))
+        frontier = next_frontier
+    return result
+
+
+def build(decide, plies, verbose=False):
+    """
+    Searches every position of the first plies
+    :param decide: function(the_board, color) -> (x, y)
+    :param plies: number of plies covered by the book
+    :param verbose: prints the progress
+    :return: (dict key -> square, min_empty)
+    """
+    entries = {}
+    min_empty = 64
+    todo = opening_positions(plies)
+    start = time.time()
+    for i, (b, color) in enumerate(todo):
+        black, white, s = symmetry.canonical(b.black, b.white)
+        x, y = symmetry.transform_move(decide(b.copy(), color), s)
+        entries[position_key(black, white, color)] = y * 8 + x
+        min_empty = min(min_empty, b.piece_count[b.EMPTY])
+        if verbose:
+            print('%d/%d positions, %.0fs' % (i + 1, len(todo), time.time() - start))
+    return entries, min_empty
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the opening book of a player.')
+    parser.add_argument('player', type=str, help='Player directory.')
+    parser.add_argument('-n', '--plies', type=int, default=6, help='Plies covered by the book.')
+    parser.add_argument('-d', '--depth', type=int, default=8, help='Search depth of each position.')
+    parser.add_argument('-o', '--output-file', type=str, dest='output', default=None,
+                        help='Book file (default: book.bin in the player directory).')
+    args = parser.parse_args()
+
+    spec = importlib.util.spec_from_file_location('player', os.path.join(args.player, 'customplayer.py'))
+    player = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(player)
+
+    # fixed depth, no time limit, and not the book being replaced
+    player.MAX_RUN_TIME = float('inf')
+    player.MAX_DEPTH = args.depth
+    player.BOOK = OpeningBook()
+
+    entries, min_empty = build(player.decide, args.plies, verbose=True)
+    output = args.output if args.output is not None else os.path.join(args.player, BOOK_FILE)
+    write(output, entries, min_empty)
+    print('%d positions written to %s' % (len(entries), output), file=sys.stderr)
@@ -0,0 +1,145 @@
+"""
+Conformance suite for alternative board implementations.
+
+Replays random games on the reference common.board.Board and on a candidate
+implementation side by side, asserting that both agree on every observable
+result after every move and after every move taken back.
+Run from the kit directory with:
+
+python -m common.conformance [-g games] [-s seed]
+"""
+import random
+import argparse
+
+from common import board
+from common import bitboard
+from common import evaluation
+from common import zobrist
+
+
+def assert_same_state(reference, candidate):
+    """
+    Asserts that both boards expose the same observable state
+    :param reference: Board object
+    :param candidate: board object under test
+    :return:
+    """
+    assert str(reference) == str(candidate), '\n%s\n%s' % (reference, candidate)
+    assert reference.decorated_str() == candidate.decorated_str()
+    assert reference.piece_count == candidate.piece_count, (reference.piece_count, candidate.piece_count)
+
+    # incremental hashes must match the hash computed from scratch
+    assert reference.hash == candidate.hash == zobrist.hash_rows(str(reference).split('\n'))
+
+    # and so must the incremental weight sums
+    expected = evaluation.weight_sums(str(reference).split('\n'))
+    assert reference.weight_sums == candidate.weight_sums == expected, (reference.weight_sums, expected)
+
+    for color in [board.Board.BLACK, board.Board.WHITE]:
+        # the order of the moves is not specified, so compare them as sets
+        expected = set(reference.legal_moves(color))
+        assert expected == set(candidate.legal_moves(color)), (color, str(reference))
+        assert len(candidate.legal_moves(color)) == len(expected)
+        assert reference.has_legal_move(color) == candidate.has_legal_move(color)
+
+
+def replay_random_game(candidate_module, rng):
+    """
+    Plays a random game on both implementations, checking them after every move.
+    Moves are performed with make_move and, at the end of the game, reverted one
+    by one with unmake_move. Illegal moves are attempted along the way to check
+    that both reject them, and copies are checked against process_move.
+    :param candidate_module: module with a from_string function (e.g. common.bitboard)
+    :param rng: random.Random instance
+    :return: number of moves played
+    """
+    reference = board.Board()
+    candidate = candidate_module.from_string(str(reference))
+    assert_same_state(reference, candidate)
+
+    color = board.Board.BLACK
+    states = []  # string representation before each move
+    while reference.has_legal_move(color) or reference.has_legal_move(reference.opponent(color)):
+        legal_moves = reference.legal_moves(color)
+        if len(legal_moves) == 0:
+            color = reference.opponent(color)
+            continue
+
+        # tries an illegal move from time to time
+        if rng.random() < 0.2:
+            square = (rng.randrange(8), rng.randrange(8))
+            if square not in legal_moves:
+                assert not reference.process_move(square, color)
+                assert not candidate.make_move(square, color)
+                assert_same_state(reference, candidate)
+
+        move = rng.choice(legal_moves)
+        states.append(str(reference))
+
+        # copies must be independent of the original and agree with process_move
+        reference_copy, candidate_copy = reference.copy(), candidate.copy()
+        assert reference.make_move(move, color)
+        assert candidate.make_move(move, color)
+        assert str(reference_copy) == str(candidate_copy) == states[-1]
+
+        assert reference_copy.process_move(move, color)
+        assert candidate_copy.process_move(move, color)
+        assert_same_state(reference_copy, candidate)
+        assert_same_state(reference, candidate)
+
+        color = reference.opponent(color)
+
+    # takes back every move
+    for state in reversed(states):
+        reference.unmake_move()
+        candidate.unmake_move()
+        assert str(reference) == state
+        assert_same_state(reference, candidate)
+
+    return len(states)
+
+
+def conformance_tests(candidate_module=bitboard, games=200, seed=0):
+    """
+    Replays random games against the reference Board
+    :param candidate_module: module implementing the board under test
+    :param games: number of random games
+    :param seed: seed for the random games
+    :return:
+    """
+    rng = random.Random(seed)
+
+    def assertInitialState():
+        assert_same_state(board.Board(), candidate_module.from_string(str(board.Board())))
+
+    assertInitialState()
+
+    def assertRejectsInvalidColor():
+        candidate = candidate_module.from_string(str(board.Board()))
+        try:
+            candidate.process_move((3, 2), board.Board.EMPTY)
+            assert False, 'EMPTY must not be able to play'
+        except ValueError:
+            pass
+
+    assertRejectsInvalidColor()
+
+    def assertRandomGames():
+        total = 0
+        for game in range(games):
+            total += replay_random_game(candidate_module, rng)
+        return total
+
+    total = assertRandomGames()
+    print('%d games (%d moves) replayed, all conform.' % (games, total))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Board conformance suite.')
+    parser.add_argument('-g', '--games', type=int, default=200,
+                        help='Number of random games to replay.')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='Seed of the random games.')
+    args = parser.parse_args()
+
+    conformance_tests(bitboard, args.games, args.seed)
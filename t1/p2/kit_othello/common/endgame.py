@@ -0,0 +1,227 @@
+"""
+Exact endgame solver: searches to the end of the game and returns the final
+disc differential with perfect play, which the heuristic search can only guess.
+Works directly on the two bitboards (see common.bitboard) in negamax form.
+
+Moves are ordered by
+- parity: the board is split in quadrants, and moving into a quadrant with an
+  odd number of empty squares tends to give the last move of the region
+- fastest first: while enough squares are empty, moves that leave the opponent
+  with the fewest replies are searched first, they give the smallest subtrees
+and the last two empty squares are solved without generating moves.
+"""
+import time
+
+from common import bitboard
+
+# quadrants for the parity ordering (index y * 8 + x)
+QUADRANTS = [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000]
+
+# fastest first ordering pays off only when subtrees are large
+FASTEST_FIRST_EMPTIES = 7
+
+# nodes between two checks of the time limit
+TIME_CHECK_INTERVAL = 4096
+
+
+class Timeout(Exception):
+    """
+    Raised when the solver runs out of time
+    """
+    pass
+
+
+class EndgameSolver(object):
+    """
+    Negamax alpha-beta search to the end of the game
+    """
+
+    def __init__(self, parity=True, fastest_first=True):
+        """
+        :param parity: use the parity ordering
+        :param fastest_first: use the fastest first ordering
+        """
+        self.parity = parity
+        self.fastest_first = fastest_first
+        self._deadline = None
+        self._next_check = None
+
+        # statistics
+        self.nodes = 0
+
+    def solve(self, the_board, color, time_limit=None):
+        """
+        Returns the exact result of the position and a best move
+        :param the_board: BitBoard object
+        :param color: color to move
+        :param time_limit: seconds available, None for no limit
+        :return: (int, (int, int)): disc differential for color at the end
+                 of the game and best move, or (None, None) if time ran out
+        """
+        own, opp = the_board.own_and_opponent(color)
+        self._deadline = time.time() + time_limit if time_limit is not None else None
+        # every node counts towards the next check, _solve_last and _solve_last_two too
+        self._next_check = self.nodes + TIME_CHECK_INTERVAL if time_limit is not None else float('inf')
+
+        moves = bitboard.moves_mask(own, opp)
+        if moves == 0:
+            return None, None
+
+        best_score, best_move = -65, None
+        alpha, beta = -64, 64
+        try:
+            for index, flipped in self._ordered_moves(own, opp, moves):
+                move = 1 << index
+                score = -self._search(opp & ~flipped, own | move | flipped, -beta, -alpha, False)
+                if score > best_score:
+                    best_score, best_move = score, (index & 7, index >> 3)
+                alpha = max(alpha, best_score)
+        except Timeout:
+            return None, None
+        return best_score, best_move
+
+    def _odd_quadrants(self, empty):
+        """
+        Returns the union of the quadrants with an odd number of empty squares
+        (0 if the parity ordering is off)
+        """
+        odd = 0
+        if self.parity:
+            for quadrant in QUADRANTS:
+                if bitboard.popcount(empty & quadrant) & 1:
+                    odd |= quadrant
+        return odd
+
+    def _ordered_moves(self, own, opp, moves):
+        """
+        Returns the moves of a node with their flips, in search order
+        :return: list of (square index, flips bitboard)
+        """
+        empty = ~(own | opp) & bitboard.FULL
+        if not self.fastest_first or bitboard.popcount(empty) <= FASTEST_FIRST_EMPTIES:
+            return self._parity_moves(own, opp, moves, empty)
+
+        children = []
+        odd = self._odd_quadrants(empty)
+        while moves:
+            move = moves & -moves
+            index = move.bit_length() - 1
+            flipped = bitboard.flips(own, opp, index)
+            # mobility of the opponent after the move, then parity
+            priority = 2 * bitboard.popcount(bitboard.moves_mask(opp & ~flipped, own | move | flipped))
+            if not move & odd:
+                priority += 1
+            children.append((priority, index, flipped))
+            moves ^= move
+
+        children.sort()
+        return [(index, flipped) for priority, index, flipped in children]
+
+    def _parity_moves(self, own, opp, moves, empty):
+        """
+        Generates the moves of a node with their flips, moves into odd
+        quadrants first. Flips are only computed for the moves searched.
+        """
+        odd = self._odd_quadrants(empty)
+        for group in (moves & odd, moves & ~odd):
+            while group:
+                move = group & -group
+                index = move.bit_length() - 1
+                yield index, bitboard.flips(own, opp, index)
+                group ^= move
+
+    def _check_time(self):
+        """
+        Raises Timeout if the deadline has passed, otherwise schedules the next check
+        """
+        if time.time() > self._deadline:
+            raise Timeout()
+        self._next_check = self.nodes + TIME_CHECK_INTERVAL
+
+    def _search(self, own, opp, alpha, beta, passed):
+        """
+        Negamax alpha-beta search (fail-soft)
+        :param own: int, bitboard of the player to move
+        :param opp: int, bitboard of the opponent
+        :param passed: whether the opponent passed on the previous move
+        :return: int, final disc differential for the player to move
+        """
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_time()
+
+        empty = ~(own | opp) & bitboard.FULL
+        if empty == 0:
+            return bitboard.popcount(own) - bitboard.popcount(opp)
+
+        # last empty squares: no move generation
+        if empty & (empty - 1) == 0:
+            return self._solve_last(own, opp, empty.bit_length() - 1)
+        rest = empty & (empty - 1)
+        if rest & (rest - 1) == 0:
+            return self._solve_last_two(own, opp, alpha, beta, (empty ^ rest).bit_length() - 1, rest.bit_length() - 1)
+
+        moves = bitboard.moves_mask(own, opp)
+        if moves == 0:
+            if passed:
+                # neither player can move, the game is over
+                return bitboard.popcount(own) - bitboard.popcount(opp)
+            return -self._search(opp, own, -beta, -alpha, True)
+
+        best_score = -65
+        for index, flipped in self._ordered_moves(own, opp, moves):
+            move = 1 << index
+            score = -self._search(opp & ~flipped, own | move | flipped, -beta, -alpha, False)
+            if score > best_score:
+                best_score = score
+                if score >= beta:
+                    break
+                alpha = max(alpha, score)
+        return best_score
+
+    def _solve_last(self, own, opp, index):
+        """
+        Final score when only square index is empty
+        """
+        self.nodes += 1
+        # whoever plays the last move fills the board: 64 discs in total
+        flipped = bitboard.flips(own, opp, index)
+        if flipped:
+            discs = bitboard.popcount(own | flipped) + 1
+            return 2 * discs - 64
+        flipped = bitboard.flips(opp, own, index)
+        if flipped:
+            discs = bitboard.popcount(own & ~flipped)
+            return 2 * discs - 64
+        return bitboard.popcount(own) - bitboard.popcount(opp)
+
+    def _solve_last_two(self, own, opp, alpha, beta, first, second):
+        """
+        Final score when only squares first and second are empty
+        """
+        self.nodes += 1
+        best_score = -65
+        for index, other in ((first, second), (second, first)):
+            flipped = bitboard.flips(own, opp, index)
+            if flipped:
+                move = 1 << index
+                score = -self._solve_last(opp & ~flipped, own | move | flipped, other)
+                if score > best_score:
+                    best_score = score
+                    if score >= beta:
+                        return best_score
+        if best_score > -65:
+            return best_score
+
+        # the player to move passes, the opponent picks the result worst for it
+        worst = None
+        for index, other in ((first, second), (second, first)):
+            flipped = bitboard.flips(opp, own, index)
+            if flipped:
+                move = 1 << index
+                score = self._solve_last(own & ~flipped, opp | move | flipped, other)
+                if worst is None or score < worst:
+                    worst = score
+        if worst is not None:
+            return worst
+        return bitboard.popcount(own) - bitboard.popcount(opp)
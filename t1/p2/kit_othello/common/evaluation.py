@@ -0,0 +1,52 @@
+"""
+Square weight tables whose sums the boards keep up to date incrementally:
+every move only adds the weights of the placed and flipped squares, so
+evaluations built on them (and on piece_count) cost O(1) per leaf.
+Squares are indexed y * 8 + x, like in common.zobrist.
+"""
+
+# positional weights of heuristic2 (corners good, squares next to them bad)
+POSITION_WEIGHTS = [
+    +4, -3, +2, +2, +2, +2, -3, +4,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    +2, -1, +1, +0, +0, +1, -1, +2,
+    +2, -1, +0, +1, +1, +0, -1, +2,
+    +2, -1, +0, +1, +1, +0, -1, +2,
+    +2, -1, +1, +0, +0, +1, -1, +2,
+    -3, -4, -1, -1, -1, -1, -4, -3,
+    +4, -3, +2, +2, +2, +2, -3, +4
+]
+
+# border tiles of heuristic1: upper, lower, left and right borders are
+# counted separately, so corners count twice
+BORDER_WEIGHTS = [
+    2, 1, 1, 1, 1, 1, 1, 2,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    1, 0, 0, 0, 0, 0, 0, 1,
+    2, 1, 1, 1, 1, 1, 1, 2
+]
+
+# tables tracked by the boards, board.weight_sums[color][POSITION] is the sum
+# of POSITION_WEIGHTS over the squares of that color
+TABLES = (POSITION_WEIGHTS, BORDER_WEIGHTS)
+POSITION = 0
+BORDER = 1
+
+
+def weight_sums(rows):
+    """
+    Computes the weight sums of a board from scratch
+    :param rows: iterable of 8 strings (or lists) with the tiles of each row
+    :return: dict color -> list with the sum of each table
+    """
+    sums = {'B': [0] * len(TABLES), 'W': [0] * len(TABLES)}
+    for lineno, row in enumerate(rows):
+        for colno, tile in enumerate(row):
+            if tile in sums:
+                for t, table in enumerate(TABLES):
+                    sums[tile][t] += table[lineno * 8 + colno]
+    return sums
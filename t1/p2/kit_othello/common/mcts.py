@@ -0,0 +1,336 @@
+"""
+Monte Carlo tree search (UCT, optionally with RAVE) for the players, an
+alternative to the depth-limited alpha-beta search.
+
+Every playout descends the tree choosing the child with the best upper
+confidence bound, adds one new node and plays the game to its end from it,
+with uniformly random moves or with a light policy (corners first, then
+moves away from the X and C squares). The result (win, draw or loss) is
+counted in every node of the path. With RAVE, the moves a color played later
+in the playout also update the all-moves-as-first statistics of the sibling
+nodes with the same move, which guide the selection while visits are few.
+
+Playouts work on the bitboards of common.bitboard directly, without board
+objects. The tree is kept between moves: at the next move, the node of the
+new position (after the opponent's reply) becomes the root, with its visits.
+"""
+import math
+import time
+import random
+
+from common import bitboard
+
+# move of a node whose color has no legal move and passes
+PASS = -1
+
+# playout policies
+RANDOM = 'random'
+LIGHT = 'light'
+POLICIES = [RANDOM, LIGHT]
+
+CORNERS = 0x8100000000000081
+# squares next to the corners (X: diagonal, C: on the edges), usually bad moves
+X_SQUARES = 0x0042000000004200
+C_SQUARES = 0x4281000000008142
+RISKY = X_SQUARES | C_SQUARES
+
+# playouts between checks of the time limit
+TIME_CHECK_INTERVAL = 8
+
+
+class Node(object):
+    """
+    A position of the tree. wins and visits are seen by the color that
+    moved into the node (the color to move at its parent).
+    """
+    __slots__ = ('move', 'parent', 'children', 'untried', 'black', 'white', 'color',
+                 'visits', 'wins', 'amaf_visits', 'amaf_wins')
+
+    def __init__(self, move, parent, black, white, color):
+        """
+        :param move: square index (y * 8 + x) played to reach the node, PASS or None for the root
+        :param parent: Node or None
+        :param black: int, bitboard
+        :param white: int, bitboard
+        :param color: color to move
+        """
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.black, self.white, self.color = black, white, color
+        self.visits = 0
+        self.wins = 0.0
+        self.amaf_visits = 0
+        self.amaf_wins = 0.0
+
+        own, opp = (black, white) if color == bitboard.BitBoard.BLACK else (white, black)
+        moves = bitboard.moves_mask(own, opp)
+        if moves:
+            self.untried = squares(moves)
+        elif bitboard.moves_mask(opp, own):
+            self.untried = [PASS]
+        else:
+            self.untried = []  # end of the game
+
+    def child(self, move):
+        """
+        Adds the child reached by playing an untried move
+        :param move: square index or PASS, removed from untried
+        :return: Node
+        """
+        self.untried.remove(move)
+        black, white = play(self.black, self.white, self.color, move)
+        node = Node(move, self, black, white, opponent(self.color))
+        self.children.append(node)
+        return node
+
+
+def opponent(color):
+    """
+    Returns the opponent of a color
+    """
+    return bitboard.BitBoard.WHITE if color == bitboard.BitBoard.BLACK else bitboard.BitBoard.BLACK
+
+
+def squares(bits):
+    """
+    Returns the indices of the set bits of a bitboard
+    :param bits: int
+    :return: list of int
+    """
+    result = []
+    while bits:
+        low = bits & -bits
+        result.append(low.bit_length() - 1)
+        bits ^= low
+    return result
+
+
+def play(black, white, color, move):
+    """
+    Returns the bitboards after a move
+    :param black: int
+    :param white: int
+    :param color: color playing
+    :param move: square index or PASS
+    :return: (black, white)
+    """
+    if move == PASS:
+        return black, white
+    bit = 1 << move
+    if color == bitboard.BitBoard.BLACK:
+        flipped = bitboard.flips(black, white, move)
+        return black | flipped | bit, white ^ flipped
+    flipped = bitboard.flips(white, black, move)
+    return black ^ flipped, white | flipped | bit
+
+
+def playout(black, white, color, policy, rng, moves=None):
+    """
+    Plays a game to its end
+    :param black: int, bitboard
+    :param white: int, bitboard
+    :param color: color to move
+    :param policy: RANDOM or LIGHT
+    :param rng: random.Random object
+    :param moves: list to which the (color, square) of every move is appended, or None
+    :return: black disc differential at the end
+    """
+    moves_mask, flips = bitboard.moves_mask, bitboard.flips
+    black_to_move = color == bitboard.BitBoard.BLACK
+    own, opp = (black, white) if black_to_move else (white, black)
+    light = policy == LIGHT
+
+    while True:
+        legal = moves_mask(own, opp)
+        if not legal:
+            if not moves_mask(opp, own):
+                break
+            own, opp = opp, own
+            black_to_move = not black_to_move
+            continue
+
+        if light:
+            if legal & CORNERS:
+                legal &= CORNERS
+            elif legal & ~RISKY:
+                legal &= ~RISKY
+        candidates = squares(legal)
+        index = candidates[rng.randrange(len(candidates))] if len(candidates) > 1 else candidates[0]
+
+        bit = 1 << index
+        flipped = flips(own, opp, index)
+        own, opp = opp ^ flipped, own | flipped | bit
+        black_to_move = not black_to_move
+
+        if moves is not None:
+            # the color that just moved is the one not to move now
+            moves.append((bitboard.BitBoard.WHITE if black_to_move else bitboard.BitBoard.BLACK, index))
+
+    black, white = (own, opp) if black_to_move else (opp, own)
+    return bitboard.popcount(black) - bitboard.popcount(white)
+
+
+class MCTS(object):
+    """
+    Monte Carlo tree search engine, keeping its tree between moves
+    """
+
+    def __init__(self, exploration=1.0, rave=False, rave_equivalence=300, policy=LIGHT, seed=None):
+        """
+        :param exploration: constant of the exploration term of the upper confidence bound
+        :param rave: whether to use the all-moves-as-first statistics
+        :param rave_equivalence: visits at which the node statistics and the
+                                 RAVE ones weigh the same in the selection
+        :param policy: playout policy, one of POLICIES
+        :param seed: seed of the random moves
+        """
+        if policy not in POLICIES:
+            raise ValueError('Unknown playout policy %s' % policy)
+
+        self.exploration = exploration
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.root = None
+
+        # statistics
+        self.playouts = 0
+        self.reused_visits = 0
+
+    def advance(self, the_board, color):
+        """
+        Makes the node of the position the root, reusing the subtree of the
+        previous search when the position is in it (a few plies below its root)
+        :param the_board: BitBoard object
+        :param color: color to move
+        :return: Node
+        """
+        found = None
+        if self.root is not None:
+            level = [self.root]
+            for depth in range(4):  # the root, our move, a pass and the opponent's reply
+                found = next((n for n in level if n.black == the_board.black and
+                              n.white == the_board.white and n.color == color), None)
+                if found is not None:
+                    break
+                level = [c for node in level for c in node.children]
+
+        if found is None:
+            self.root = Node(None, None, the_board.black, the_board.white, color)
+        else:
+            found.parent = None
+            self.root = found
+            self.reused_visits += found.visits
+        return self.root
+
+    def search(self, the_board, color, playouts=None, time_limit=None, start_time=None):
+        """
+        Searches the position until the playout budget or the time limit is exhausted
+        :param the_board: BitBoard object
+        :param color: color to move
+        :param playouts: number of playouts (None for no limit)
+        :param time_limit: seconds available since start_time (None for no limit)
+        :param start_time: time.time() when the move started (default: now)
+        :return: (x, y) of the most visited move, or None if the color has no move
+        """
+        if playouts is None and time_limit is None:
+            raise ValueError('MCTS needs a playout budget or a time limit')
+        start_time = time.time() if start_time is None else start_time
+
+        if not the_board.has_legal_move(color):
+            return None
+        root = self.advance(the_board, color)
+
+        done = 0
+        while playouts is None or done < playouts:
+            if time_limit is not None and done % TIME_CHECK_INTERVAL == 0 and \
+                    time.time() - start_time >= time_limit:
+                break
+            self.iterate(root)
+            done += 1
+
+        if not root.children:
+            # out of time before the first playout: any legal move
+            move = root.untried[0]
+            return move % 8, move // 8
+
+        best = max(root.children, key=lambda n: n.visits)
+        return best.move % 8, best.move // 8
+
+    def iterate(self, root):
+        """
+        One playout: selection, expansion, simulation and backpropagation
+        :param root: Node
+        :return:
+        """
+        node = root
+        while not node.untried and node.children:
+            node = self.select(node)
+        if node.untried:
+            node = node.child(self.rng.choice(node.untried))
+
+        moves = [] if self.rave else None
+        diff = playout(node.black, node.white, node.color, self.policy, self.rng, moves)
+        black_score = 1.0 if diff > 0 else 0.0 if diff < 0 else 0.5
+        self.playouts += 1
+
+        if self.rave:
+            played = {bitboard.BitBoard.BLACK: set(), bitboard.BitBoard.WHITE: set()}
+            for color, index in moves:
+                played[color].add(index)
+
+        while node is not None:
+            parent = node.parent
+            node.visits += 1
+            if parent is not None:
+                mover = parent.color
+                node.wins += black_score if mover == bitboard.BitBoard.BLACK else 1.0 - black_score
+
+                if self.rave:
+                    # the move of the node was played after its siblings' position too
+                    if node.move != PASS:
+                        played[mover].add(node.move)
+                    score = black_score if mover == bitboard.BitBoard.BLACK else 1.0 - black_score
+                    for sibling in parent.children:
+                        if sibling.move in played[mover]:
+                            sibling.amaf_visits += 1
+                            sibling.amaf_wins += score
+            node = parent
+
+    def select(self, node):
+        """
+        Returns the child with the highest upper confidence bound
+        (every child has been visited at least once)
+        :param node: Node
+        :return: Node
+        """
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        best, best_value = None, -1.0
+
+        for child in node.children:
+            value = child.wins / child.visits
+            if self.rave and child.amaf_visits:
+                # weight of the RAVE estimate, from 1 down to 0 as the node gets visits
+                beta = math.sqrt(self.rave_equivalence / (3 * child.visits + self.rave_equivalence))
+                value = (1 - beta) * value + beta * child.amaf_wins / child.amaf_visits
+            value += exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def tree_size(self):
+        """
+        Returns the number of nodes of the current tree
+        :return: int
+        """
+        if self.root is None:
+            return 0
+        count, stack = 0, [self.root]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children)
+        return count
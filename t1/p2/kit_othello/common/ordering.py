@@ -0,0 +1,132 @@
+"""
+Move ordering for the alpha-beta players. Alpha-beta prunes the most when the
+best move is searched first, so moves are sorted by, in order of priority:
+
+- the principal variation move: the best move found for the position by the
+  previous iteration, as stored in the transposition table
+- killer moves: moves that caused a cutoff in a sibling node (same ply)
+- history heuristic: how often (weighted by depth) a move caused cutoffs
+  anywhere in the tree, plus a static priority of the square
+  (corners first, squares next to corners last)
+
+Each component can be turned off, which allows measuring its gain.
+"""
+
+# static priority of each square (index y * 8 + x)
+STATIC_PRIORITY = [
+    100, -20, 10, 5, 5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    5, -2, 1, 0, 0, 1, -2, 5,
+    10, -2, 1, 1, 1, 1, -2, 10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10, 5, 5, 10, -20, 100,
+]
+
+# number of killer moves kept per ply
+KILLER_SLOTS = 2
+
+
+class MoveOrdering(object):
+    """
+    Sorts the legal moves of a node and learns from the cutoffs.
+    Plies are counted from the root of the current search with the number
+    of empty squares, so the board is passed to every call.
+    """
+
+    def __init__(self, static=True, killers=True, history=True, pv=True):
+        """
+        :param static: use the static square priority
+        :param killers: use killer moves
+        :param history: use the history heuristic
+        :param pv: search the principal variation (transposition table) move first
+        """
+        self.static = static
+        self.killers = killers
+        self.history = history
+        self.pv = pv
+
+        self._root_empty = 0
+        self._killers = {}  # ply -> list of moves
+        self._history = {'B': [0] * 64, 'W': [0] * 64}
+
+        # statistics
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self, the_board):
+        """
+        Must be called at the start of each search (each decide())
+        :param the_board: board at the root of the search
+        :return:
+        """
+        self._root_empty = the_board.piece_count[the_board.EMPTY]
+        self._killers = {}
+
+        # old history still helps, but the recent one matters more
+        for table in self._history.values():
+            for i in range(64):
+                table[i] >>= 1
+
+    def order(self, the_board, color, moves, pv_move=None):
+        """
+        Returns the moves sorted from the most to the least promising
+        :param the_board: board of the node
+        :param color: color to move
+        :param moves: list of legal moves (x, y)
+        :param pv_move: best move of the previous iteration, if known
+        :return: new list of moves
+        """
+        self.nodes += 1
+        if len(moves) < 2:
+            return moves
+
+        killers = self._killers.get(self._root_empty - the_board.piece_count[the_board.EMPTY], ()) \
+            if self.killers else ()
+        history = self._history[color] if self.history else None
+        static = self.static
+        pv_move = pv_move if self.pv else None
+
+        def priority(move):
+            index = move[1] * 8 + move[0]
+            score = 0
+            if static:
+                score += STATIC_PRIORITY[index]
+            if history is not None:
+                score += history[index]
+            return move == pv_move, move in killers, score
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def cutoff(self, the_board, color, move, depth, index):
+        """
+        Records that a move caused a cutoff
+        :param the_board: board of the node (with the move already taken back)
+        :param color: color that played the move
+        :param move: (x, y)
+        :param depth: remaining depth of the node
+        :param index: position of the move in the ordered list
+        :return:
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+        if self.killers:
+            ply = self._root_empty - the_board.piece_count[the_board.EMPTY]
+            slots = self._killers.setdefault(ply, [])
+            if move not in slots:
+                slots.insert(0, move)
+                del slots[KILLER_SLOTS:]
+
+        if self.history:
+            self._history[color][move[1] * 8 + move[0]] += depth * depth
+
+    def first_cutoff_ratio(self):
+        """
+        Returns the fraction of cutoffs caused by the first move searched
+        :return: float
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
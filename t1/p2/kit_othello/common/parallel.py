@@ -0,0 +1,168 @@
+"""
+Parallel search at the root for the alpha-beta players (Young Brothers Wait
+at the root): the first root move (the best one of the previous iteration)
+is searched alone and gives a lower bound, then the remaining moves, its
+"young brothers", are searched at the same time by a pool of worker processes.
+The best value found so far lives in shared memory, so every worker starts
+each root move with the tightest bound known and prunes accordingly.
+
+The workers are forked when the first search starts: they inherit the player
+functions and tables without pickling, and keep their own transposition
+table and move ordering between searches. Requires the fork start method
+(Linux, macOS).
+"""
+import multiprocessing
+
+INFINITY = float('inf')
+
+# state of the worker processes, inherited through fork
+_child_search = None
+_new_search = None
+_node_count = None
+_best = None
+_search_id = None
+
+
+def _count():
+    """
+    Returns the number of nodes searched by this process so far
+    :return: int
+    """
+    return _node_count() if _node_count is not None else 0
+
+
+def _search_child(task):
+    """
+    Searches one root move in a worker process
+    :param task: (search id, root board, move, color, start time, time limit, depth)
+    :return: (move, alpha the move was searched with, value, nodes searched)
+    """
+    global _search_id
+    search_id, the_board, move, color, start_time, time_limit, depth = task
+    if search_id != _search_id:
+        # first root move of a new search in this worker
+        _search_id = search_id
+        if _new_search is not None:
+            _new_search(the_board)
+
+    nodes = _count()
+    alpha = _best.value
+    the_board.make_move(move, color)
+    value = _child_search(the_board, the_board.opponent(color), alpha, INFINITY, start_time, time_limit, depth - 1)[0]
+    with _best.get_lock():
+        if value > _best.value:
+            _best.value = value
+    return move, alpha, value, _count() - nodes
+
+
+class RootSplitter(object):
+    """
+    Splits the root moves of a search among worker processes
+    """
+
+    def __init__(self, workers, new_search=None, node_count=None):
+        """
+        :param workers: number of worker processes (searches with 1 worker are not split)
+        :param new_search: function(root board) called by each worker when a new search
+                           starts, resets the tables like decide() does in the player process
+        :param node_count: function() -> nodes searched so far by the calling process
+        """
+        self.workers = workers
+        self._new_search = new_search
+        self._node_count = node_count
+        self._child_search = None
+        self._pool = None
+        self._best = None
+        self._search_id = 0
+        self._pv = None
+
+        # statistics: nodes searched by the workers (as given by node_count)
+        self.nodes = 0
+
+    def new_search(self):
+        """
+        Must be called at the start of each search (each decide())
+        :return:
+        """
+        self._search_id += 1
+        self._pv = None
+
+    def _start(self, child_search):
+        """
+        Forks the worker processes
+        :param child_search: function searching the children of the root
+        :return:
+        """
+        global _child_search, _new_search, _node_count, _best
+
+        context = multiprocessing.get_context('fork')
+        self._child_search = child_search
+        self._best = context.Value('d', -INFINITY)
+        _child_search, _new_search, _node_count, _best = \
+            child_search, self._new_search, self._node_count, self._best
+        self._pool = context.Pool(self.workers)
+
+    def close(self):
+        """
+        Terminates the worker processes
+        :return:
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def search(self, the_board, color, child_search, start_time, time_limit, depth):
+        """
+        Searches the root to the given depth. The color to move must have legal moves.
+        :param the_board: board of the root
+        :param color: color to move
+        :param child_search: function(the_board, color, alpha, beta, start_time, time_limit, remaining_depth)
+                             -> (value, move), the min_value of the player; must be the same
+                             function in every call
+        :param start_time: time.time() when the move started
+        :param time_limit: seconds available since start_time
+        :param depth: depth of the search
+        :return: (value, move)
+        """
+        if self._pool is None:
+            self._start(child_search)
+        assert child_search is self._child_search, 'the workers were forked with another search function'
+
+        moves = list(the_board.legal_moves(color))
+        if self._pv in moves:
+            moves.remove(self._pv)
+            moves.insert(0, self._pv)
+
+        # eldest brother: searched alone, its value bounds the others
+        best_move = moves[0]
+        the_board.make_move(best_move, color)
+        best_value = child_search(the_board, the_board.opponent(color), -INFINITY, INFINITY, start_time, time_limit, depth - 1)[0]
+        the_board.unmake_move()
+        self._best.value = best_value
+
+        tasks = [(self._search_id, the_board, move, color, start_time, time_limit, depth) for move in moves[1:]]
+        failed_low = []
+        for move, alpha, value, nodes in self._pool.imap_unordered(_search_child, tasks):
+            self.nodes += nodes
+            if value > alpha:
+                # above the bound the worker started with: the exact value
+                if value > best_value:
+                    best_value, best_move = value, move
+            else:
+                # only an upper bound (equal to alpha in fail-hard searches), even if it
+                # arrived before the result that raised the shared bound to alpha
+                failed_low.append((move, alpha))
+
+        # every alpha was the exact value of a move received above, so the bounds
+        # are normally beaten already; a move whose bound is not is searched again
+        # with a full window
+        for move, alpha in failed_low:
+            if alpha > best_value:
+                the_board.make_move(move, color)
+                value = child_search(the_board, the_board.opponent(color), -INFINITY, INFINITY, start_time, time_limit, depth - 1)[0]
+                the_board.unmake_move()
+                if value > best_value:
+                    best_value, best_move = value, move
+
+        self._pv = best_move
+        return best_value, best_move
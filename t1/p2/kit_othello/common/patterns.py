@@ -0,0 +1,181 @@
+"""
+Pattern-based evaluation with weights learned from recorded games
+(see common.training), one set of weights per game phase.
+
+The evaluation of a position for a color is the sum of
+- for each class of squares equivalent under the board symmetries (corners,
+  X-squares, ...), its weight times the own minus the opponent discs on it
+- for each of the 4 edges, the weight of its configuration (3^8 of them,
+  an edge and its mirror image share the weight)
+using the weights of the phase given by the number of empty squares. Weights
+are fitted to the final disc differential, so values are in discs.
+
+Weight file format (little endian): the magic bytes, a version byte and the
+number of phases, the smallest number of empty squares of each phase (one byte
+each, decreasing), then for each phase the class weights and the 3^8 edge
+weights as float32.
+"""
+import os
+import struct
+from array import array
+
+from common import bitboard
+from common import symmetry
+
+MAGIC = b'OTHW'
+VERSION = 1
+HEADER = struct.Struct('<4sBB')
+
+# name of the weight file inside the player directories
+WEIGHTS_FILE = 'weights.bin'
+
+# phases by number of empty squares: a position is in the first phase whose minimum it reaches
+PHASE_MIN_EMPTIES = [48, 32, 16, 0]
+
+# squares grouped by symmetry class: CLASSES[i] is the class of square i (y * 8 + x)
+_canonical_squares = [min(p[i] for p in symmetry.PERMUTATIONS) for i in range(64)]
+_class_ids = sorted(set(_canonical_squares))
+CLASSES = [_class_ids.index(c) for c in _canonical_squares]
+NUM_CLASSES = len(_class_ids)
+CLASS_MASKS = [sum(1 << i for i in range(64) if CLASSES[i] == k) for k in range(NUM_CLASSES)]
+
+# edge configurations: 8 squares with 3 states (empty, own, opponent)
+EDGE_CONFIGURATIONS = 3 ** 8
+
+# TERNARY[byte] reads the bits of a byte as a base 3 number
+TERNARY = [sum(3 ** i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+def _mirror(configuration):
+    """
+    Returns the edge configuration read from the other end
+    """
+    digits = [configuration // 3 ** i % 3 for i in range(8)]
+    return sum(d * 3 ** i for i, d in enumerate(reversed(digits)))
+
+
+# EDGE_IDS[configuration]: index of the weight shared by a configuration and its mirror
+_canonical_edges = [min(c, _mirror(c)) for c in range(EDGE_CONFIGURATIONS)]
+_edge_ids = {c: i for i, c in enumerate(sorted(set(_canonical_edges)))}
+EDGE_IDS = [_edge_ids[c] for c in _canonical_edges]
+NUM_EDGE_IDS = len(_edge_ids)
+
+COLUMN_0 = 0x0101010101010101
+# multiplying the bits of column 0 by this gathers them in the top byte
+COLUMN_GATHER = 0x0102040810204080
+
+
+def edge_bytes(bits):
+    """
+    Returns the discs of the 4 edges of a bitboard as bytes (top, bottom,
+    left, right); the squares of an edge are in order from one end to the other
+    :param bits: int
+    :return: tuple of 4 int
+    """
+    return (
+        bits & 0xFF,
+        bits >> 56,
+        ((bits & COLUMN_0) * COLUMN_GATHER & bitboard.FULL) >> 56,
+        (((bits >> 7) & COLUMN_0) * COLUMN_GATHER & bitboard.FULL) >> 56,
+    )
+
+
+def edge_configurations(own, opp):
+    """
+    Returns the configurations of the 4 edges (base 3: 0 empty, 1 own, 2 opponent)
+    :param own: int, bitboard
+    :param opp: int, bitboard
+    :return: list of 4 int
+    """
+    return [TERNARY[o] + 2 * TERNARY[p] for o, p in zip(edge_bytes(own), edge_bytes(opp))]
+
+
+def class_differences(own, opp):
+    """
+    Returns own minus opponent discs in each square class
+    :param own: int, bitboard
+    :param opp: int, bitboard
+    :return: list of NUM_CLASSES int
+    """
+    popcount = bitboard.popcount
+    return [popcount(own & mask) - popcount(opp & mask) for mask in CLASS_MASKS]
+
+
+def phase(empties):
+    """
+    Returns the phase of a position
+    :param empties: number of empty squares
+    :return: int
+    """
+    for index, minimum in enumerate(PHASE_MIN_EMPTIES):
+        if empties >= minimum:
+            return index
+    return len(PHASE_MIN_EMPTIES) - 1
+
+
+def write_weights(path, weights):
+    """
+    Writes a weight file
+    :param path: path to the file
+    :param weights: list (one item per phase of PHASE_MIN_EMPTIES) of
+                    (NUM_CLASSES class weights, EDGE_CONFIGURATIONS edge weights)
+    :return:
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(PHASE_MIN_EMPTIES)))
+        f.write(bytes(PHASE_MIN_EMPTIES))
+        for class_weights, edge_weights in weights:
+            array('f', class_weights).tofile(f)
+            array('f', edge_weights).tofile(f)
+
+
+class PatternEvaluator(object):
+    """
+    Evaluation with the weights of a weight file. A missing file gives an
+    evaluator that is not loaded (players fall back to their heuristics).
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: path to the weight file, None for no weights
+        """
+        self.loaded = False
+        self._weights = []
+        # phase of each number of empty squares
+        self._phases = [phase(empties) for empties in range(65)]
+
+        if path is None or not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            magic, version, phases = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('%s is not a weight file (version %d)' % (path, VERSION))
+            if list(f.read(phases)) != PHASE_MIN_EMPTIES:
+                raise ValueError('%s was trained with other phases' % path)
+
+            for i in range(phases):
+                class_weights, edge_weights = array('f'), array('f')
+                class_weights.fromfile(f, NUM_CLASSES)
+                edge_weights.fromfile(f, EDGE_CONFIGURATIONS)
+                # python lists are faster to index than arrays
+                self._weights.append((list(zip(CLASS_MASKS, class_weights)), edge_weights.tolist()))
+        self.loaded = True
+
+    def evaluate(self, the_board, color):
+        """
+        Returns the evaluation of the position for a color
+        :param the_board: BitBoard object
+        :param color:
+        :return: float, expected final disc differential for color
+        """
+        own, opp = the_board.own_and_opponent(color)
+        classes, edges = self._weights[self._phases[the_board.piece_count[the_board.EMPTY]]]
+        popcount = bitboard.popcount
+
+        value = 0.0
+        for mask, weight in classes:
+            value += weight * (popcount(own & mask) - popcount(opp & mask))
+        for o, p in zip(edge_bytes(own), edge_bytes(opp)):
+            value += edges[TERNARY[o] + 2 * TERNARY[p]]
+        return value
@@ -0,0 +1,144 @@
+"""
+Perft for the board implementations: counts the leaves of the game tree to
+a fixed depth, checking them against reference counts and timing the move
+generation (legal_moves, make_move and unmake_move).
+
+A pass is a ply: a color without legal moves passes and the opponent moves
+at the next depth. A finished game is a leaf wherever it happens. With these
+rules the counts from the initial position are the published Othello perft
+numbers (1, 4, 12, 56, 244, ...). The counts of the fixed positions were
+computed with both Board and BitBoard.
+
+Run from the kit directory, against any module with a from_string function:
+
+python -m common.perft [-b common.bitboard] [-d depth] [-f depth] [--divide]
+"""
+import sys
+import time
+import argparse
+import importlib
+
+from common import board
+
+# leaves from the initial position (black to move) by depth
+START_COUNTS = [1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284]
+
+# (board string, color to move, leaves by depth): the midgame positions of
+# common.positions and a late position with passes and finished games
+POSITIONS = [
+    ('..BWW...\n.W.BWW..\n..WBBWWB\n..BBBBBB\nWWWWWWBW\n...BWBW.\n...BBWWB\n......W.\n', 'W', [1, 10, 160, 1455, 21469]),
+    ('.......W\n...W..W.\n..WWBWW.\nB.BWBW..\nBBBWW...\nBWWWWW..\nWBBB....\nB.B.....\n', 'B', [1, 13, 144, 1826, 19883]),
+    ('........\n...W..W.\n...W.WB.\n..WWBBW.\n.W.BBW.B\n.WWWWWBW\n..WWBB..\n....B...\n', 'W', [1, 10, 185, 1841, 31314]),
+    ('...W.BB.\n.W..WBBB\n..WWBBB.\n.WWBWBB.\n.WBWB..B\n.BWWWWW.\n.BWW.W..\nB.......\n', 'W', [1, 8, 132, 1232, 19653]),
+    ('...WBB..\n...WWWW.\n...BWWW.\n...BWWW.\n.BBWBWWB\n..WWWWW.\n....BWWW\n.......B\n', 'B', [1, 11, 138, 1685, 19452]),
+    ('BBBWWW..\nBBBWWB..\nB.BWWWBB\n...WWBW.\n...WBWWW\n..BWW.B.\n..BW.B..\n.B......\n', 'B', [1, 10, 140, 1313, 16716]),
+    ('..W.....\n..WB....\n..WBW...\n..WBWW..\nWBBBWW..\nWWBWWWWW\nW.WB....\n.W......\n', 'B', [1, 14, 141, 1901, 19962]),
+    ('........\n......W.\n.WWWWWW.\n.WWBBWW.\nBWBBB...\n.WBWBB..\n..WBB.B.\n..B.....\n', 'B', [1, 16, 163, 2612, 29295]),
+    ('.W.WWWB.\n.BBBBBWB\nWWWWWWWB\nBWBBBBWB\nBBWBBWWB\nBBBBWBWB\nWBWWBWW.\n.BBBBBBB\n', 'B', [1, 5, 19, 63, 112, 173, 182]),
+]
+
+INITIAL = str(board.Board())
+
+
+def perft(the_board, color, depth, passed=False):
+    """
+    Counts the leaves of the game tree below a position
+    :param the_board: board object with legal_moves, make_move and unmake_move
+    :param color: color to move
+    :param depth: plies to look ahead
+    :param passed: whether the previous ply was a pass
+    :return: int
+    """
+    moves = the_board.legal_moves(color)
+    if len(moves) == 0:
+        if passed or depth == 0:
+            return 1  # the end of the game (both passed) or of the search
+        return perft(the_board, the_board.opponent(color), depth - 1, True)
+
+    if depth <= 1:
+        # bulk counting: the leaves below are the moves themselves
+        return len(moves) if depth == 1 else 1
+
+    opponent = the_board.opponent(color)
+    leaves = 0
+    for move in list(moves):
+        the_board.make_move(move, color)
+        leaves += perft(the_board, opponent, depth - 1)
+        the_board.unmake_move()
+    return leaves
+
+
+def divide(the_board, color, depth):
+    """
+    Counts the leaves below each move of a position, to find the move
+    where two implementations disagree
+    :param the_board: board object
+    :param color: color to move
+    :param depth: plies to look ahead (the move included), at least 1
+    :return: list of ((x, y), leaves)
+    """
+    result = []
+    for move in list(the_board.legal_moves(color)):
+        the_board.make_move(move, color)
+        result.append((move, perft(the_board, the_board.opponent(color), depth - 1)))
+        the_board.unmake_move()
+    return result
+
+
+def run(board_module, string, color, expected, name):
+    """
+    Runs perft on a position at every depth with a reference count
+    :param board_module: module with a from_string function
+    :param string: board string
+    :param color: color to move
+    :param expected: reference leaves by depth (from 0)
+    :param name: name of the position in the report
+    :return: (whether every count matched, leaves, seconds)
+    """
+    ok, total, seconds = True, 0, 0.0
+    for depth in range(1, len(expected)):
+        the_board = board_module.from_string(string)
+        start = time.time()
+        leaves = perft(the_board, color, depth)
+        elapsed = time.time() - start
+
+        status = 'ok' if leaves == expected[depth] else 'MISMATCH, expected %d' % expected[depth]
+        ok = ok and leaves == expected[depth]
+        total += leaves
+        seconds += elapsed
+        print('%-10s %5d %12d %10.3f  %s' % (name, depth, leaves, elapsed, status))
+        sys.stdout.flush()
+    return ok, total, seconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perft: leaf counts and move generation speed of a board implementation.')
+    parser.add_argument('-b', '--board-module', type=str, default='common.bitboard',
+                        help='Module of the board implementation (with from_string), e.g. common.board.')
+    parser.add_argument('-d', '--depth', type=int, default=7,
+                        help='Deepest perft from the initial position (at most %d).' % (len(START_COUNTS) - 1))
+    parser.add_argument('-f', '--fixed-depth', type=int, default=3,
+                        help='Deepest perft from the fixed positions (0 skips them).')
+    parser.add_argument('--divide', action='store_true',
+                        help='Also print the leaves below each move of the initial position.')
+    args = parser.parse_args()
+
+    module = importlib.import_module(args.board_module)
+    print('%-10s %5s %12s %10s' % ('position', 'depth', 'leaves', 'seconds'))
+
+    runs = [run(module, INITIAL, board.Board.BLACK, START_COUNTS[:args.depth + 1], 'initial')]
+    if args.fixed_depth > 0:
+        for index, (string, color, counts) in enumerate(POSITIONS):
+            runs.append(run(module, string, color, counts[:args.fixed_depth + 1], 'fixed %d' % (index + 1)))
+
+    ok = all(r[0] for r in runs)
+    leaves, seconds = sum(r[1] for r in runs), sum(r[2] for r in runs)
+    print('%s: %d leaves in %.2fs, %.0f leaves/s' % (
+        'all counts match' if ok else 'COUNTS DO NOT MATCH', leaves, seconds, leaves / seconds if seconds else 0.0
+    ))
+
+    if args.divide:
+        for move, leaves in divide(module.from_string(INITIAL), board.Board.BLACK, args.depth):
+            print('%d,%d %d' % (move[0], move[1], leaves))
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,16 @@
+"""
+Fixed positions used by the benchmarks, as (board string, color to move).
+They come from seeded random games, so they are ordinary midgame positions
+rather than hand-picked ones.
+"""
+
+MIDGAME = [
+    ('..BWW...\n.W.BWW..\n..WBBWWB\n..BBBBBB\nWWWWWWBW\n...BWBW.\n...BBWWB\n......W.\n', 'W'),
+    ('.......W\n...W..W.\n..WWBWW.\nB.BWBW..\nBBBWW...\nBWWWWW..\nWBBB....\nB.B.....\n', 'B'),
+    ('........\n...W..W.\n...W.WB.\n..WWBBW.\n.W.BBW.B\n.WWWWWBW\n..WWBB..\n....B...\n', 'W'),
+    ('...W.BB.\n.W..WBBB\n..WWBBB.\n.WWBWBB.\n.WBWB..B\n.BWWWWW.\n.BWW.W..\nB.......\n', 'W'),
+    ('...WBB..\n...WWWW.\n...BWWW.\n...BWWW.\n.BBWBWWB\n..WWWWW.\n....BWWW\n.......B\n', 'B'),
+    ('BBBWWW..\nBBBWWB..\nB.BWWWBB\n...WWBW.\n...WBWWW\n..BWW.B.\n..BW.B..\n.B......\n', 'B'),
+    ('..W.....\n..WB....\n..WBW...\n..WBWW..\nWBBBWW..\nWWBWWWWW\nW.WB....\n.W......\n', 'B'),
+    ('........\n......W.\n.WWWWWW.\n.WWBBWW.\nBWBBB...\n.WBWBB..\n..WBB.B.\n..B.....\n', 'B'),
+]
@@ -0,0 +1,129 @@
+"""
+Line-based protocol spoken by long-lived (persistent) players through their
+stdin/stdout, as an alternative to launching launch.sh once per move.
+
+The server starts the player's serve.sh once per match and writes one request
+per line to its stdin:
+
+move <id> <color> <tiles> <delay>
+    asks for a move. <color> is black or white, <tiles> are the 64 tiles of the
+    board row by row (same characters of state.txt, without line breaks) and
+    <delay> is the number of seconds the server waits for the reply.
+quit
+    the match is over, the player must exit.
+
+The player answers each move request with a line on its stdout:
+
+<id> <x>,<y>
+
+Replies whose <id> is not the one of the pending request (e.g. late replies
+to a request whose deadline has passed) are discarded by the server.
+"""
+import os
+import sys
+import select
+
+from common import bitboard
+
+# seconds of the delay kept for the reply to reach the server
+SAFETY_MARGIN = 0.5
+
+
+def encode_tiles(the_board):
+    """
+    Returns the board tiles as a single 64-character string
+    :param the_board: board object
+    :return: str
+    """
+    return str(the_board).replace('\n', '')
+
+
+def decode_tiles(tiles):
+    """
+    Returns the state.txt representation of a 64-character tile string
+    :param tiles: str
+    :return: str
+    """
+    return ''.join('%s\n' % tiles[row:row + 8] for row in range(0, 64, 8))
+
+
+def move_request(request_id, color_name, the_board, delay):
+    """
+    Returns the line asking for a move
+    :return: str
+    """
+    return 'move %d %s %s %s\n' % (request_id, color_name, encode_tiles(the_board), delay)
+
+
+def parse_reply(line):
+    """
+    Parses a reply line
+    :param line: str
+    :return: (int, (int, int)): request id and move; raises ValueError if malformed
+    """
+    request_id, move = line.split()
+    x, y = (int(c) for c in move.split(','))
+    return int(request_id), (x, y)
+
+
+def time_limit(delay):
+    """
+    Returns the seconds a player can think on a request with the given delay:
+    the delay minus SAFETY_MARGIN, but never less than half of it
+    :param delay: str or float, the <delay> field of a move request
+    :return: float
+    """
+    delay = float(delay)
+    return max(delay - SAFETY_MARGIN, delay / 2)
+
+
+def serve(make_move, board_module=bitboard):
+    """
+    Answers move requests until 'quit' or the end of stdin. The player keeps
+    all its state (transposition tables, etc.) between moves.
+    Anything the player prints goes to stderr, so it does not mix with replies.
+    If several requests are waiting (the player missed a deadline), only the
+    last one is answered.
+    :param make_move: function(the_board, color_name, time_limit) -> (x, y), time_limit
+                      being the seconds it has to think (see time_limit)
+    :param board_module: module with the from_string used to build boards
+    :return:
+    """
+    replies = sys.stdout
+    sys.stdout = sys.stderr
+
+    fd = sys.stdin.fileno()
+    pending = b''
+
+    while True:
+        # blocks until a full line arrives, then takes whatever else is already there
+        while b'\n' not in pending:
+            data = os.read(fd, 4096)
+            if not data:
+                return
+            pending += data
+        while select.select([fd], [], [], 0)[0]:
+            data = os.read(fd, 4096)
+            if not data:
+                break
+            pending += data
+
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+
+        request = None
+        for line in lines:
+            fields = line.decode().split()
+            if len(fields) == 0:
+                continue
+            if fields[0] == 'quit':
+                return
+            if fields[0] == 'move':
+                request = fields
+
+        if request is not None:
+            request_id, color_name, tiles, delay = request[1], request[2], request[3], request[4]
+            the_board = board_module.from_string(decode_tiles(tiles))
+            x, y = make_move(the_board, color_name, time_limit(delay))
+            replies.write('%s %d,%d\n' % (request_id, x, y))
+            replies.flush()
@@ -0,0 +1,137 @@
+"""
+Compact append-only store of played games, for self-play, offline analysis
+and book building.
+
+File format: the magic bytes and a version byte, followed by the games one
+after the other. Each game is a 2-byte header (number of moves, final disc
+differential of black as a signed byte) followed by one byte per move: the
+square y * 8 + x, or PASS when the player to move had to pass. Black always
+moves first, so the color of each move follows from the passes.
+
+Summarizing a record file:
+
+python -m common.records <file>
+"""
+import os
+import struct
+import argparse
+
+from common import bitboard
+
+MAGIC = b'OTHR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sB')
+GAME_HEADER = struct.Struct('<Bb')
+
+# move byte of a pass
+PASS = 64
+
+
+def encode_move(move):
+    """
+    Returns the byte of a move
+    :param move: (x, y), or None for a pass
+    :return: int
+    """
+    return PASS if move is None else move[1] * 8 + move[0]
+
+
+def decode_move(byte):
+    """
+    Returns the move of a byte
+    :param byte: int
+    :return: (x, y), or None for a pass
+    """
+    return None if byte == PASS else (byte % 8, byte // 8)
+
+
+class RecordWriter(object):
+    """
+    Appends games to a record file, creating it if needed
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the record file
+        """
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.games = 0
+
+    def write(self, moves, result):
+        """
+        Appends a game
+        :param moves: list of (x, y) or None (pass), in the order they were played
+        :param result: final disc differential of black (black discs - white discs)
+        :return:
+        """
+        self._file.write(GAME_HEADER.pack(len(moves), result) + bytes(encode_move(move) for move in moves))
+        self.games += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    """
+    Reads the games of a record file one at a time, without loading the file
+    :param path: path to the record file
+    :return: generator of (list of moves, black disc differential); moves as in RecordWriter.write
+    """
+    with open(path, 'rb') as f:
+        magic, version = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a game record file (version %d)' % (path, VERSION))
+
+        while True:
+            header = f.read(GAME_HEADER.size)
+            if len(header) < GAME_HEADER.size:
+                return  # end of file (a truncated last game is ignored)
+            count, result = GAME_HEADER.unpack(header)
+            data = f.read(count)
+            if len(data) < count:
+                return
+            yield [decode_move(byte) for byte in data], result
+
+
+def replay(moves):
+    """
+    Replays the moves of a game
+    :param moves: list of moves as in RecordWriter.write
+    :return: generator of (board before the move, color to move, move); the board is
+             the same BitBoard object, updated after each step (copy it to keep it)
+    """
+    b = bitboard.BitBoard()
+    color = b.BLACK
+    for move in moves:
+        yield b, color, move
+        if move is not None and not b.process_move(move, color):
+            raise ValueError('illegal move %s for %s in\n%s' % (move, color, b))
+        color = b.opponent(color)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarizes a game record file.')
+    parser.add_argument('path', type=str, help='Record file.')
+    args = parser.parse_args()
+
+    games, moves, results = 0, 0, {'black': 0, 'white': 0, 'draw': 0}
+    margin = 0
+    for game_moves, result in read_records(args.path):
+        games += 1
+        moves += len(game_moves)
+        margin += abs(result)
+        results['black' if result > 0 else 'white' if result < 0 else 'draw'] += 1
+
+    print('%d games, %.1f moves per game, %.1f average disc margin' % (
+        games, moves / games if games else 0, margin / games if games else 0
+    ))
+    print('black wins %d, white wins %d, draws %d' % (results['black'], results['white'], results['draw']))
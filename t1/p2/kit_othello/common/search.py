@@ -0,0 +1,56 @@
+"""
+Search drivers shared by the custom players.
+"""
+import time
+
+# branching factor assumed before two iterations have been timed
+DEFAULT_BRANCHING = 4.0
+
+
+def iterative_deepening(search, max_depth, time_limit, start_time, on_iteration=None):
+    """
+    Calls search with increasing depths and keeps the result of the last
+    iteration that completed within the time limit; an iteration cut by the
+    time limit is discarded. The next iteration is skipped when the effective
+    branching factor (ratio between the times of the last two iterations)
+    predicts it would not finish in the remaining time.
+
+    The best move of a completed iteration is stored in the transposition
+    table at the root, so the next iteration searches it first.
+    :param search: function(depth) -> (value, move), expected to return
+                   quickly once time.time() - start_time >= time_limit
+    :param max_depth: deepest iteration
+    :param time_limit: seconds available since start_time
+    :param start_time: time.time() when the move started
+    :param on_iteration: function(depth, seconds) called after every iteration, or None
+    :return: (value, move, depth of the completed iteration used)
+    """
+    best = None
+    previous_elapsed = None
+
+    for depth in range(1, max(1, max_depth) + 1):
+        iteration_start = time.time()
+        value, move = search(depth)
+        now = time.time()
+        if on_iteration is not None:
+            on_iteration(depth, now - iteration_start)
+
+        if now - start_time >= time_limit:
+            # the iteration was cut, its result is unreliable
+            if best is None:
+                best = value, move, 0  # better than nothing
+            break
+
+        best = value, move, depth
+        elapsed = now - iteration_start
+
+        if previous_elapsed:
+            branching = max(elapsed / previous_elapsed, 1.0)
+        else:
+            branching = DEFAULT_BRANCHING
+        previous_elapsed = elapsed
+
+        if elapsed * branching > time_limit - (now - start_time):
+            break  # the next iteration is not expected to finish
+
+    return best
@@ -0,0 +1,127 @@
+"""
+In-process self-play: plays games between player functions on BitBoards,
+without the server, subprocesses or state files, and stores them with
+common.records.
+
+A player function receives a board (a copy, it may change it freely) and the
+color to move ('B' or 'W') and returns its move (x, y); it is only called
+when the color has a legal move. Players are given on the command line as
+'random' or as a player directory, whose decide() is searched to a fixed depth:
+
+python -m common.selfplay -o games.rec [-n games] [-b player] [-w player] [-d depth] [-r plies]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import importlib.util
+
+from common import bitboard
+from common import book
+from common import records
+
+
+def random_player(rng):
+    """
+    Returns a player function choosing uniformly among the legal moves
+    :param rng: random.Random object
+    :return: function(the_board, color) -> (x, y)
+    """
+    return lambda the_board, color: rng.choice(the_board.legal_moves(color))
+
+
+def load_player(directory, depth=None):
+    """
+    Imports the customplayer.py module of a player directory
+    :param directory: path to the player directory
+    :param depth: fixed search depth (no time limit), None keeps the player's time limit
+    :return: module
+    """
+    name = os.path.basename(os.path.normpath(directory))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, 'customplayer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    if depth is not None:
+        module.MAX_RUN_TIME = float('inf')
+        module.MAX_DEPTH = depth
+    return module
+
+
+def play_game(black, white, random_plies=0, rng=None):
+    """
+    Plays a game to its end
+    :param black: player function of black
+    :param white: player function of white
+    :param random_plies: number of plies played at random first (varies the openings)
+    :param rng: random.Random object for the random plies
+    :return: (list of moves, black disc differential); moves as in records.RecordWriter.write
+    """
+    b = bitboard.BitBoard()
+    color = b.BLACK
+    players = {b.BLACK: black, b.WHITE: white}
+    moves = []
+
+    while True:
+        if not b.has_legal_move(color):
+            if not b.has_legal_move(b.opponent(color)):
+                break
+            moves.append(None)
+        else:
+            if len(moves) < random_plies:
+                move = rng.choice(b.legal_moves(color))
+            else:
+                move = players[color](b.copy(), color)
+            if not b.process_move(move, color):
+                raise ValueError('%s played the illegal move %s in\n%s' % (color, move, b))
+            moves.append(move)
+        color = b.opponent(color)
+
+    return moves, b.piece_count[b.BLACK] - b.piece_count[b.WHITE]
+
+
+def player_function(spec, depth, rng):
+    """
+    Returns the player function of a command line player
+    :param spec: 'random' or a player directory
+    :param depth: search depth of directory players
+    :param rng: random.Random object of the random player
+    :return: function(the_board, color) -> (x, y)
+    """
+    if spec == 'random':
+        return random_player(rng)
+    player = load_player(spec, depth)
+    # the book would make every game identical after the random plies
+    player.BOOK = book.OpeningBook()
+    return player.decide
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plays games in process and appends them to a record file.')
+    parser.add_argument('-o', '--output-file', type=str, dest='output', required=True, help='Record file.')
+    parser.add_argument('-n', '--games', type=int, default=1000, help='Number of games.')
+    parser.add_argument('-b', '--black', type=str, default='random', help="'random' or player directory.")
+    parser.add_argument('-w', '--white', type=str, default='random', help="'random' or player directory.")
+    parser.add_argument('-d', '--depth', type=int, default=2, help='Search depth of directory players.')
+    parser.add_argument('-r', '--random-plies', type=int, default=0, help='Plies played at random first.')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Random seed.')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # each side loads its own module, with its own tables, even when both are the same player
+    black = player_function(args.black, args.depth, rng)
+    white = player_function(args.white, args.depth, rng)
+
+    start = time.time()
+    results = [0, 0, 0]  # black wins, white wins, draws
+    with records.RecordWriter(args.output) as writer:
+        for i in range(args.games):
+            moves, result = play_game(black, white, args.random_plies, rng)
+            writer.write(moves, result)
+            results[0 if result > 0 else 1 if result < 0 else 2] += 1
+
+    elapsed = time.time() - start
+    print('%d games in %.1fs (%.0f games/s): black wins %d, white wins %d, draws %d' % (
+        args.games, elapsed, args.games / elapsed, results[0], results[1], results[2]
+    ), file=sys.stderr)
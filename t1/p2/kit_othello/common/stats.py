@@ -0,0 +1,173 @@
+"""
+Search statistics of the custom players: one JSON object per move with the
+nodes, leaves, cutoffs, transposition table hits, depth reached, the time and
+nodes of each iteration and the effective branching factor.
+
+Collection is off unless the environment variable OTHELLO_STATS names the
+file the player appends the objects to (server.py --stats sets it). When off,
+the players only pay one attribute check per move: node counts come from the
+counters that the transposition table and the move ordering keep anyway, and
+leaves are counted by wrapping the evaluation function only when collecting.
+"""
+import json
+import time
+
+# environment variable with the path of the statistics file
+ENV_VAR = 'OTHELLO_STATS'
+
+
+class SearchStats(object):
+    """
+    Collects the statistics of the searches of a player, move by move
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: file the statistics of each move are appended to, None disables them
+        """
+        self.path = path
+        self.enabled = path is not None
+        self.leaves = 0
+
+        self._table = None
+        self._ordering = None
+        self._start_time = None
+        self._start_counters = None
+        self._iterations = []
+
+    def counting(self, evaluate):
+        """
+        Returns the evaluation function counting the leaves it evaluates
+        :param evaluate: function(the_board, color)
+        :return: function(the_board, color)
+        """
+        def counted(the_board, color):
+            self.leaves += 1
+            return evaluate(the_board, color)
+        return counted
+
+    def _counters(self):
+        """
+        Returns the current totals of the counters
+        :return: dict
+        """
+        return {
+            'leaves': self.leaves,
+            'interior': self._ordering.nodes,
+            'cutoffs': self._ordering.cutoffs,
+            'first_move_cutoffs': self._ordering.first_move_cutoffs,
+            'tt_probes': self._table.probes,
+            'tt_hits': self._table.hits,
+            'tt_cutoffs': self._table.cutoffs,
+        }
+
+    def _nodes(self, counters):
+        """
+        Returns the nodes searched since the start of the move: every node
+        is a leaf, a transposition table cutoff or has its moves ordered
+        """
+        base = self._start_counters
+        return sum(counters[name] - base[name] for name in ('leaves', 'interior', 'tt_cutoffs'))
+
+    def start_move(self, table, ordering):
+        """
+        Must be called at the start of each decide()
+        :param table: transposition.TranspositionTable of the player
+        :param ordering: ordering.MoveOrdering of the player
+        :return:
+        """
+        self._table, self._ordering = table, ordering
+        self._start_time = time.time()
+        self._start_counters = self._counters()
+        self._iterations = []
+
+    def iteration(self, depth, seconds):
+        """
+        Records an iteration of the iterative deepening (see search.iterative_deepening)
+        :param depth: depth of the iteration
+        :param seconds: time it took
+        :return:
+        """
+        self._iterations.append({'depth': depth, 'seconds': seconds, 'nodes': self._nodes(self._counters())})
+
+    def finish_move(self, move, depth, source='search', **extra):
+        """
+        Appends the statistics of the move to the file
+        :param move: (x, y) chosen
+        :param depth: depth of the completed iteration used
+        :param source: 'search', 'book' or 'endgame'
+        :param extra: other values to record
+        :return:
+        """
+        counters = self._counters()
+        base = self._start_counters
+        seconds = time.time() - self._start_time
+
+        # nodes of each iteration, from the cumulative counts
+        previous = 0
+        for it in self._iterations:
+            it['nodes'], previous = it['nodes'] - previous, it['nodes']
+
+        # effective branching factor: b such that b ** depth is the size of the last
+        # completed iteration (ratios between iterations mislead when the table
+        # already holds results of the previous moves)
+        complete = [it for it in self._iterations if it['depth'] == depth]
+        ebf = complete[-1]['nodes'] ** (1.0 / depth) if complete and depth > 0 else None
+
+        record = {
+            'move': list(move) if move is not None else None,
+            'source': source,
+            'depth': depth,
+            'seconds': seconds,
+            'nodes': self._nodes(counters),
+            'ebf': ebf,
+            'iterations': self._iterations,
+        }
+        record.update({name: counters[name] - base[name] for name in counters})
+        record.update(extra)
+
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def read_stats(path):
+    """
+    Reads a statistics file, skipping incomplete lines
+    :param path:
+    :return: list of dict, one per move
+    """
+    moves = []
+    with open(path) as f:
+        for line in f:
+            try:
+                moves.append(json.loads(line))
+            except ValueError:
+                pass  # written by a player killed in the middle of the line
+    return moves
+
+
+def aggregate(moves):
+    """
+    Summarizes the statistics of the moves of a match
+    :param moves: list of dict (see read_stats)
+    :return: dict
+    """
+    searched = [m for m in moves if m['source'] == 'search']
+    nodes = sum(m['nodes'] for m in moves)
+    seconds = sum(m['seconds'] for m in moves)
+    probes = sum(m['tt_probes'] for m in moves)
+    ebfs = [m['ebf'] for m in searched if m['ebf'] is not None]
+
+    return {
+        'moves': len(moves),
+        'book_moves': sum(1 for m in moves if m['source'] == 'book'),
+        'endgame_moves': sum(1 for m in moves if m['source'] == 'endgame'),
+        'nodes': nodes,
+        'leaves': sum(m['leaves'] for m in moves),
+        'cutoffs': sum(m['cutoffs'] for m in moves),
+        'nodes_per_second': nodes / seconds if seconds else 0.0,
+        'average_depth': sum(m['depth'] for m in searched) / len(searched) if searched else 0.0,
+        'max_depth': max([m['depth'] for m in searched] or [0]),
+        'tt_hit_rate': sum(m['tt_hits'] for m in moves) / probes if probes else 0.0,
+        'average_ebf': sum(ebfs) / len(ebfs) if ebfs else 0.0,
+    }
@@ -0,0 +1,225 @@
+"""
+The 8 symmetries of the Othello board (rotations and reflections). Positions
+that are images of each other under a symmetry have the same value, so caches
+and books store only their canonical form. Squares are indexed y * 8 + x.
+
+Bitboards are transformed with delta swaps (three flips composed), cheap
+enough to canonicalize a position on every probe of a cache; Board and
+BitBoard objects and moves have their own helpers.
+"""
+from common import evaluation
+from common import zobrist
+
+# symmetry ids, each one maps (x, y) to the square given by _TRANSFORMS
+IDENTITY = 0
+ROTATE_90 = 1
+ROTATE_180 = 2
+ROTATE_270 = 3
+FLIP_HORIZONTAL = 4
+FLIP_VERTICAL = 5
+FLIP_DIAGONAL = 6
+FLIP_ANTI_DIAGONAL = 7
+
+SYMMETRIES = range(8)
+
+_TRANSFORMS = [
+    lambda x, y: (x, y),
+    lambda x, y: (7 - y, x),
+    lambda x, y: (7 - x, 7 - y),
+    lambda x, y: (y, 7 - x),
+    lambda x, y: (7 - x, y),
+    lambda x, y: (x, 7 - y),
+    lambda x, y: (y, x),
+    lambda x, y: (7 - y, 7 - x),
+]
+
+# PERMUTATIONS[s][i] is the square where symmetry s takes square i
+PERMUTATIONS = [
+    [t(i % 8, i // 8)[1] * 8 + t(i % 8, i // 8)[0] for i in range(64)]
+    for t in _TRANSFORMS
+]
+
+# INVERSE[s] is the symmetry that undoes s
+INVERSE = [
+    next(u for u in SYMMETRIES if all(PERMUTATIONS[u][PERMUTATIONS[s][i]] == i for i in range(64)))
+    for s in SYMMETRIES
+]
+
+
+# masks of the delta swaps below
+_ODD_COLUMNS = 0x5555555555555555
+_COLUMN_PAIRS = 0x3333333333333333
+_COLUMN_QUADS = 0x0F0F0F0F0F0F0F0F
+_DIAGONAL_1 = 0x5500550055005500
+_DIAGONAL_2 = 0x3333000033330000
+_DIAGONAL_4 = 0x0F0F0F0F00000000
+
+
+def flip_vertical(bits):
+    """
+    Mirrors a bitboard top to bottom, (x, y) -> (x, 7 - y): reverses its bytes
+    :param bits: int
+    :return: int
+    """
+    return int.from_bytes(bits.to_bytes(8, 'little'), 'big')
+
+
+def flip_horizontal(bits):
+    """
+    Mirrors a bitboard left to right, (x, y) -> (7 - x, y): reverses the bits of each byte
+    :param bits: int
+    :return: int
+    """
+    bits = ((bits >> 1) & _ODD_COLUMNS) | ((bits & _ODD_COLUMNS) << 1)
+    bits = ((bits >> 2) & _COLUMN_PAIRS) | ((bits & _COLUMN_PAIRS) << 2)
+    return ((bits >> 4) & _COLUMN_QUADS) | ((bits & _COLUMN_QUADS) << 4)
+
+
+def flip_diagonal(bits):
+    """
+    Mirrors a bitboard along the diagonal from (0, 0) to (7, 7), (x, y) -> (y, x)
+    :param bits: int
+    :return: int
+    """
+    t = _DIAGONAL_4 & (bits ^ (bits << 28))
+    bits ^= t ^ (t >> 28)
+    t = _DIAGONAL_2 & (bits ^ (bits << 14))
+    bits ^= t ^ (t >> 14)
+    t = _DIAGONAL_1 & (bits ^ (bits << 7))
+    return bits ^ t ^ (t >> 7)
+
+
+# BIT_TRANSFORMS[s](bits) applies symmetry s to a bitboard, composing the flips above
+BIT_TRANSFORMS = [
+    lambda bits: bits,
+    lambda bits: flip_horizontal(flip_diagonal(bits)),
+    lambda bits: flip_vertical(flip_horizontal(bits)),
+    lambda bits: flip_vertical(flip_diagonal(bits)),
+    flip_horizontal,
+    flip_vertical,
+    flip_diagonal,
+    lambda bits: flip_vertical(flip_horizontal(flip_diagonal(bits))),
+]
+
+
+def transform_bits(bits, symmetry):
+    """
+    Applies a symmetry to a bitboard
+    :param bits: int, bit i set for each occupied square i
+    :param symmetry: symmetry id
+    :return: int
+    """
+    return BIT_TRANSFORMS[symmetry](bits)
+
+
+def transform_move(move, symmetry):
+    """
+    Applies a symmetry to a move
+    :param move: (x, y)
+    :param symmetry: symmetry id
+    :return: (x, y)
+    """
+    return _TRANSFORMS[symmetry](move[0], move[1])
+
+
+def inverse_transform_move(move, symmetry):
+    """
+    Undoes a symmetry on a move, e.g. to play in the original position a move
+    found in its canonical form
+    :param move: (x, y)
+    :param symmetry: symmetry id
+    :return: (x, y)
+    """
+    return _TRANSFORMS[INVERSE[symmetry]](move[0], move[1])
+
+
+def images(bits):
+    """
+    Returns the images of a bitboard under the 8 symmetries, sharing the
+    intermediate flips (1 diagonal, 2 horizontal and 4 vertical flips)
+    :param bits: int
+    :return: list of 8 int, indexed by symmetry id
+    """
+    horizontal = flip_horizontal(bits)
+    diagonal = flip_diagonal(bits)
+    rotated = flip_horizontal(diagonal)
+    return [
+        bits,
+        rotated,
+        flip_vertical(horizontal),
+        flip_vertical(diagonal),
+        horizontal,
+        flip_vertical(bits),
+        diagonal,
+        flip_vertical(rotated),
+    ]
+
+
+def canonical(black, white):
+    """
+    Returns the canonical form of a position: its image with the smallest
+    (black, white) among the 8 symmetries
+    :param black: int, bitboard of black discs
+    :param white: int, bitboard of white discs
+    :return: (int, int, int): black and white bitboards of the canonical form
+             and the symmetry that takes the position to it
+    """
+    return min(zip(images(black), images(white), SYMMETRIES))
+
+
+def board_bits(the_board):
+    """
+    Returns the bitboards of a Board or BitBoard
+    :param the_board: Board or BitBoard object
+    :return: (int, int): black and white bitboards
+    """
+    if hasattr(the_board, 'tiles'):
+        black, white = 0, 0
+        for y, row in enumerate(the_board.tiles):
+            for x, tile in enumerate(row):
+                if tile == the_board.BLACK:
+                    black |= 1 << (y * 8 + x)
+                elif tile == the_board.WHITE:
+                    white |= 1 << (y * 8 + x)
+        return black, white
+    return the_board.black, the_board.white
+
+
+def canonical_board(the_board):
+    """
+    Returns the canonical form of a board (see canonical)
+    :param the_board: Board or BitBoard object
+    :return: (int, int, int): black and white bitboards of the canonical form
+             and the symmetry that takes the board to it
+    """
+    black, white = board_bits(the_board)
+    return canonical(black, white)
+
+
+def transform_board(the_board, symmetry):
+    """
+    Returns the image of a board under a symmetry, a new board of the same
+    class with its hash and weight sums recomputed (the undo history is lost).
+    Use the symmetry of INVERSE to transform it back.
+    :param the_board: Board or BitBoard object
+    :param symmetry: symmetry id
+    :return: Board or BitBoard object
+    """
+    other = the_board.copy()
+    other._legal_moves = {the_board.BLACK: None, the_board.WHITE: None}
+
+    if hasattr(the_board, 'tiles'):
+        permutation = PERMUTATIONS[symmetry]
+        for i in range(64):
+            j = permutation[i]
+            other.tiles[j // 8][j % 8] = the_board.tiles[i // 8][i % 8]
+        other.reset_legal_moves()
+        rows = other.tiles
+    else:
+        other.black = transform_bits(the_board.black, symmetry)
+        other.white = transform_bits(the_board.white, symmetry)
+        rows = other.rows()
+
+    other.hash = zobrist.hash_rows(rows)
+    other.weight_sums = evaluation.weight_sums(rows)
+    return other
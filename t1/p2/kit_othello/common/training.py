@@ -0,0 +1,142 @@
+"""
+Fits the weights of common.patterns to recorded games (common.records):
+every position of every game, seen by both colors, is a sample whose target
+is the final disc differential of that color. Each phase is fitted separately
+by ridge regression, solving the normal equations built in batches with numpy.
+
+Requires numpy (the players only read the resulting weight file):
+
+python -m common.training -o <weight file> [-l ridge] <record file> [<record file> ...]
+"""
+import sys
+import argparse
+
+import numpy as np
+
+from common import patterns
+from common import records
+
+# samples processed at a time when building the normal equations
+BATCH_SIZE = 100000
+
+
+def samples(paths):
+    """
+    Generates the samples of recorded games
+    :param paths: list of record files
+    :return: generator of (phase, class differences, edge weight ids, target)
+    """
+    for path in paths:
+        for moves, result in records.read_records(path):
+            for the_board, color, move in records.replay(moves):
+                p = patterns.phase(the_board.piece_count[the_board.EMPTY])
+                for own, opp, target in ((the_board.black, the_board.white, result),
+                                         (the_board.white, the_board.black, -result)):
+                    yield (
+                        p,
+                        patterns.class_differences(own, opp),
+                        [patterns.EDGE_IDS[c] for c in patterns.edge_configurations(own, opp)],
+                        target,
+                    )
+
+
+class NormalEquations(object):
+    """
+    Accumulates the normal equations of the least squares fit of one phase.
+    The unknowns are the class weights followed by the edge weights (by id).
+    """
+
+    def __init__(self):
+        size = patterns.NUM_CLASSES + patterns.NUM_EDGE_IDS
+        self.matrix = np.zeros((size, size))
+        self.vector = np.zeros(size)
+        self.targets = 0.0  # sum of squared targets, for the residual
+        self.count = 0
+
+    def add(self, classes, edges, targets):
+        """
+        Adds a batch of samples
+        :param classes: array (M, NUM_CLASSES) of class differences
+        :param edges: int array (M, 4) of edge weight ids
+        :param targets: array (M,)
+        :return:
+        """
+        k = patterns.NUM_CLASSES
+        columns = edges + k
+
+        self.matrix[:k, :k] += classes.T @ classes
+        self.vector[:k] += classes.T @ targets
+        for i in range(4):
+            # class x edge block, mirrored below
+            np.add.at(self.matrix, (columns[:, i][:, None], np.arange(k)[None, :]), classes)
+            np.add.at(self.vector, columns[:, i], targets)
+            for j in range(4):
+                np.add.at(self.matrix, (columns[:, i], columns[:, j]), 1.0)
+
+        self.targets += float(targets @ targets)
+        self.count += len(targets)
+
+    def solve(self, ridge):
+        """
+        Returns the weights minimizing the squared error plus ridge times the squared weights
+        :param ridge: float
+        :return: (array of class weights, array of edge weights by id, root mean squared error)
+        """
+        k = patterns.NUM_CLASSES
+        matrix = self.matrix.copy()
+        matrix[:k, k:] = matrix[k:, :k].T
+        weights = np.linalg.solve(matrix + ridge * np.eye(len(matrix)), self.vector)
+
+        # squared error from the normal equations: w'Aw - 2w'b + y'y
+        error = weights @ matrix @ weights - 2 * weights @ self.vector + self.targets
+        rmse = np.sqrt(max(error, 0.0) / self.count) if self.count else 0.0
+        return weights[:k], weights[k:], rmse
+
+
+def train(paths, ridge, verbose=False):
+    """
+    Fits the weights of every phase
+    :param paths: list of record files
+    :param ridge: regularization (pulls rarely seen edge configurations to 0)
+    :param verbose: prints the error of each phase
+    :return: weights as expected by patterns.write_weights
+    """
+    equations = [NormalEquations() for p in patterns.PHASE_MIN_EMPTIES]
+    batches = [[] for p in patterns.PHASE_MIN_EMPTIES]
+
+    def flush(p):
+        batch = batches[p]
+        equations[p].add(
+            np.array([s[1] for s in batch], dtype=float),
+            np.array([s[2] for s in batch], dtype=np.int64),
+            np.array([s[3] for s in batch], dtype=float),
+        )
+        batches[p] = []
+
+    for sample in samples(paths):
+        batches[sample[0]].append(sample)
+        if len(batches[sample[0]]) >= BATCH_SIZE:
+            flush(sample[0])
+    for p in range(len(batches)):
+        if batches[p]:
+            flush(p)
+
+    weights = []
+    for p, e in enumerate(equations):
+        class_weights, edge_weights, rmse = e.solve(ridge)
+        if verbose:
+            print('phase %d (%d+ empties): %d samples, rms error %.2f discs' % (
+                p, patterns.PHASE_MIN_EMPTIES[p], e.count, rmse
+            ), file=sys.stderr)
+        weights.append((class_weights.tolist(), [float(edge_weights[i]) for i in patterns.EDGE_IDS]))
+    return weights
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fits pattern weights to recorded games.')
+    parser.add_argument('records', nargs='+', help='Record files (see common.selfplay).')
+    parser.add_argument('-o', '--output-file', type=str, dest='output', required=True, help='Weight file.')
+    parser.add_argument('-l', '--ridge', type=float, default=10.0, help='Ridge regularization.')
+    args = parser.parse_args()
+
+    patterns.write_weights(args.output, train(args.records, args.ridge, verbose=True))
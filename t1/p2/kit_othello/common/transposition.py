@@ -0,0 +1,123 @@
+"""
+Bounded transposition table for the alpha-beta players.
+
+Positions are keyed by the board's zobrist hash xor zobrist.TURN[color] xor
+zobrist.ROOT[root color], as values are seen from the player at the root. The table
+has a fixed number of slots (key modulo size) and each slot keeps one entry:
+a new entry replaces the old one if the old one comes from a previous search or
+was searched with a depth not greater than the new one (depth-preferred with aging).
+"""
+
+# bound types
+EXACT = 0
+LOWER = 1  # fail high: the real value is >= the stored one
+UPPER = 2  # fail low: the real value is <= the stored one
+
+# default number of slots (must be a power of two)
+DEFAULT_SIZE = 1 << 18
+
+
+class TranspositionTable(object):
+    """
+    Fixed-size hash table of search results. A table of size 0 stores nothing,
+    which allows measuring the search without it.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        """
+        :param size: number of slots, a power of two (or 0 to disable the table)
+        """
+        if size & (size - 1):
+            raise ValueError('Transposition table size must be a power of two')
+
+        self.size = size
+        self._mask = size - 1
+        # each slot is None or a tuple (key, depth, bound, value, move, generation)
+        self._slots = [None] * size
+        self.generation = 0
+
+        # statistics
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+
+    def new_search(self):
+        """
+        Must be called before each search (each decide()): entries of older
+        searches become preferred victims for replacement
+        :return:
+        """
+        self.generation += 1
+
+    def probe(self, key, depth, alpha, beta):
+        """
+        Looks the position up
+        :param key: int, position key
+        :param depth: remaining depth of the node being searched
+        :param alpha:
+        :param beta:
+        :return: (value, move): value is not None when the stored result is
+                 deep enough to be returned right away; move is the best move
+                 stored for the position (or None), to be searched first
+        """
+        if not self.size:
+            return None, None
+
+        self.probes += 1
+        entry = self._slots[key & self._mask]
+        if entry is None or entry[0] != key:
+            return None, None
+
+        self.hits += 1
+        e_key, e_depth, bound, value, move, generation = entry
+
+        if e_depth >= depth:
+            if bound == EXACT or (bound == LOWER and value >= beta) or (bound == UPPER and value <= alpha):
+                self.cutoffs += 1
+                return value, move
+
+        return None, move
+
+    def store(self, key, depth, value, alpha, beta, move):
+        """
+        Stores the result of a search. The bound type comes from comparing
+        the value with the window the node was searched with.
+        :param key: int, position key
+        :param depth: remaining depth the node was searched with
+        :param value: value returned by the node
+        :param alpha: alpha the node was called with (before being raised)
+        :param beta: beta the node was called with (before being lowered)
+        :param move: best move found
+        :return:
+        """
+        if not self.size:
+            return
+
+        if value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        index = key & self._mask
+        entry = self._slots[index]
+        if entry is None or entry[5] != self.generation or entry[1] <= depth:
+            self._slots[index] = (key, depth, bound, value, move, self.generation)
+            self.stores += 1
+
+    def hit_rate(self):
+        """
+        Returns the fraction of probes that found the position
+        :return: float
+        """
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self):
+        """
+        Removes every entry and resets the statistics
+        :return:
+        """
+        self._slots = [None] * self.size
+        self.probes = self.hits = self.cutoffs = self.stores = 0
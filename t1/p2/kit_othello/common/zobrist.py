@@ -0,0 +1,69 @@
+"""
+Zobrist keys shared by every board implementation, so that Board and BitBoard
+produce the same hash for the same position. Squares are indexed row * 8 + col.
+"""
+import random
+
+# fixed seed: hashes must be reproducible across processes (tables, opening books)
+_rng = random.Random(0x07E110)
+
+# one random 64-bit key per (color, square)
+KEYS = {
+    'B': [_rng.getrandbits(64) for i in range(64)],
+    'W': [_rng.getrandbits(64) for i in range(64)],
+}
+
+# xor of both colors' keys: toggles a square from one color to the other
+FLIP_KEYS = [KEYS['B'][i] ^ KEYS['W'][i] for i in range(64)]
+
+# the board hash does not know whose turn it is, search keys add this
+TURN = {'B': 0, 'W': _rng.getrandbits(64)}
+
+# the alpha-beta players store values seen from the player at the root, so
+# their keys also add this: a table shared by searches of both colors (books,
+# self-play) must not mix the values of one with the other
+ROOT = {'B': 0, 'W': _rng.getrandbits(64)}
+
+
+def hash_rows(rows):
+    """
+    Computes the hash of a board from scratch
+    :param rows: iterable of 8 strings (or lists) with the tiles of each row
+    :return: int
+    """
+    h = 0
+    for lineno, row in enumerate(rows):
+        for colno, tile in enumerate(row):
+            if tile in KEYS:
+                h ^= KEYS[tile][lineno * 8 + colno]
+    return h
+
+
+def _byte_keys(keys, shift):
+    """
+    Returns the xor of the keys of the squares of every byte value at a byte position
+    """
+    table = [0] * 256
+    for byte in range(1, 256):
+        low = byte & -byte
+        table[byte] = table[byte ^ low] ^ keys[shift + low.bit_length() - 1]
+    return table
+
+
+# BYTE_KEYS[color][k][byte]: xor of the keys of the squares set in byte k (squares 8k to 8k+7)
+BYTE_KEYS = {color: [_byte_keys(KEYS[color], 8 * k) for k in range(8)] for color in KEYS}
+
+
+def hash_bits(black, white):
+    """
+    Computes the hash of a board from its bitboards (see common.bitboard)
+    one byte at a time, fast enough to hash a canonical form on every probe
+    :param black: int
+    :param white: int
+    :return: int
+    """
+    h = 0
+    for tables, bits in ((BYTE_KEYS['B'], black), (BYTE_KEYS['W'], white)):
+        for table, byte in zip(tables, bits.to_bytes(8, 'little')):
+            h ^= table[byte]
+    return h
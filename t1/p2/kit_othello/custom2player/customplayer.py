@@ -1,6 +1,18 @@
 import sys
 sys.path.append('..')
-from common import board
+from common import bitboard
+from common import book
+from common import endgame
+from common import evaluation
+from common import ordering
+from common import parallel
+from common import patterns
+from common import protocol
+from common import search
+from common import stats
+from common import transposition
+from common import zobrist
+import os
 import time
 
 DEBUG = False
@@ -8,29 +20,79 @@ MAX_RUN_TIME = 3.8
 INVALID_MOVE = (-1, -1)
 INFINITY = float('inf')
 MAX_DEPTH = 50
+TT_SIZE = transposition.DEFAULT_SIZE
+ENDGAME_EMPTIES = 12
+WORKERS = 1  # processes of the parallel search, 1 searches in this process only
+
+TABLE = transposition.TranspositionTable(TT_SIZE)
+ORDERING = ordering.MoveOrdering()
+ENDGAME = endgame.EndgameSolver()
+STATS = stats.SearchStats(os.environ.get(stats.ENV_VAR))
+PARALLEL = parallel.RootSplitter(WORKERS, lambda b: (TABLE.new_search(), ORDERING.new_search(b)), lambda: ORDERING.nodes)
+BOOK = book.OpeningBook(os.path.join(os.path.dirname(os.path.abspath(__file__)), book.BOOK_FILE))
+PATTERNS = patterns.PatternEvaluator(os.path.join(os.path.dirname(os.path.abspath(__file__)), patterns.WEIGHTS_FILE))
 
 def debugPrint(str):
     if DEBUG: print("DEBUG B: " + str)
 
-def make_move(the_board, color):
+def make_move(the_board, color, time_limit=None):
     """
-    Returns the best move from the list of possible ones according to up to MAX_RUN_TIME seconds of execution of minimax with alpha-beta pruning 
+    Returns the best move from the list of possible ones according to up to time_limit seconds (MAX_RUN_TIME by default) of execution of minimax with alpha-beta pruning 
     :return: (int, int)
     """
-    color = board.Board.WHITE if color == 'white' else board.Board.BLACK
+    color = bitboard.BitBoard.WHITE if color == 'white' else bitboard.BitBoard.BLACK
 
-    return decide(the_board, color)
+    return decide(the_board, color, time_limit)
+
+def decide(the_board, color, time_limit=None):
+    if time_limit is None:
+        time_limit = MAX_RUN_TIME
+    if STATS.enabled:
+        STATS.start_move(TABLE, ORDERING)
+
+    # opening book: positions searched deeply offline (see common.book)
+    m = BOOK.lookup(the_board, color)
+    if m is not None:
+        if DEBUG: debugPrint(f'Book move: { m }')
+        if STATS.enabled:
+            STATS.finish_move(m, 0, 'book')
+        return m
 
-def decide(the_board, color):
     initTime = time.time()
-    v, m = max_value(the_board, color, -INFINITY, INFINITY, initTime, MAX_DEPTH)
-    print(f"                                Tempo executado: { time.time() - initTime }")
-    debugPrint(f'Found best move: { v }, { m }')
+    # exact endgame: solves to the end of the game, falling back to the
+    # heuristic search for the remaining time if it takes too long
+    if the_board.piece_count[the_board.EMPTY] <= ENDGAME_EMPTIES:
+        endgame_nodes = ENDGAME.nodes
+        v, m = ENDGAME.solve(the_board, color, time_limit / 2)
+        if m is not None:
+            if DEBUG: debugPrint(f'Endgame solved: { v }, { m }')
+            if STATS.enabled:
+                STATS.finish_move(m, the_board.piece_count[the_board.EMPTY], 'endgame',
+                                  nodes=ENDGAME.nodes - endgame_nodes, value=v)
+            return m
+
+    TABLE.new_search()
+    ORDERING.new_search(the_board)
+    PARALLEL.new_search()
+    if PARALLEL.workers > 1:
+        # root moves split among the worker processes (see common.parallel)
+        root_search = lambda depth: PARALLEL.search(the_board, color, min_value, initTime, time_limit, depth)
+    else:
+        root_search = lambda depth: max_value(the_board, color, -INFINITY, INFINITY, initTime, time_limit, depth)
+
+    # deepens one ply at a time, keeping the move of the last completed depth
+    max_depth = min(MAX_DEPTH, the_board.piece_count[the_board.EMPTY])
+    v, m, depth = search.iterative_deepening(root_search, max_depth, time_limit, initTime,
+                                             STATS.iteration if STATS.enabled else None)
+    if DEBUG: debugPrint(f"                                Tempo executado: { time.time() - initTime }")
+    if DEBUG: debugPrint(f'Found best move: { v }, { m } (depth { depth })')
+    if STATS.enabled:
+        STATS.finish_move(m, depth, value=v)
     return m
 
-def max_value(the_board, color, alpha, beta, start_time, remaining_depth):
+def max_value(the_board, color, alpha, beta, start_time, time_limit, remaining_depth):
     current_legal_moves = the_board.legal_moves(color)
-    debugPrint(f'[MAX] Current legal moves: { current_legal_moves }')
+    if DEBUG: debugPrint(f'[MAX] Current legal moves: { current_legal_moves }')
 
     if len(current_legal_moves) == 0:
         debugPrint('[MAX] Stopping because found no further possible moves')
@@ -38,36 +100,50 @@ def max_value(the_board, color, alpha, beta, start_time, remaining_depth):
     
     best_move = current_legal_moves[0]
     
-    if time.time() - start_time >= MAX_RUN_TIME:
+    if time.time() - start_time >= time_limit:
         debugPrint('[MAX] Stopping because time is up')
-        print(f"                 Depth was: { remaining_depth }")
+        if DEBUG: debugPrint(f"                 Depth was: { remaining_depth }")
         return utility(the_board, color), best_move
     
     if remaining_depth == 0:
         debugPrint('[MAX] Stopping because reach MAX_DEPTH')
         return utility(the_board, color), best_move
 
-    for s in current_legal_moves:
-        other_board = board.from_string(str(the_board))
-        other_board.process_move(s, color)
-        
-        min_val = min_value(other_board, the_board.opponent(color), alpha, beta, start_time, remaining_depth - 1)[0]
-        debugPrint(f'[MAX] MinVal { min_val }')
+    # transposition table: stored results deep enough are returned right away,
+    # otherwise the stored best move is searched first (see common.ordering)
+    key = the_board.hash ^ zobrist.TURN[color] ^ zobrist.ROOT[color]
+    tt_value, tt_move = TABLE.probe(key, remaining_depth, alpha, beta)
+    if tt_value is not None:
+        return tt_value, tt_move
+    current_legal_moves = ORDERING.order(the_board, color, current_legal_moves, tt_move)
+    original_alpha, original_beta = alpha, beta
+
+    for index, s in enumerate(current_legal_moves):
+        # searches in place: the move is taken back before trying the next one
+        the_board.make_move(s, color)
+        min_val = min_value(the_board, the_board.opponent(color), alpha, beta, start_time, time_limit, remaining_depth - 1)[0]
+        the_board.unmake_move()
+        if DEBUG: debugPrint(f'[MAX] MinVal { min_val }')
 
         if min_val > alpha:
-            debugPrint(f'[MAX] Found better move { s }')
+            if DEBUG: debugPrint(f'[MAX] Found better move { s }')
             alpha = min_val
             best_move = s
 
         if alpha >= beta:
             debugPrint('[MAX] Alpha-beta pruned')
-            return alpha, best_move
+            ORDERING.cutoff(the_board, color, s, remaining_depth, index)
+            break
+
+    # results of subtrees cut by the timeout are not stored
+    if time.time() - start_time < time_limit:
+        TABLE.store(key, remaining_depth, alpha, original_alpha, original_beta, best_move)
     return alpha, best_move
 
-def min_value(the_board, color, alpha, beta, start_time, remaining_depth):
+def min_value(the_board, color, alpha, beta, start_time, time_limit, remaining_depth):
     opponent_color = the_board.opponent(color)
     current_legal_moves = the_board.legal_moves(color)
-    debugPrint(f'[MIN] Current legal moves: { current_legal_moves }')
+    if DEBUG: debugPrint(f'[MIN] Current legal moves: { current_legal_moves }')
  
     if len(current_legal_moves) == 0:
         debugPrint('[MIN] Stopping because found no further possible moves')
@@ -75,56 +151,64 @@ def min_value(the_board, color, alpha, beta, start_time, remaining_depth):
 
     best_move = current_legal_moves[0]
 
-    if time.time() - start_time >= MAX_RUN_TIME:
+    if time.time() - start_time >= time_limit:
         debugPrint('[MAX] Stopping because time is up')
-        print(f"                 Depth was: { remaining_depth }")
+        if DEBUG: debugPrint(f"                 Depth was: { remaining_depth }")
         return utility(the_board, opponent_color), best_move
     
     if remaining_depth == 0:
         debugPrint('[MAX] Stopping because reach MAX_DEPTH')
         return utility(the_board, opponent_color), best_move
 
-    for s in current_legal_moves:
-        other_board = board.from_string(str(the_board))
-        other_board.process_move(s, color)
-        
-        max_val = max_value(other_board, opponent_color, alpha, beta, start_time, remaining_depth - 1)[0]
-        debugPrint(f'[MIN] MaxVal { max_val }')
+    # transposition table: stored results deep enough are returned right away,
+    # otherwise the stored best move is searched first (see common.ordering)
+    key = the_board.hash ^ zobrist.TURN[color] ^ zobrist.ROOT[opponent_color]
+    tt_value, tt_move = TABLE.probe(key, remaining_depth, alpha, beta)
+    if tt_value is not None:
+        return tt_value, tt_move
+    current_legal_moves = ORDERING.order(the_board, color, current_legal_moves, tt_move)
+    original_alpha, original_beta = alpha, beta
+
+    for index, s in enumerate(current_legal_moves):
+        # searches in place: the move is taken back before trying the next one
+        the_board.make_move(s, color)
+        max_val = max_value(the_board, opponent_color, alpha, beta, start_time, time_limit, remaining_depth - 1)[0]
+        the_board.unmake_move()
+        if DEBUG: debugPrint(f'[MIN] MaxVal { max_val }')
 
         if max_val < beta:
-            debugPrint(f'[MIN] Found better move { s }')
+            if DEBUG: debugPrint(f'[MIN] Found better move { s }')
             beta = max_val
             best_move = s
 
         if beta <= alpha:
             debugPrint('[MIN] Alpha-beta pruned')
-            return beta, best_move
+            ORDERING.cutoff(the_board, color, s, remaining_depth, index)
+            break
+
+    # results of subtrees cut by the timeout are not stored
+    if time.time() - start_time < time_limit:
+        TABLE.store(key, remaining_depth, beta, original_alpha, original_beta, best_move)
     return beta, best_move
 
 def utility(the_board, color):
+    # learned pattern weights (see common.training), when the player has a weight file
+    if PATTERNS.loaded:
+        return PATTERNS.evaluate(the_board, color)
     return heuristic2(the_board, color)
 
 def heuristic1(the_board, color):
     opponent_color = the_board.opponent(color)
-    board_as_string = str(the_board).replace('\n','')
 
     # Score Ratio: Tha ratio of points between our score and the opponent's
-    current_score = sum([1 for char in board_as_string if char == color])
-    opponent_score = sum([1 for char in board_as_string if char == opponent_color])
+    current_score = the_board.piece_count[color]
+    opponent_score = the_board.piece_count[opponent_color]
     score_ratio = current_score / opponent_score if opponent_score else current_score
-    
-    # Corner Weight
-    current_upper_border_tiles = sum([1 for char in board_as_string[:8] if char == color])
-    current_lower_border_tiles = sum([1 for char in board_as_string[-8:] if char == color])
-    current_left_border_tiles = sum([1 for char in board_as_string[::8] if char == color])
-    current_right_border_tiles = sum([1 for char in board_as_string[7::8] if char == color])
-    current_total_border_tiles = current_upper_border_tiles + current_lower_border_tiles + current_left_border_tiles + current_right_border_tiles
-
-    opponent_upper_border_tiles = sum([1 for char in board_as_string[:8] if char == opponent_color])
-    opponent_lower_border_tiles = sum([1 for char in board_as_string[-8:] if char == opponent_color])
-    opponent_left_border_tiles = sum([1 for char in board_as_string[::8] if char == opponent_color])
-    opponent_right_border_tiles = sum([1 for char in board_as_string[7::8] if char == opponent_color])
-    opponent_total_border_tiles = opponent_upper_border_tiles + opponent_lower_border_tiles + opponent_left_border_tiles + opponent_right_border_tiles
+
+    # Corner Weight: tiles on the upper, lower, left and right borders (corners count twice),
+    # kept up to date by the board at every move
+    current_total_border_tiles = the_board.weight_sums[color][evaluation.BORDER]
+    opponent_total_border_tiles = the_board.weight_sums[opponent_color][evaluation.BORDER]
 
     border_ratio = current_total_border_tiles / opponent_total_border_tiles if opponent_total_border_tiles else current_total_border_tiles
     
@@ -134,36 +218,24 @@ def heuristic2(the_board, color):
     opponent_color = the_board.opponent(color)
 
     # Board Score: Tha score of points. Number of pieces of our color minus the opponent's pieces
-    board_as_string = str(the_board).replace('\n','')
-    current_score = sum([1 for char in board_as_string if char == color])
-    opponent_score = sum([1 for char in board_as_string if char == opponent_color])
-    board_score = current_score - opponent_score
+    board_score = the_board.piece_count[color] - the_board.piece_count[opponent_color]
     
-    # Corner Weights
-    board_weights = [
-        +4, -3, +2, +2, +2, +2, -3, +4,
-        -3, -4, -1, -1, -1, -1, -4, -3,
-        +2, -1, +1, +0, +0, +1, -1, +2,
-        +2, -1, +0, +1, +1, +0, -1, +2,
-        +2, -1, +0, +1, +1, +0, -1, +2,
-        +2, -1, +1, +0, +0, +1, -1, +2,
-        -3, -4, -1, -1, -1, -1, -4, -3,
-        +4, -3, +2, +2, +2, +2, -3, +4
-    ]
-
-    positions_weight = 0
-
-    for index, weight in enumerate(board_weights):
-        board_position = board_as_string[index]
-        if board_position == color:
-            positions_weight += weight
-        elif board_position == opponent_color:
-            positions_weight -= weight
+    # Corner Weights: sums of evaluation.POSITION_WEIGHTS, kept up to date by the board at every move
+    positions_weight = the_board.weight_sums[color][evaluation.POSITION] - the_board.weight_sums[opponent_color][evaluation.POSITION]
     
     return 2 * positions_weight + 3 * board_score
 
+# leaves are only counted while collecting statistics
+if STATS.enabled:
+    utility = STATS.counting(utility)
+
 if __name__ == '__main__':
-    b = board.from_file(sys.argv[1])
+    if sys.argv[1] == '--serve':
+        # persistent mode (serve.sh): answers the server's requests, keeping TABLE between moves
+        protocol.serve(make_move)
+        sys.exit()
+
+    b = bitboard.from_file(sys.argv[1])
     f = open('move.txt', 'w')
     f.write('%d,%d' % make_move(b, sys.argv[2]))
     f.close()
@@ -0,0 +1,2 @@
+#!/bin/bash
+python customplayer.py --serve
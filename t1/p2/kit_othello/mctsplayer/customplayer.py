@@ -0,0 +1,53 @@
+import sys
+sys.path.append('..')
+from common import bitboard
+from common import mcts
+from common import protocol
+import time
+
+DEBUG = False
+MAX_RUN_TIME = 3.0
+INVALID_MOVE = (-1, -1)
+PLAYOUTS = None  # playouts per move, None plays as many as MAX_RUN_TIME allows
+RAVE = True
+POLICY = mcts.LIGHT
+
+# the tree is kept between moves, which only helps in persistent mode (serve.sh)
+ENGINE = mcts.MCTS(rave=RAVE, policy=POLICY)
+
+def debugPrint(str):
+    if DEBUG: print("DEBUG M: " + str)
+
+def make_move(the_board, color, time_limit=None):
+    """
+    Returns the most visited move of up to time_limit seconds (MAX_RUN_TIME by default, or PLAYOUTS playouts) of Monte Carlo tree search
+    :return: (int, int)
+    """
+    color = bitboard.BitBoard.WHITE if color == 'white' else bitboard.BitBoard.BLACK
+
+    return decide(the_board, color, time_limit)
+
+def decide(the_board, color, time_limit=None):
+    if time_limit is None:
+        time_limit = MAX_RUN_TIME
+    initTime = time.time()
+    playouts, reused = ENGINE.playouts, ENGINE.reused_visits
+
+    m = ENGINE.search(the_board, color, PLAYOUTS, time_limit if PLAYOUTS is None else None, initTime)
+    if m is None:
+        return INVALID_MOVE
+
+    if DEBUG: debugPrint(f'Best move: { m } ({ ENGINE.playouts - playouts } playouts, '
+                         f'{ ENGINE.reused_visits - reused } reused, { time.time() - initTime:.2f}s)')
+    return m
+
+if __name__ == '__main__':
+    if sys.argv[1] == '--serve':
+        # persistent mode (serve.sh): answers the server's requests, keeping the tree between moves
+        protocol.serve(make_move)
+        sys.exit()
+
+    b = bitboard.from_file(sys.argv[1])
+    f = open('move.txt', 'w')
+    f.write('%d,%d' % make_move(b, sys.argv[2]))
+    f.close()
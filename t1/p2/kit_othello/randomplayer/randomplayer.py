@@ -2,11 +2,12 @@ import random
 import sys
 sys.path.append('..')
 from common import board
+from common import protocol
 
 
-def make_move(the_board, color):
+def make_move(the_board, color, time_limit=None):
     """
-    Returns a random move from the list of possible ones
+    Returns a random move from the list of possible ones (right away, whatever the time limit)
     :return: (int, int)
     """
     color = board.Board.WHITE if color == 'white' else board.Board.BLACK
@@ -16,6 +17,10 @@ def make_move(the_board, color):
 
 
 if __name__ == '__main__':
+    if sys.argv[1] == '--serve':
+        protocol.serve(make_move, board)
+        sys.exit()
+
     b = board.from_file(sys.argv[1])
     f = open('move.txt', 'w')
     f.write('%d,%d' % make_move(b, sys.argv[2]))
@@ -4,29 +4,38 @@ import os
 import sys
 import time
 import signal
+import select
 import argparse
 import subprocess
 import xml.etree.ElementTree as ET
 import xml.dom.minidom
 
 from common import board
+from common import protocol
+from common import stats
 
 
 class Server(object):
     """
     Othello server, implements a simple file-based playing protocol
+    and, optionally, a line-based protocol with persistent players (see common.protocol)
 
     """
 
     # server file names
     START_SCRIPT = 'launch.sh'
+    SERVE_SCRIPT = 'serve.sh'
     STATE_FILE = 'state.txt'
     MOVE_FILE = 'move.txt'
 
+    # seconds between checks for the move file of a player using launch.sh
+    POLL_INTERVAL = 0.01
+
     # HISTORY_FILE = 'history.txt'
     # STDOUT_FILE = 'yourlog.txt'
 
-    def __init__(self, p1_dir, p2_dir, delay, stdout, history, output):
+    def __init__(self, p1_dir, p2_dir, delay, stdout, history, output, persistent=False, collect_stats=False,
+                 total_time=None):
         self.basedir = os.path.abspath('.')
 
         self.player_dirs = [p1_dir, p2_dir]
@@ -35,13 +44,34 @@ class Server(object):
         self.board = board.Board()
 
         self.history = []  # a list of performed moves (tuple: ((x,y), color)
+        self.latencies = []  # seconds each move of history took to arrive
         self.history_file = open(history, 'w')
         self.output_file = output
 
         self.delay = delay
         self.redir_stdout = stdout
 
+        # chess clock: seconds left to each player for the whole game (None for no clock)
+        self.total_time = total_time
+        self.clocks = [total_time, total_time]
+        self.time_used = [0.0, 0.0]
+
+        # persistent player processes (None for players using the file protocol)
+        self.persistent = persistent
+        self.processes = [None, None]
+        self.pipe_buffers = [b'', b'']
+        self.request_id = 0
+
+        # search statistics files of the players (see common.stats), one JSON object per move
+        self.stats_files = [None, None]
+        if collect_stats:
+            stem = os.path.splitext(os.path.abspath(output))[0]
+            self.stats_files = ['%s.player%d.stats.jsonl' % (stem, idx + 1) for idx in range(2)]
+            for path in self.stats_files:
+                open(path, 'w').close()
+
         self.result = None
+        self.termination = None  # 'end', 'disqualified' or 'time'
 
         # start and finish times of match
         self.start = None
@@ -51,6 +81,15 @@ class Server(object):
         self.history_file.close()
 
     def run(self):
+        if self.persistent:
+            self.start_persistent_players()
+
+        try:
+            return self.play()
+        finally:
+            self.stop_persistent_players()
+
+    def play(self):
         self.start = time.localtime()
         player = 0
 
@@ -74,6 +113,7 @@ class Server(object):
                 print('Player 2 (white): %d' % p2_score)
 
                 self.result = 1 - player
+                self.termination = 'disqualified'
                 self.finish = time.localtime()
                 return self.result
 
@@ -92,6 +132,7 @@ class Server(object):
                     print('Draw!')
 
                 self.result = 0 if p1_score > p2_score else 1 if p2_score > p1_score else 2
+                self.termination = 'end'
                 self.finish = time.localtime()
                 return self.result
 
@@ -102,54 +143,46 @@ class Server(object):
                 player = 1 - player
                 continue
 
-            player_dir = self.player_dirs[player]
-            os.chdir(os.path.join(self.basedir, player_dir))
-
-            # puts file in player dir
-            path_to_state = self.STATE_FILE
-            state_file = open(path_to_state, 'w')
-
-            state_file.write(str(self.board))
-            state_file.close()
-
-            # starts player process
-            stdout = open(self.redir_stdout, 'a') if self.redir_stdout is not None else sys.stdout
-            player_process = subprocess.Popen(
-                ['./launch.sh', self.STATE_FILE, self.color_names[player]],
-                stdout=stdout,
-                preexec_fn=os.setsid
-            )
-
-            #  waits 'delay' seconds for the move to complete
             print('Waiting for next move of Player %d...' % (player + 1))
-            time.sleep(self.delay)
-
-            # kills player process, collects and processes move
-            os.killpg(os.getpgid(player_process.pid), signal.SIGKILL)
-            player_process.terminate()
-
-            print('Will read player\'s move.')
-
-            move_path = self.MOVE_FILE
-            if os.path.exists(move_path):
-                # reads move
-                try:
-                    x, y = (int(c) for c in open(move_path).read().strip().split(','))
-                except ValueError:
-                    print("Error while reading Player %d move." % (player + 1))
-                    print("Possibly it has not performed a move or its format is not correct.")
-                    print("Player %d current call flagged as illegal move." % (player + 1))
-                    illegal_count[player] += 1
-                    player = 1 - player
-                    continue
+            limit = self.move_time_limit(player)
+            request_start = time.time()
+            malformed = False
+            try:
+                move = self.request_move(player, limit)
+            except ValueError:
+                move, malformed = None, True
+            latency = min(time.time() - request_start, limit)
+
+            # charges the player's clock, the player whose flag falls loses
+            self.time_used[player] += latency
+            if self.clocks[player] is not None:
+                self.clocks[player] -= latency
+                if self.clocks[player] <= 0:
+                    print('Player %d LOST ON TIME! Its %.1fs for the game are over.' % (player + 1, self.total_time))
+                    self.result = 1 - player
+                    self.termination = 'time'
+                    self.finish = time.localtime()
+                    return self.result
+
+            if malformed:
+                print("Error while reading Player %d move." % (player + 1))
+                print("Possibly it has not performed a move or its format is not correct.")
+                print("Player %d current call flagged as illegal move." % (player + 1))
+                illegal_count[player] += 1
+                player = 1 - player
+                continue
+
+            if move is not None:
+                x, y = move
 
                 # saves move in history
                 self.history_file.write('%d,%d,%s\n' % (x, y, self.player_color[player]))
                 self.history.append(((x, y), self.player_color[player]))
+                self.latencies.append(latency)
 
                 if self.board.process_move((x, y), self.player_color[player]):
                     illegal_count[player] = 0
-                    print('Player %d move %d,%d accepted.' % (player + 1, x, y))
+                    print('Player %d move %d,%d accepted (%.3fs).' % (player + 1, x, y, latency))
 
                 else:
                     illegal_count[player] += 1
@@ -164,6 +197,231 @@ class Server(object):
             # toggle player for next move
             player = 1 - player
 
+    def player_env(self, player):
+        """
+        Returns the environment of the player processes
+        :param player: 0 or 1
+        :return: dict
+        """
+        env = dict(os.environ)
+        if self.stats_files[player] is not None:
+            env[stats.ENV_VAR] = self.stats_files[player]
+        return env
+
+    def player_stats(self, player):
+        """
+        Returns the search statistics of a player aggregated over the match
+        :param player: 0 or 1
+        :return: dict, or None if not collected (or the player wrote none)
+        """
+        path = self.stats_files[player]
+        if path is None or not os.path.exists(path):
+            return None
+        moves = stats.read_stats(path)
+        return stats.aggregate(moves) if moves else None
+
+    def move_time_limit(self, player):
+        """
+        Returns the seconds the player has for its next move: the per-move
+        delay, or less if its clock has less time left
+        :param player: 0 or 1
+        :return: float
+        """
+        if self.clocks[player] is None:
+            return self.delay
+        return min(self.delay, self.clocks[player])
+
+    def request_move(self, player, limit):
+        """
+        Asks the player for a move, through its persistent process if it has one
+        :param player: 0 or 1
+        :param limit: seconds the player has to answer
+        :return: (int, int) or None if the player has not made a move;
+                 raises ValueError if the move is malformed
+        """
+        if self.processes[player] is not None:
+            return self.request_move_pipe(player, limit)
+        return self.request_move_file(player, limit)
+
+    def read_move_file(self):
+        """
+        Reads the move file of the current directory
+        :return: (int, int) or None if there is no move file;
+                 raises ValueError if the move is malformed (or still being written)
+        """
+        if not os.path.exists(self.MOVE_FILE):
+            return None
+        x, y = (int(c) for c in open(self.MOVE_FILE).read().strip().split(','))
+        return x, y
+
+    def request_move_file(self, player, limit):
+        """
+        File-based protocol: launches the player with the state file and
+        waits until it writes a valid move file, it exits or 'limit' seconds
+        have passed, then kills it and reads its move file
+        :param player: 0 or 1
+        :param limit: seconds the player has to answer
+        :return: (int, int) or None if the player has not made a move;
+                 raises ValueError if the move is malformed
+        """
+        player_dir = self.player_dirs[player]
+        os.chdir(os.path.join(self.basedir, player_dir))
+
+        # a move file left by a previous call would be taken for this one
+        if os.path.exists(self.MOVE_FILE):
+            os.remove(self.MOVE_FILE)
+
+        # puts file in player dir
+        path_to_state = self.STATE_FILE
+        state_file = open(path_to_state, 'w')
+
+        state_file.write(str(self.board))
+        state_file.close()
+
+        # starts player process
+        stdout = open(self.redir_stdout, 'a') if self.redir_stdout is not None else sys.stdout
+        player_process = subprocess.Popen(
+            ['./launch.sh', self.STATE_FILE, self.color_names[player]],
+            stdout=stdout,
+            env=self.player_env(player),
+            preexec_fn=os.setsid
+        )
+
+        # polls for the move until the deadline
+        deadline = time.time() + limit
+        while time.time() < deadline and player_process.poll() is None:
+            try:
+                if self.read_move_file() is not None:
+                    break
+            except ValueError:
+                pass  # not completely written yet
+            time.sleep(self.POLL_INTERVAL)
+
+        # kills player process (and its children), collects and processes move
+        self.kill_process_group(player_process)
+
+        print('Will read player\'s move.')
+        return self.read_move_file()
+
+    def request_move_pipe(self, player, limit):
+        """
+        Line-based protocol: sends the request to the persistent process and
+        returns as soon as the reply arrives, or None after 'limit' seconds
+        :param player: 0 or 1
+        :param limit: seconds the player has to answer
+        :return: (int, int) or None if the player has not made a move;
+                 raises ValueError if the reply is malformed
+        """
+        process = self.processes[player]
+        self.request_id += 1
+        request = protocol.move_request(self.request_id, self.color_names[player], self.board, limit)
+
+        try:
+            process.stdin.write(request.encode())
+            process.stdin.flush()
+        except OSError:
+            self.persistent_player_died(player)
+            return self.request_move_file(player, limit)
+
+        deadline = time.time() + limit
+        while True:
+            line = self.read_reply(player, deadline)
+            if line is None:
+                return None
+
+            request_id, move = protocol.parse_reply(line)
+            if request_id == self.request_id:
+                return move
+            # a late reply to a previous request, keeps waiting
+
+    def read_reply(self, player, deadline):
+        """
+        Reads a line from the persistent process of the player
+        :param player: 0 or 1
+        :param deadline: time.time() after which it gives up
+        :return: str or None if no line arrived before the deadline
+        """
+        fd = self.processes[player].stdout.fileno()
+
+        while b'\n' not in self.pipe_buffers[player]:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+
+            data = os.read(fd, 4096)
+            if not data:  # end of file: the process has exited
+                self.persistent_player_died(player)
+                return None
+            self.pipe_buffers[player] += data
+
+        line, self.pipe_buffers[player] = self.pipe_buffers[player].split(b'\n', 1)
+        return line.decode()
+
+    def start_persistent_players(self):
+        """
+        Starts the serve.sh of every player that has one. The others
+        use the file-based protocol.
+        :return:
+        """
+        stdout = open(self.redir_stdout, 'a') if self.redir_stdout is not None else None
+
+        for player, player_dir in enumerate(self.player_dirs[:2]):
+            path = os.path.join(self.basedir, player_dir)
+            if not os.path.exists(os.path.join(path, self.SERVE_SCRIPT)):
+                print('Player %d has no %s, using %s.' % (player + 1, self.SERVE_SCRIPT, self.START_SCRIPT))
+                continue
+
+            self.processes[player] = subprocess.Popen(
+                ['./' + self.SERVE_SCRIPT],
+                cwd=path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stdout,
+                bufsize=0,
+                env=self.player_env(player),
+                preexec_fn=os.setsid
+            )
+
+    def stop_persistent_players(self):
+        """
+        Asks the persistent players to quit, killing the ones that do not
+        :return:
+        """
+        for player, process in enumerate(self.processes):
+            if process is None:
+                continue
+            try:
+                process.stdin.write(b'quit\n')
+                process.stdin.close()
+                process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill_process_group(process)
+            self.processes[player] = None
+
+    def persistent_player_died(self, player):
+        """
+        Falls back to the file-based protocol for a player whose process has exited
+        :param player: 0 or 1
+        :return:
+        """
+        print('Player %d persistent process has exited, using %s.' % (player + 1, self.START_SCRIPT))
+        self.kill_process_group(self.processes[player])
+        self.processes[player] = None
+        self.pipe_buffers[player] = b''
+
+    @staticmethod
+    def kill_process_group(process):
+        """
+        Kills a player process and its children, if still alive
+        :param process: subprocess.Popen object
+        :return:
+        """
+        try:
+            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+        except OSError:
+            pass
+        process.wait()
+
     def write_output(self):
         """
         Writes a xml file with detailed match data
@@ -172,6 +430,7 @@ class Server(object):
         os.chdir(self.basedir)
 
         root = ET.Element('othello-match')
+        root.set('termination', self.termination or 'unfinished')
 
         colors = [self.board.BLACK, self.board.WHITE, 'None']
         self.player_dirs.append('None')  # trick for writing a draw match
@@ -179,6 +438,9 @@ class Server(object):
         timing = ET.SubElement(root, 'timing')
         timing.set('start', time.asctime(self.start))
         timing.set('finish', time.asctime(self.finish))
+        timing.set('delay', str(self.delay))
+        if self.total_time is not None:
+            timing.set('total-time', str(self.total_time))
 
         scores = [self.board.piece_count['B'], self.board.piece_count['W']]
 
@@ -187,16 +449,30 @@ class Server(object):
             elem.set('directory', p)
             elem.set('color', colors[idx])
 
-            result = 'win' if scores[idx] > scores[idx - 1] else 'loss' if scores[idx] < scores[idx - 1] else 'draw'
+            if self.result in (0, 1):
+                result = 'win' if self.result == idx else 'loss'
+            else:
+                result = 'win' if scores[idx] > scores[idx - 1] else 'loss' if scores[idx] < scores[idx - 1] else 'draw'
             elem.set('result', result)
             elem.set('score', str(scores[idx]))
+            elem.set('time-used', '%.3f' % self.time_used[idx])
+            if self.clocks[idx] is not None:
+                elem.set('time-left', '%.3f' % max(self.clocks[idx], 0.0))
+
+            player_stats = self.player_stats(idx)
+            if player_stats is not None:
+                stats_elem = ET.SubElement(elem, 'stats')
+                stats_elem.set('file', self.stats_files[idx])
+                for name, value in sorted(player_stats.items()):
+                    stats_elem.set(name, '%.3f' % value if isinstance(value, float) else str(value))
 
         moves = ET.SubElement(root, 'moves')
 
-        for coords, color in self.history:
+        for (coords, color), latency in zip(self.history, self.latencies):
             move = ET.SubElement(moves, 'move')
             move.set('coord', '%d,%d' % coords)
             move.set('color', color)
+            move.set('latency', '%.3f' % latency)
 
         # preety xml thanks to: https://stackoverflow.com/a/1206856/1251716
         ugly_xml = ET.tostring(root).decode('utf-8')
@@ -213,7 +489,13 @@ if __name__ == '__main__':
                         help='Path to player directory')
     parser.add_argument('-d', '--delay', type=float, metavar='delay',
                         default=5.0,
-                        help='Time allocated for players to make a move.')
+                        help='Time allocated for players to make a move (the server moves on '
+                             'as soon as the move arrives).')
+
+    parser.add_argument('-t', '--total-time', type=float, dest='total_time',
+                        default=None, metavar='seconds',
+                        help='Chess clock: total time of each player for the whole game, '
+                             'a player that runs out of it loses.')
 
     parser.add_argument('-r', '--redir-stdout', dest='redir_stdout', type=str,
                         default=None, metavar='stdout-file',
@@ -227,9 +509,26 @@ if __name__ == '__main__':
                         default='results.xml', metavar='output-file',
                         help='File to save game details (includes history)')
 
+    parser.add_argument('-p', '--persistent', action='store_true',
+                        help='Keep players that have a serve.sh running for the whole match, '
+                             'talking through pipes (the others use launch.sh).')
+
+    parser.add_argument('-s', '--stats', action='store_true',
+                        help='Ask the players to record search statistics of every move '
+                             '(JSON lines next to the output file), aggregated in the output.')
+
     args = parser.parse_args()
     p1, p2 = args.players
 
-    s = Server(p1, p2, args.delay, args.redir_stdout, args.history, args.output)
+    s = Server(p1, p2, args.delay, args.redir_stdout, args.history, args.output, args.persistent, args.stats,
+               args.total_time)
     s.run()
     s.write_output()
+
+    for idx in range(2):
+        player_stats = s.player_stats(idx)
+        if player_stats is not None:
+            print('Player %d search: %s' % (idx + 1, ', '.join(
+                '%s %s' % (name, '%.2f' % value if isinstance(value, float) else value)
+                for name, value in sorted(player_stats.items())
+            )))
@@ -0,0 +1,198 @@
+#!/usr/bin/python
+"""
+Round robin tournament between Othello players. Every pair of players
+plays the given number of games with each color; matches run in parallel,
+each one in its own temporary directory holding copies of common/ and of
+both players, so the state.txt/move.txt files of different matches never clash.
+"""
+import os
+import sys
+import math
+import shutil
+import tempfile
+import argparse
+import itertools
+import subprocess
+import concurrent.futures
+import xml.etree.ElementTree as ET
+
+KIT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(KIT_DIR, 'server.py')
+IGNORE = shutil.ignore_patterns('__pycache__', 'state.txt', 'move.txt')
+
+
+def play_match(black, white, delay, persistent=False, keep=False, total_time=None):
+    """
+    Plays a match in an isolated working directory
+    :param black: path to the directory of the player with black pieces
+    :param white: path to the directory of the player with white pieces
+    :param delay: seconds per move
+    :param persistent: whether to run the server with --persistent
+    :param keep: whether to keep the working directory (for inspection)
+    :param total_time: seconds of each player for the whole game (chess clock), None for no clock
+    :return: dict with the players, their scores and results
+    """
+    workdir = tempfile.mkdtemp(prefix='othello-match-')
+    try:
+        shutil.copytree(os.path.join(KIT_DIR, 'common'), os.path.join(workdir, 'common'), ignore=IGNORE)
+
+        # players are copied under distinct names, a player may face itself
+        names = ['black_' + os.path.basename(os.path.normpath(black)),
+                 'white_' + os.path.basename(os.path.normpath(white))]
+        for source, name in zip([black, white], names):
+            shutil.copytree(source, os.path.join(workdir, name), ignore=IGNORE)
+
+        command = [sys.executable, SERVER, names[0], names[1], '-d', str(delay),
+                   '-o', 'results.xml', '-l', 'history.txt', '-r', 'players.log']
+        if persistent:
+            command.append('-p')
+        if total_time is not None:
+            command.extend(['-t', str(total_time)])
+
+        with open(os.path.join(workdir, 'server.log'), 'w') as log:
+            subprocess.run(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT, check=True)
+
+        root = ET.parse(os.path.join(workdir, 'results.xml')).getroot()
+        p1, p2 = root.find('player1'), root.find('player2')
+        return {
+            'black': black,
+            'white': white,
+            'scores': (int(p1.get('score')), int(p2.get('score'))),
+            'results': (p1.get('result'), p2.get('result')),
+            'workdir': workdir if keep else None,
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def elo_ratings(players, matches, iterations=200):
+    """
+    Fits Bradley-Terry strengths to the results (draws count half a win) and
+    converts them to an Elo scale averaging 1500. Each player also gets one
+    virtual draw against an average opponent, so that players that never won
+    (or never lost) still get finite ratings.
+    :param players: list of player names
+    :param matches: list of match dicts (see play_match)
+    :param iterations: iterations of the minorization-maximization algorithm
+    :return: dict player -> rating
+    """
+    wins = {p: 0.5 for p in players}  # includes the virtual draw
+    games = {(a, b): 0 for a in players for b in players}
+    for m in matches:
+        a, b = m['black'], m['white']
+        games[a, b] += 1
+        games[b, a] += 1
+        wins[a] += {'win': 1.0, 'draw': 0.5}.get(m['results'][0], 0.0)
+        wins[b] += {'win': 1.0, 'draw': 0.5}.get(m['results'][1], 0.0)
+
+    strength = {p: 1.0 for p in players}
+    for i in range(iterations):
+        updated = {}
+        for p in players:
+            # the virtual opponent has strength 1
+            denominator = 1.0 / (strength[p] + 1.0)
+            for q in players:
+                if games[p, q]:
+                    denominator += games[p, q] / (strength[p] + strength[q])
+            updated[p] = wins[p] / denominator
+        strength = updated
+
+    ratings = {p: 400 * math.log10(strength[p]) for p in players}
+    mean = sum(ratings.values()) / len(ratings)
+    return {p: 1500 + r - mean for p, r in ratings.items()}
+
+
+def report(players, matches):
+    """
+    Returns the tournament report: per player wins, losses, draws,
+    average disc margin and Elo rating, sorted by rating
+    :param players: list of player names
+    :param matches: list of match dicts (see play_match)
+    :return: str
+    """
+    stats = {p: {'win': 0, 'loss': 0, 'draw': 0, 'margin': 0} for p in players}
+    for m in matches:
+        for side, player in enumerate([m['black'], m['white']]):
+            stats[player][m['results'][side]] += 1
+            stats[player]['margin'] += m['scores'][side] - m['scores'][1 - side]
+
+    ratings = elo_ratings(players, matches)
+
+    lines = ['%-20s %6s %5s %5s %5s %7s %8s %6s' % ('player', 'games', 'win', 'loss', 'draw', 'score', 'margin', 'elo')]
+    for p in sorted(players, key=lambda p: -ratings[p]):
+        s = stats[p]
+        games = s['win'] + s['loss'] + s['draw']
+        lines.append('%-20s %6d %5d %5d %5d %6.1f%% %+8.2f %6.0f' % (
+            p, games, s['win'], s['loss'], s['draw'],
+            100.0 * (s['win'] + 0.5 * s['draw']) / games if games else 0,
+            s['margin'] / games if games else 0, ratings[p]
+        ))
+
+    lines.append('')
+    lines.append('%-20s %-20s %7s %s' % ('black', 'white', 'score', 'result'))
+    for m in matches:
+        lines.append('%-20s %-20s %3d-%-3d %s' % (m['black'], m['white'], m['scores'][0], m['scores'][1], m['results'][0]))
+
+    return '\n'.join(lines)
+
+
+def round_robin(players, games):
+    """
+    Returns the pairings of a round robin with color swapping
+    :param players: list of player directories
+    :param games: games per pair of players with each color
+    :return: list of (black, white)
+    """
+    pairings = []
+    for a, b in itertools.combinations(players, 2):
+        pairings.extend([(a, b), (b, a)] * games)
+    return pairings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Othello round robin tournament.')
+    parser.add_argument('players', metavar='player', type=str, nargs='+',
+                        help='Path to player directory')
+    parser.add_argument('-d', '--delay', type=float, default=5.0,
+                        help='Time allocated for players to make a move.')
+    parser.add_argument('-t', '--total-time', type=float, dest='total_time', default=None,
+                        help='Chess clock: time of each player for the whole game.')
+    parser.add_argument('-g', '--games', type=int, default=1,
+                        help='Games per pair of players with each color.')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help='Matches played at the same time.')
+    parser.add_argument('-p', '--persistent', action='store_true',
+                        help='Run the matches with server.py --persistent.')
+    parser.add_argument('-o', '--output-file', type=str, dest='output', default=None,
+                        help='File to save the report (it is always printed).')
+    parser.add_argument('-k', '--keep', action='store_true',
+                        help='Keep the working directory of each match.')
+    args = parser.parse_args()
+
+    players = [os.path.normpath(p) for p in args.players]
+    if len(players) < 2:
+        parser.error('a tournament needs at least two players')
+
+    matches = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(play_match, os.path.abspath(black), os.path.abspath(white),
+                               args.delay, args.persistent, args.keep, args.total_time)
+                   for black, white in round_robin(players, args.games)]
+
+        for future in concurrent.futures.as_completed(futures):
+            m = future.result()
+            # reports players by the names given in the command line
+            m['black'] = players[[os.path.abspath(p) for p in players].index(m['black'])]
+            m['white'] = players[[os.path.abspath(p) for p in players].index(m['white'])]
+            matches.append(m)
+            print('%s (black) %d x %d %s (white)%s' % (
+                m['black'], m['scores'][0], m['scores'][1], m['white'],
+                ' [kept in %s]' % m['workdir'] if m['workdir'] else ''
+            ))
+
+    text = report(players, matches)
+    print(text)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')